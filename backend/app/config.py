@@ -42,6 +42,175 @@ DEVICE = "cuda" if USE_GPU and not IS_PRODUCTION else "cpu"
 # Model - use smaller in production
 #EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2" if IS_PRODUCTION else "intfloat/e5-large-v2"
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Vector store: segments are folded into a new snapshot once they hold at
+# least this many chunks (and more chunks than the snapshot itself)
+VECTOR_STORE_COMPACT_MIN_RECORDS = int(os.getenv("VECTOR_STORE_COMPACT_MIN_RECORDS", "10000"))
+
+# Deleted documents' chunks are tombstoned and skipped by search; the store is
+# rewritten without them once they make up this fraction of it (0 = on every delete)
+VECTOR_STORE_DELETE_COMPACT_RATIO = float(os.getenv("VECTOR_STORE_DELETE_COMPACT_RATIO", "0.2"))
+
+# Vector index: "flat" (exact), "hnsw", "ivf_flat" or "ivf_pq". Stores start
+# as flat and migrate to the configured type once they hold this many chunks
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+VECTOR_INDEX_TRAIN_THRESHOLD = int(os.getenv("VECTOR_INDEX_TRAIN_THRESHOLD", "50000"))
+VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", "0"))  # 0 = derive from store size
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "16"))
+VECTOR_INDEX_HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+VECTOR_INDEX_HNSW_EF_SEARCH = int(os.getenv("VECTOR_INDEX_HNSW_EF_SEARCH", "64"))
+VECTOR_INDEX_PQ_M = int(os.getenv("VECTOR_INDEX_PQ_M", "48"))
+
+# Query embedding cache (in-process LRU in front of the embedding model)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+
+# Semantic answer cache for /query/ask: a question whose embedding has at
+# least ANSWER_CACHE_SIMILARITY cosine similarity to a cached question, and
+# whose retrieved context is identical, is answered from the cache instead
+# of the LLM. Holds up to ANSWER_CACHE_SIZE answers for ANSWER_CACHE_TTL_SECONDS
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+
+# Query embedding micro-batching: concurrent uncached queries arriving within
+# QUERY_BATCH_MAX_WAIT_MS of each other are encoded in one model call of at
+# most QUERY_BATCH_MAX_SIZE texts (1 disables batching)
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+
+# Cross-encoder reranking (optional, per request): over-retrieve
+# RERANK_CANDIDATES chunks and reorder them with RERANK_MODEL before building
+# the LLM context. Scores are cached per (query, chunk text). Reranking is
+# skipped when its estimated time exceeds what is left of the request's
+# latency budget (RERANK_LATENCY_BUDGET_MS by default; 0 = no budget)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "0"))
+
+# Retrieval mode: "dense" (embeddings only), "lexical" (BM25 only) or "hybrid"
+# (both, fused). A BM25 inverted index is kept next to the vector index so
+# exact identifiers and rare terms are found even when embeddings miss them.
+# Hybrid search takes HYBRID_CANDIDATES hits from each side and fuses them by
+# reciprocal rank ("rrf", constant HYBRID_RRF_K) or by a weighted sum of
+# normalized scores ("weighted", HYBRID_ALPHA = weight of the dense score).
+# /query/search can override these per request
+SEARCH_MODE = os.getenv("SEARCH_MODE", "dense").lower()
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf").lower()
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "50"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+
+# PDF text extraction: documents with at least PDF_PARALLEL_MIN_PAGES pages are
+# split into page ranges and extracted by a pool of worker processes
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+
+# OCR of image-only PDF pages: pages are rasterized OCR_BATCH_PAGES at a time
+# and OCRed by OCR_WORKERS threads (each runs a tesseract process). Results
+# are cached per (file hash, page) so re-indexing never OCRs a page twice
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_BATCH_PAGES = int(os.getenv("OCR_BATCH_PAGES", "8"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+OCR_CACHE_DIR = DATA_DIR / "ocr_cache"
+
+# Ingestion job queue: uploads are queued in a SQLite database and processed
+# by worker processes (``python -m app.worker``). The API starts
+# INGEST_WORKER_PROCESSES workers itself; set it to 0 when workers run as a
+# separate service. Running jobs that stop heartbeating for JOB_STALE_SECONDS
+# are retried, up to JOB_MAX_ATTEMPTS times. INGEST_MODE=inline skips the
+# queue and processes uploads in the API process (used by the tests)
+INGEST_MODE = os.getenv("INGEST_MODE", "queue").lower()
+JOB_QUEUE_PATH = Path(os.getenv("JOB_QUEUE_PATH", str(DATA_DIR / "jobs.sqlite3")))
+JOB_ARTIFACT_DIR = DATA_DIR / "jobs"
+INGEST_WORKER_PROCESSES = int(os.getenv("INGEST_WORKER_PROCESSES", "1"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "0.5"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Executors for blocking work in async request handlers, sized separately
+# so a burst of one kind (e.g. uploads) cannot starve the others: query
+# embedding and vector search, document extraction and file reads,
+# database queries, and local LLM generation. The event loop's lag is
+# sampled every EVENT_LOOP_LAG_INTERVAL_SECONDS (see /system/event-loop).
+# Embedding pool threads mostly wait on the query micro-batcher, so that
+# pool is sized for concurrent searches rather than for cores
+EMBEDDING_EXECUTOR_WORKERS = int(os.getenv("EMBEDDING_EXECUTOR_WORKERS", "16"))
+EXTRACTION_EXECUTOR_WORKERS = int(os.getenv("EXTRACTION_EXECUTOR_WORKERS", "2"))
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", "4"))
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.1"))
+
+# LLM API backends (OpenAI, Groq) are called with async HTTP clients that
+# keep up to LLM_MAX_KEEPALIVE_CONNECTIONS connections alive for reuse and
+# allow at most LLM_MAX_CONCURRENCY in-flight requests per backend. The base
+# URLs can point at a proxy or a local stub server (benchmarks/bench_llm_clients.py)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "32"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# How answers are dispatched to the primary and fallback LLMs:
+#   fallback  the fallback is only asked after the primary fails
+#   hedged    the fallback is also asked if the primary has not answered
+#             within its LLM_HEDGE_PERCENTILE latency; the first valid
+#             answer wins and the other request is cancelled
+#   race      both are asked at once
+# The hedge delay is LLM_HEDGE_DEFAULT_DELAY_SECONDS until the primary has
+# LLM_HEDGE_MIN_SAMPLES of its last LLM_LATENCY_WINDOW response times
+# recorded, and never below LLM_HEDGE_MIN_DELAY_SECONDS
+LLM_DISPATCH_MODE = os.getenv("LLM_DISPATCH_MODE", "fallback")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "3.0"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.25"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "500"))
+
+# Per-backend circuit breakers: of the last LLM_BREAKER_WINDOW calls within
+# LLM_BREAKER_WINDOW_SECONDS (once there are LLM_BREAKER_MIN_CALLS), if
+# LLM_BREAKER_ERROR_RATE failed or
+# LLM_BREAKER_SLOW_RATE took over LLM_BREAKER_SLOW_CALL_SECONDS, the backend
+# is skipped for LLM_BREAKER_COOLDOWN_SECONDS, then probed with up to
+# LLM_BREAKER_HALF_OPEN_PROBES requests before it is used again.
+# LLM_ROUTING=health tries backends in order of health score (share of
+# recent calls that succeeded and were not slow) for every request, keeping
+# the startup primary/fallback order between equally healthy backends;
+# "static" always keeps the startup order
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_WINDOW_SECONDS = float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", "60"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "30"))
+LLM_BREAKER_SLOW_RATE = float(os.getenv("LLM_BREAKER_SLOW_RATE", "0.8"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+LLM_BREAKER_HALF_OPEN_PROBES = int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1"))
+LLM_ROUTING = os.getenv("LLM_ROUTING", "health")
+
+# LLM backends are created without loading models or calling the APIs; the
+# local model loads on first use or in the warm-up the app starts in the
+# background once it is serving (see /ready). LLM_WARMUP_CHECK_API=false
+# skips the warm-up's short test request to each API backend
+LLM_WARMUP_CHECK_API = os.getenv("LLM_WARMUP_CHECK_API", "true").lower() == "true"
+
+# Vector store rebuilds (/documents/reset-vector-store) re-process documents
+# in REBUILD_WORKERS threads into a new store that replaces the live one
+REBUILD_WORKERS = int(os.getenv("REBUILD_WORKERS", "4"))
+# A rebuild that failed this many times is no longer resumed on startup
+REBUILD_MAX_ATTEMPTS = int(os.getenv("REBUILD_MAX_ATTEMPTS", "3"))
+
+# Batch question answering (/query/ask-batch): at most BATCH_QUERY_MAX_QUESTIONS
+# per request, answered by up to BATCH_LLM_CONCURRENCY concurrent LLM calls
+BATCH_QUERY_MAX_QUESTIONS = int(os.getenv("BATCH_QUERY_MAX_QUESTIONS", "100"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
 # API
 API_PREFIX = "/api/v1"
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
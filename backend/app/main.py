@@ -1,13 +1,20 @@
+import asyncio
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import torch
 
 from app.config import API_PREFIX
 from app.config import CORS_ORIGINS
+from app.config import INGEST_MODE, INGEST_WORKER_PROCESSES
 from app.routers import document, query, analytics, websocket, system  # Added analytics router
 from app.database import init_db
 from app.models.document import DocumentDB
+from app.utils.service_manager import service_manager
+from app.services.ingestion import start_worker_processes, stop_worker_processes
+from app.utils.job_monitor import IngestJobMonitor
+from app.utils.executors import LLM_POOL, lag_monitor, run_in_executor, shutdown_executors
 import os
 
 print("SYSTEM PATH:", os.environ["PATH"])
@@ -43,6 +50,26 @@ async def startup_event():
         # Initialize database
         init_db()
         
+        # Share one service container across routers; heavy services load lazily
+        app.state.service_manager = service_manager
+        
+        # Ingestion: workers extract and embed, the monitor indexes their results
+        workers = INGEST_WORKER_PROCESSES if INGEST_MODE != "inline" else 0
+        app.state.ingest_workers = start_worker_processes(workers)
+        monitor = IngestJobMonitor(
+            service_manager.get_job_queue(),
+            service_manager.get_rag_service,
+            notifier=websocket.websocket_manager
+        )
+        app.state.job_monitor_task = asyncio.create_task(monitor.run())
+        logger.info(f"👷 Started {len(app.state.ingest_workers)} ingestion worker processes")
+        
+        # Sample event loop lag (see /system/event-loop)
+        app.state.lag_monitor_task = asyncio.create_task(lag_monitor.run())
+        
+        # Warm the LLM backends once serving, instead of loading them before (see /ready)
+        app.state.llm_warmup_task = asyncio.create_task(run_in_executor(LLM_POOL, service_manager.warm_up_llm))
+        
         # Log GPU status
         if torch.cuda.is_available():
             gpu_name = torch.cuda.get_device_name(0)
@@ -62,6 +89,20 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown."""
     logger.info("🔄 Application shutting down...")
+    for name in ("job_monitor_task", "lag_monitor_task"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+    # Cancelling would not stop the warm-up thread, so let it finish before
+    # the LLM resources it is loading are cleaned up
+    warmup_task = getattr(app.state, "llm_warmup_task", None)
+    if warmup_task:
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    stop_worker_processes(getattr(app.state, "ingest_workers", []))
+    if service_manager.llm_service:
+        await service_manager.llm_service.aclose()
+    service_manager.shutdown()
+    shutdown_executors()
 
 
 # Include routers
@@ -82,6 +123,16 @@ async def root():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the LLM backends are warmed up, 503 until then."""
+    ready = service_manager.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "llm": service_manager.llm_warmup}
+    )
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check endpoint."""
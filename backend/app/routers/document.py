@@ -1,10 +1,13 @@
 import os
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from pathlib import Path
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
 from sqlalchemy.orm import Session
+from app.services.ingestion import INGEST_JOB
+from app.services.job_queue import JobQueue
 from app.services.rag_service import RAGService
-from app.config import ALLOWED_EXTENSIONS, MAX_FILE_SIZE
+from app.utils.service_manager import get_job_queue, get_rag_service, service_manager
+from app.config import ALLOWED_EXTENSIONS, INGEST_MODE, MAX_FILE_SIZE
 from app.models.document import DocumentCreate, DocumentList, DocumentResponse, DocumentDB
 from app.services.document_processor import DocumentProcessor
 from app.utils.file_utils import get_file_path, save_uploaded_file
@@ -13,14 +16,13 @@ from datetime import datetime
 from fastapi.responses import FileResponse, Response
 from fastapi import BackgroundTasks
 from app.routers.websocket import websocket_manager
-import asyncio
+from app.utils.executors import DB_POOL, EMBEDDING_POOL, EXTRACTION_POOL, run_in_executor
 import mimetypes
 
 import logging
 
 logger = logging.getLogger(__name__)
 
-rag_service = RAGService()
 router = APIRouter(
     prefix="/documents",
     tags=["documents"],
@@ -34,7 +36,8 @@ async def search_documents(
     top_k: int = Form(5),
     score_threshold: float = Form(0.3),
     document_ids: Optional[List[str]] = Form(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service)
 ):
     """Search for relevant document chunks using semantic similarity."""
     try:
@@ -44,11 +47,15 @@ async def search_documents(
         # Convert frontend document IDs to backend document_ids if provided
         backend_doc_ids = None
         if document_ids:
-            docs = db.query(DocumentDB).filter(DocumentDB.id.in_(document_ids)).all()
+            docs = await run_in_executor(
+                DB_POOL, lambda: db.query(DocumentDB).filter(DocumentDB.id.in_(document_ids)).all()
+            )
             backend_doc_ids = [doc.document_id for doc in docs if doc.document_id]
             print(f"🎯 Filtering search to {len(backend_doc_ids)} documents")
         
-        results = rag_service.search_documents(
+        results = await run_in_executor(
+            EMBEDDING_POOL,
+            rag_service.search_documents,
             query=query,
             top_k=min(top_k, 20),  # Limit to max 20 results
             score_threshold=max(0.0, min(1.0, score_threshold)),  # Clamp between 0-1
@@ -61,21 +68,102 @@ async def search_documents(
         return {"success": False, "error": f"Search failed: {str(e)}"}
 
 @router.get("/rag-stats")
-async def get_rag_stats():
+async def get_rag_stats(rag_service: RAGService = Depends(get_rag_service)):
     """Get RAG service statistics."""
     try:
         return rag_service.get_stats()
     except Exception as e:
         return {"error": f"Could not get stats: {str(e)}"}
 
+def get_document_row(db: Session, document_id: str) -> Optional[DocumentDB]:
+    return db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+
+
+def read_text_file(path) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def save_upload(db: Session, file: UploadFile, status: str) -> Tuple[DocumentDB, dict]:
+    """Save an uploaded file and record it; returns the row and its ingestion job payload."""
+    file_id, file_path = save_uploaded_file(file)
+    try:
+        document_id = f"{file_id}_{file.filename}"
+        metadata = {
+            'original_filename': file.filename,
+            'file_size': file.size,
+            'upload_timestamp': datetime.utcnow().isoformat(),
+            'file_hash': file_id
+        }
+        
+        # Create DB entry first; it is updated once the document is indexed
+        document = DocumentDB(
+            id=file_id,
+            filename=file.filename,
+            file_path=str(file_path),
+            file_type=os.path.splitext(file.filename)[1].lower(),
+            status=status,
+            document_id=document_id,
+            char_count=0,
+            chunks_created=0
+        )
+        db.add(document)
+        db.commit()
+        db.refresh(document)
+        
+        return document, {
+            'file_path': str(file_path),
+            'document_id': document_id,
+            'file_id': file_id,
+            'metadata': metadata
+        }
+    except Exception:
+        # Clean up file if something went wrong
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+
+def process_upload_inline(db: Session, rag_service: RAGService, file: UploadFile) -> DocumentDB:
+    """INGEST_MODE=inline: extract, embed and index the upload before responding."""
+    document, job = save_upload(db, file, status="processing")
+    rag_result = rag_service.process_and_store_document(
+        file_path=job['file_path'],
+        document_id=job['document_id'],
+        metadata=job['metadata']
+    )
+    
+    if not rag_result['success']:
+        db.delete(document)
+        db.commit()
+        os.remove(job['file_path'])
+        raise HTTPException(
+            status_code=500,
+            detail=f"RAG processing failed: {rag_result.get('error', 'Unknown error')}"
+        )
+    
+    document.status = "processed"
+    document.processed_path = rag_result['processed_path']
+    document.char_count = rag_result['char_count']
+    document.chunks_created = rag_result['chunks_created']
+    db.commit()
+    db.refresh(document)
+    return document
+
+
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    queue: JobQueue = Depends(get_job_queue),
+    rag_service: RAGService = Depends(get_rag_service)
 ):
     """
     Upload a document file (PDF, DOCX, TXT, etc.) to the system.
-    The file will be saved and processed for text extraction and indexed into the RAG pipeline.
+    The file is saved and queued; ingestion workers extract and embed it
+    and it is indexed into the RAG pipeline in the background. Poll
+    /documents/{id}/job for progress. With INGEST_MODE=inline it is
+    processed before the response instead.
     """
     # Validate file size
     if file.size and file.size > MAX_FILE_SIZE:
@@ -93,56 +181,16 @@ async def upload_document(
         )
     
     try:
-        # Save file and generate metadata
-        file_id, file_path = save_uploaded_file(file)
-        document_id = f"{file_id}_{file.filename}"
-        metadata = {
-            'original_filename': file.filename,
-            'file_size': file.size,
-            'upload_timestamp': datetime.utcnow().isoformat(),
-            'file_hash': file_id
-        }
-        
-        # Extract text from document
-        text, char_count = DocumentProcessor.process_document(file_path)
-        
-        # Process through RAG pipeline
-        rag_result = rag_service.process_and_store_document(
-            file_path=str(file_path),
-            document_id=document_id,
-            metadata=metadata
-        )
-        
-        if not rag_result['success']:
-            raise HTTPException(
-                status_code=500,
-                detail=f"RAG processing failed: {rag_result.get('error', 'Unknown error')}"
-            )
-
-        # Create and save document entry in DB
-        document = DocumentDB(
-            id=file_id,
-            filename=file.filename,
-            file_path=str(file_path),
-            file_type=os.path.splitext(file.filename)[1].lower(),
-            processed_path=str(file_path.parent.parent / "processed" / f"{file_id}.txt"),
-            status="processed",
-            char_count=char_count,
-            chunks_created=rag_result['chunks_created'],
-            document_id=document_id
-        )
-        
-        db.add(document)
-        db.commit()
-        db.refresh(document)
+        if INGEST_MODE == "inline":
+            return await run_in_executor(EXTRACTION_POOL, process_upload_inline, db, rag_service, file)
         
+        document, job = await run_in_executor(DB_POOL, save_upload, db, file, "queued")
+        await run_in_executor(DB_POOL, queue.enqueue, INGEST_JOB, job, ref=document.id)
         return document
         
+    except HTTPException:
+        raise
     except Exception as e:
-        # Clean up file if something went wrong
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
-        
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while processing the document: {str(e)}"
@@ -154,7 +202,8 @@ async def upload_documents_with_progress(
     background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(...),
     client_id: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    queue: JobQueue = Depends(get_job_queue)
 ):
     """
     Upload multiple documents with real-time progress updates via WebSocket.
@@ -183,52 +232,26 @@ async def upload_documents_with_progress(
             continue
         
         try:
-            # Save file and generate metadata
-            file_id, file_path = save_uploaded_file(file)
-            document_id = f"{file_id}_{file.filename}"
-            metadata = {
-                'original_filename': file.filename,
-                'file_size': file.size,
-                'upload_timestamp': datetime.utcnow().isoformat(),
-                'file_hash': file_id
-            }
-            
-            # Create DB entry first (with status='processing')
-            document = DocumentDB(
-                id=file_id,
-                filename=file.filename,
-                file_path=str(file_path),
-                file_type=os.path.splitext(file.filename)[1].lower(),
-                status="processing",
-                document_id=document_id,
-                char_count=0,
-                chunks_created=0
+            document, job = await run_in_executor(
+                DB_POOL, save_upload, db, file, "queued" if INGEST_MODE != "inline" else "processing"
             )
-            db.add(document)
-            db.commit()
-            db.refresh(document)
             
             # Send initial progress
             if client_id:
                 await websocket_manager.send_json(client_id, {
                     "type": "document_progress",
-                    "document_id": file_id,  # Use file_id for frontend tracking
+                    "document_id": document.id,  # Use file_id for frontend tracking
                     "filename": file.filename,
                     "stage": "starting",
                     "progress": 0,
                     "details": "Document saved, starting processing..."
                 })
             
-            # Process document asynchronously with progress
-            background_tasks.add_task(
-                process_document_async,
-                file_path=str(file_path),
-                document_id=document_id,
-                file_id=file_id,
-                metadata=metadata,
-                client_id=client_id,
-                db_document_id=document.id
-            )
+            if INGEST_MODE == "inline":
+                background_tasks.add_task(process_document_async, client_id=client_id, **job)
+            else:
+                # Workers report progress; the job monitor relays it to the websocket
+                await run_in_executor(DB_POOL, queue.enqueue, INGEST_JOB, {**job, 'client_id': client_id}, ref=document.id)
             
             uploaded_documents.append(document)
             
@@ -249,13 +272,14 @@ async def process_document_async(
     document_id: str,
     file_id: str,
     metadata: dict,
-    client_id: Optional[str],
-    db_document_id: str
+    client_id: Optional[str]
 ):
     """
-    Process document asynchronously with progress updates.
+    INGEST_MODE=inline: process a document in this process with progress updates.
     """
     try:
+        rag_service = service_manager.get_rag_service()
+        
         # Pass websocket_manager as parameter
         result = await rag_service.process_and_store_document_with_progress(
             file_path=file_path,
@@ -269,13 +293,18 @@ async def process_document_async(
         from app.database import SessionLocal
         db = SessionLocal()
         try:
-            document = db.query(DocumentDB).filter(DocumentDB.id == db_document_id).first()
-            if document and result['success']:
+            document = await run_in_executor(
+                DB_POOL, lambda: db.query(DocumentDB).filter(DocumentDB.id == file_id).first()
+            )
+            if document is None and result['success']:
+                # Deleted while it was being processed, possibly before its chunks were added
+                await run_in_executor(EMBEDDING_POOL, rag_service.remove_document, document_id)
+            elif document and result['success']:
                 document.status = "processed"
                 document.char_count = result.get('char_count', 0)
                 document.chunks_created = result.get('chunks_created', 0)
-                document.processed_path = str(Path(file_path).parent.parent / "processed" / f"{file_id}.txt")
-                db.commit()
+                document.processed_path = result['processed_path']
+                await run_in_executor(DB_POOL, db.commit)
                 
                 # Send completion
                 if client_id:
@@ -286,9 +315,9 @@ async def process_document_async(
                         "progress": 100,
                         "details": f"Successfully processed: {result['chunks_created']} chunks created"
                     })
-            elif not result['success']:
+            elif document and not result['success']:
                 document.status = "error"
-                db.commit()
+                await run_in_executor(DB_POOL, db.commit)
                 
                 if client_id:
                     await websocket_manager.send_json(client_id, {
@@ -312,6 +341,60 @@ async def process_document_async(
                 "details": str(e)
             })
 
+
+def _job_response(job: dict) -> dict:
+    return {
+        "job_id": job['id'],
+        "document_id": job['ref'],
+        "status": job['status'],
+        "stage": job['stage'],
+        "progress": job['progress'],
+        "details": job['details'],
+        "error": job['error'],
+        "attempts": job['attempts'],
+        "created_at": job['created_at'],
+        "updated_at": job['updated_at'],
+        "result": job['result']
+    }
+
+
+@router.get("/jobs", response_model=dict)
+async def list_jobs(
+    status: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    List ingestion jobs (oldest first) with queue statistics.
+    """
+    jobs = await run_in_executor(DB_POOL, queue.list_jobs, status=status, limit=limit)
+    return {
+        "jobs": [_job_response(job) for job in jobs],
+        "stats": await run_in_executor(DB_POOL, queue.get_stats)
+    }
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_job(job_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Get the status and progress of an ingestion job.
+    """
+    job = await run_in_executor(DB_POOL, queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+
+@router.get("/{document_id}/job", response_model=dict)
+async def get_document_job(document_id: str, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Get the latest ingestion job of a document.
+    """
+    job = await run_in_executor(DB_POOL, queue.latest_for_ref, document_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No ingestion job for this document")
+    return _job_response(job)
+
 @router.get("/", response_model=DocumentList)
 async def list_documents(
     skip: int = Query(0, ge=0),
@@ -321,9 +404,12 @@ async def list_documents(
     """
     List all uploaded documents with pagination, sorted by latest.
     """
-    try:
+    def load_documents():
         documents = db.query(DocumentDB).order_by(DocumentDB.created_at.desc()).offset(skip).limit(limit).all()
-        total_count = db.query(DocumentDB).count()
+        return documents, db.query(DocumentDB).count()
+    
+    try:
+        documents, total_count = await run_in_executor(DB_POOL, load_documents)
         
         return DocumentList(documents=documents, count=total_count)
     except Exception as e:
@@ -335,7 +421,7 @@ async def get_document(document_id: str, db: Session = Depends(get_db)):
     """
     Get a specific document by ID.
     """
-    document = db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+    document = await run_in_executor(DB_POOL, get_document_row, db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
@@ -343,68 +429,100 @@ async def get_document(document_id: str, db: Session = Depends(get_db)):
 
 
 @router.delete("/{document_id}", response_model=dict)
-async def delete_document(document_id: str, db: Session = Depends(get_db)):
+async def delete_document(
+    document_id: str,
+    db: Session = Depends(get_db),
+    queue: JobQueue = Depends(get_job_queue),
+    rag_service: RAGService = Depends(get_rag_service)
+):
     """
-    Delete a document by ID.
+    Delete a document by ID, including its chunks in the vector store
+    and any ingestion job still pending for it.
     """
-    document = db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+    document = await run_in_executor(DB_POOL, get_document_row, db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
     try:
-        # Delete file from storage
-        if os.path.exists(document.file_path):
-            os.remove(document.file_path)
+        # Cancel before removing the chunks: a job indexed after this is undone by the job monitor
+        cancelled = await run_in_executor(DB_POOL, queue.cancel_for_ref, document.id, "Document was deleted")
+        for job in cancelled:
+            artifact = (job['result'] or {}).get('artifact')
+            if artifact:
+                Path(artifact).unlink(missing_ok=True)
         
-        # Delete processed file if exists
-        if document.processed_path and os.path.exists(document.processed_path):
-            os.remove(document.processed_path)
+        # Remove the chunks first so a failure leaves the document deletable again
+        chunks_removed = await run_in_executor(EMBEDDING_POOL, rag_service.remove_document, document.document_id)
         
-        # Delete from database
-        db.delete(document)
-        db.commit()
+        def remove_document():
+            # Delete file from storage
+            if os.path.exists(document.file_path):
+                os.remove(document.file_path)
+            
+            # Delete processed file if exists
+            if document.processed_path and os.path.exists(document.processed_path):
+                os.remove(document.processed_path)
+            
+            # Delete from database
+            db.delete(document)
+            db.commit()
         
-        return {"message": "Document deleted successfully"}
+        await run_in_executor(DB_POOL, remove_document)
+        
+        return {"message": "Document deleted successfully", "chunks_removed": chunks_removed}
     
     except Exception as e:
-        db.rollback()
+        await run_in_executor(DB_POOL, db.rollback)
         raise HTTPException(
             status_code=500,
             detail=f"An error occurred while deleting the document: {str(e)}"
         )
     
 @router.post("/reset-vector-store", response_model=dict)
-async def reset_vector_store_and_rebuild(db: Session = Depends(get_db)):
+async def reset_vector_store_and_rebuild(
+    db: Session = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service)
+):
     """
-    Admin-only endpoint: Clears the vector store and reprocesses all documents.
+    Admin-only endpoint: Rebuilds the vector store from all documents.
+
+    The new store is built in the background next to the live one, which
+    keeps serving queries, and replaces it when complete. Progress is
+    reported by GET /reset-vector-store/status.
     """
+    def list_documents() -> List[dict]:
+        return [
+            {
+                'document_id': doc.document_id,
+                'file_path': doc.file_path,
+                'filename': doc.filename,
+                'created_at': doc.created_at.isoformat(),
+                'file_hash': doc.id
+            }
+            for doc in db.query(DocumentDB).all()
+            if doc.document_id
+        ]
+
     try:
-        rag_service.vector_store.clear()
-        
-        documents = db.query(DocumentDB).all()
-        reprocessed = []
-        for doc in documents:
-            result = rag_service.process_and_store_document(
-                file_path=doc.file_path,
-                document_id=doc.document_id,
-                metadata={
-                    'original_filename': doc.filename,
-                    'file_size': os.path.getsize(doc.file_path),
-                    'upload_timestamp': doc.created_at.isoformat(),
-                    'file_hash': doc.id
-                }
-            )
-            if result['success']:
-                reprocessed.append(doc.document_id)
+        documents = await run_in_executor(DB_POOL, list_documents)
+        status = rag_service.rebuild.start(documents)
 
         return {
             "success": True,
-            "message": f"Vector store cleared and rebuilt for {len(reprocessed)} documents.",
-            "documents_reprocessed": reprocessed
+            "message": f"Rebuilding the vector store from {len(documents)} documents.",
+            "rebuild": status
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Reset failed: {str(e)}")
+
+
+@router.get("/reset-vector-store/status", response_model=dict)
+async def get_vector_store_rebuild_status(rag_service: RAGService = Depends(get_rag_service)):
+    """
+    Get the progress of the vector store rebuild started by /reset-vector-store.
+    """
+    return rag_service.rebuild.get_status()
     
 
 @router.get("/{document_id}/content")
@@ -414,20 +532,26 @@ async def get_document_content(document_id: str, db: Session = Depends(get_db)):
     Returns the extracted text content from the document.
     """
     # Get document from database
-    document = db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+    document = await run_in_executor(DB_POOL, get_document_row, db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    try:
-        # Try to read from processed file first
-        if document.processed_path and os.path.exists(document.processed_path):
-            with open(document.processed_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+    def load_content() -> str:
+        # Try to read from processed file first (older rows may point at
+        # a path that was never written)
+        processed_path = document.processed_path
+        if not (processed_path and os.path.exists(processed_path)):
+            processed_path = str(DocumentProcessor.processed_path(document.file_path))
+        if os.path.exists(processed_path):
+            return read_text_file(processed_path)
         elif os.path.exists(document.file_path):
             # If processed file doesn't exist, extract content on-the-fly
             content, _ = DocumentProcessor.process_document(document.file_path)
-        else:
-            raise HTTPException(status_code=404, detail="Document file not found on disk")
+            return content
+        raise HTTPException(status_code=404, detail="Document file not found on disk")
+    
+    try:
+        content = await run_in_executor(EXTRACTION_POOL, load_content)
         
         return {
             "success": True,
@@ -452,7 +576,7 @@ async def preview_document(
     """
     Preview a document in the browser.
     """
-    document = db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+    document = await run_in_executor(DB_POOL, get_document_row, db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
@@ -479,8 +603,7 @@ async def preview_document(
         try:
             if document.processed_path and Path(document.processed_path).exists():
                 # Return processed text content
-                with open(document.processed_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                content = await run_in_executor(EXTRACTION_POOL, read_text_file, document.processed_path)
                 return Response(
                     content=content,
                     media_type="text/plain",
@@ -490,8 +613,7 @@ async def preview_document(
                 )
             else:
                 # Try to read original file as text
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                content = await run_in_executor(EXTRACTION_POOL, read_text_file, file_path)
                 return Response(
                     content=content,
                     media_type="text/plain"
@@ -512,7 +634,7 @@ async def download_document(
     """
     Download a document.
     """
-    document = db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+    document = await run_in_executor(DB_POOL, get_document_row, db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
@@ -538,15 +660,14 @@ async def get_document_content(
     """
     Get the extracted text content of a document.
     """
-    document = db.query(DocumentDB).filter(DocumentDB.id == document_id).first()
+    document = await run_in_executor(DB_POOL, get_document_row, db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Try to get processed content first
     if document.processed_path and Path(document.processed_path).exists():
         try:
-            with open(document.processed_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = await run_in_executor(EXTRACTION_POOL, read_text_file, document.processed_path)
             return {
                 "success": True,
                 "document_id": document_id,
@@ -559,8 +680,7 @@ async def get_document_content(
     
     # If no processed content, try to extract on the fly
     try:
-        from app.services.document_processor import DocumentProcessor
-        text, char_count = DocumentProcessor.process_document(document.file_path)
+        text, char_count = await run_in_executor(EXTRACTION_POOL, DocumentProcessor.process_document, document.file_path)
         return {
             "success": True,
             "document_id": document_id,
@@ -1,34 +1,35 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import Annotated, List, Dict, Any, Literal, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from datetime import datetime  
 import logging
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import time
 import hashlib
 
 from app.services.rag_service import RAGService
+from app.services.answer_cache import context_fingerprint
 from app.services.llm import LLMService
 from app.database import get_db
+from app.config import (
+    BATCH_LLM_CONCURRENCY, BATCH_QUERY_MAX_QUESTIONS,
+    RERANK_CANDIDATES, RERANK_ENABLED, RERANK_LATENCY_BUDGET_MS
+)
+from app.utils.service_manager import get_llm_service, get_rag_service
 from app.models.query import (
     QueryHistoryDB, AnalyticsStatsDB, 
     QueryHistoryResponse, QueryHistoryList,
     AnalyticsStats, PopularQuestion, PopularQuestionsResponse
 )
 from app.models.document import DocumentDB
+from app.utils.streaming import format_sse
+from app.utils.executors import DB_POOL, EMBEDDING_POOL, run_in_executor
 
 logger = logging.getLogger(__name__)
 
-# Initialize services (singleton pattern for better performance)
-rag_service = RAGService()
-llm_service = LLMService()
-
-# Thread pool for CPU-intensive operations
-executor = ThreadPoolExecutor(max_workers=2)
-
 router = APIRouter(prefix="/query", tags=["query"])
 
 
@@ -41,6 +42,9 @@ class QueryRequest(BaseModel):
     max_tokens: int = Field(default=512, ge=50, le=2048, description="Maximum tokens in response")
     temperature: float = Field(default=0.3, ge=0.0, le=1.0, description="LLM temperature")
     document_ids: Optional[List[str]] = Field(default=None, description="Selected document IDs to search within")
+    rerank: Optional[bool] = Field(default=None, description="Rerank retrieved chunks with a cross-encoder (default: server setting)")
+    latency_budget_ms: Optional[float] = Field(default=None, ge=0, description="Retrieval time budget; reranking is skipped if it would not fit (0 = none)")
+    use_cache: bool = Field(default=True, description="Serve a cached answer to a similar question with the same context")
 
 class SourceInfo(BaseModel):
     """Source information for citations."""
@@ -58,6 +62,46 @@ class QueryResponse(BaseModel):
     llm_used: Optional[str] = None
     response_time: float
     context_chunks_count: int
+    reranked: Optional[bool] = None
+    cached: Optional[bool] = None
+    error: Optional[str] = None
+
+
+class BatchQueryRequest(BaseModel):
+    """Request model for answering many questions in one call."""
+    questions: List[Annotated[str, Field(min_length=3, max_length=1000)]] = Field(
+        ..., min_length=1, max_length=BATCH_QUERY_MAX_QUESTIONS, description="Questions to answer"
+    )
+    top_k: int = Field(default=5, ge=1, le=20, description="Number of context chunks to retrieve per question")
+    score_threshold: float = Field(default=0.3, ge=0.0, le=1.0, description="Minimum similarity score")
+    max_tokens: int = Field(default=512, ge=50, le=2048, description="Maximum tokens in each response")
+    temperature: float = Field(default=0.3, ge=0.0, le=1.0, description="LLM temperature")
+    document_ids: Optional[List[str]] = Field(default=None, description="Selected document IDs to search within")
+    max_concurrency: int = Field(default=BATCH_LLM_CONCURRENCY, ge=1, le=32, description="Maximum concurrent LLM calls")
+
+
+class BatchQueryResult(QueryResponse):
+    """Answer to one question of a batch; response_time is measured from the start of the batch."""
+    question: str
+
+
+class BatchQueryStats(BaseModel):
+    """Aggregate timing and throughput of a batch."""
+    questions: int
+    succeeded: int
+    failed: int
+    unique_chunks: int
+    retrieval_time: float
+    generation_time: float
+    total_time: float
+    questions_per_second: float
+
+
+class BatchQueryResponse(BaseModel):
+    """Response model for batch question answering."""
+    success: bool
+    results: List[BatchQueryResult]
+    stats: BatchQueryStats
     error: Optional[str] = None
 
 
@@ -66,6 +110,15 @@ class SearchRequest(BaseModel):
     query: str = Field(..., min_length=3, max_length=500, description="Search query")
     top_k: int = Field(default=10, ge=1, le=50, description="Number of results to return")
     score_threshold: float = Field(default=0.2, ge=0.0, le=1.0, description="Minimum similarity score")
+    mode: Optional[Literal["dense", "lexical", "hybrid"]] = Field(
+        default=None, description="Retrieval mode (defaults to the server's SEARCH_MODE)"
+    )
+    fusion: Optional[Literal["rrf", "weighted"]] = Field(
+        default=None, description="How hybrid mode fuses dense and BM25 rankings"
+    )
+    alpha: Optional[float] = Field(
+        default=None, ge=0.0, le=1.0, description="Weight of the dense score in weighted fusion"
+    )
 
 
 class SearchResponse(BaseModel):
@@ -117,6 +170,12 @@ def save_query_to_history(db: Session, question: str, response: QueryResponse):
         db.rollback()
 
 
+def save_batch_to_history(db: Session, results: List[BatchQueryResult]):
+    """Save every answer of a batch to history."""
+    for result in results:
+        save_query_to_history(db, result.question, result)
+
+
 def update_document_count(db: Session):
     """Update document count in analytics."""
     try:
@@ -129,10 +188,106 @@ def update_document_count(db: Session):
         logger.error(f"Error updating document count: {e}")
 
 
+def resolve_document_ids(db: Session, document_ids: Optional[List[str]]) -> List[str]:
+    """Convert frontend document IDs to the vector store's document_ids."""
+    if not document_ids:
+        return []
+    selected_docs = db.query(DocumentDB).filter(
+        DocumentDB.id.in_(document_ids)
+    ).all()
+    return [f"{doc.id}_{doc.filename}" for doc in selected_docs]
+
+
+def attach_document_info(db: Session, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add document name and type from the database to each chunk."""
+    doc_ids = {chunk.get('document_id') for chunk in chunks if chunk.get('document_id')}
+    documents = {
+        document.document_id: document
+        for document in db.query(DocumentDB).filter(DocumentDB.document_id.in_(doc_ids)).all()
+    } if doc_ids else {}
+    
+    for chunk in chunks:
+        doc_id = chunk.get('document_id')
+        if doc_id:
+            document = documents.get(doc_id)
+            if document:
+                chunk['document_name'] = document.filename
+                chunk['document_type'] = document.file_type
+            else:
+                chunk['document_name'] = f"Document {doc_id}"
+    
+    return chunks
+
+
+async def retrieve_chunks(
+    rag_service: RAGService,
+    request: QueryRequest,
+    query: str,
+    document_ids: Optional[List[str]],
+    start_time: float,
+    score_threshold: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Search for ``query`` and, when reranking is on, over-retrieve candidates
+    and reorder them with the cross-encoder.
+    
+    The result carries 'reranked' (None when reranking was not requested).
+    Reranking is skipped if the request's latency budget is already spent
+    or would be exceeded.
+    """
+    rerank = request.rerank if request.rerank is not None else RERANK_ENABLED
+    search_results = await run_in_executor(
+        EMBEDDING_POOL,
+        rag_service.search_documents,
+        query=query,
+        top_k=max(request.top_k, RERANK_CANDIDATES) if rerank else request.top_k,
+        score_threshold=request.score_threshold if score_threshold is None else score_threshold,
+        document_ids=document_ids if document_ids else None
+    )
+    if not rerank or not search_results.get('success') or not search_results.get('results'):
+        return {**search_results, 'reranked': None if not rerank else False}
+    
+    budget_ms = request.latency_budget_ms if request.latency_budget_ms is not None else RERANK_LATENCY_BUDGET_MS
+    remaining_ms = budget_ms - (time.time() - start_time) * 1000 if budget_ms else None
+    if remaining_ms is not None and remaining_ms <= 0:
+        logger.info("⏱️ Latency budget spent during retrieval, skipping rerank")
+        return {**search_results, 'results': search_results['results'][:request.top_k], 'reranked': False}
+    
+    reranked = await run_in_executor(
+        EMBEDDING_POOL, rag_service.rerank, query, search_results['results'], request.top_k, remaining_ms
+    )
+    return {**search_results, 'results': reranked['results'], 'reranked': reranked['reranked']}
+
+
+def build_sources(chunks: List[Dict[str, Any]]) -> List[SourceInfo]:
+    """Format the top chunks as citations, one per document."""
+    sources = []
+    seen_documents = set()
+    
+    for chunk in chunks[:3]:  # Top 3 sources
+        doc_name = chunk.get('document_name', 'Unknown')
+        
+        # Avoid duplicate documents
+        if doc_name in seen_documents:
+            continue
+        seen_documents.add(doc_name)
+        
+        sources.append(SourceInfo(
+            document_name=doc_name,
+            page=chunk.get('page'),
+            similarity_score=round(chunk.get('similarity_score', 0.0), 3),
+            content=chunk.get('text', '')[:200] + "..." if chunk.get('text') else "No content available"
+        ))
+    
+    return sources
+
+
 @router.post("/ask", response_model=QueryResponse)
 async def ask_question(
     request: QueryRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """
     Ask a question and get an AI-generated answer with proper sources.
@@ -142,21 +297,12 @@ async def ask_question(
     
     try:
         # Step 1: Use RAG service for search (your excellent search)
-        selected_doc_ids = []
-        if request.document_ids:
-            # Convert frontend document IDs to backend document_ids
-            selected_docs = db.query(DocumentDB).filter(
-                DocumentDB.id.in_(request.document_ids)
-            ).all()
-            selected_doc_ids = [f"{doc.id}_{doc.filename}" for doc in selected_docs]
-            
+        selected_doc_ids = await run_in_executor(DB_POOL, resolve_document_ids, db, request.document_ids)
+        if selected_doc_ids:
             logger.info(f"🎯 Filtering search to {len(selected_doc_ids)} documents: {selected_doc_ids[:3]}...")
         
-        search_results = rag_service.search_documents(
-            query=request.question,
-            top_k=request.top_k,
-            score_threshold=request.score_threshold,
-            document_ids=selected_doc_ids if selected_doc_ids else None
+        search_results = await retrieve_chunks(
+            rag_service, request, request.question, selected_doc_ids, start_time
         )
         
         if not search_results.get('success') or not search_results.get('results'):
@@ -171,68 +317,55 @@ async def ask_question(
             )
         
         # Step 2: Get document information for proper source attribution
-        chunks = search_results['results'][:request.top_k]
-        
-        # Enhance chunks with document information
-        enhanced_chunks = []
-        for chunk in chunks:
-            doc_id = chunk.get('document_id')
-            if doc_id:
-                # Get document info from database
-                document = db.query(DocumentDB).filter(DocumentDB.document_id == doc_id).first()
-                if document:
-                    chunk['document_name'] = document.filename
-                    chunk['document_type'] = document.file_type
-                else:
-                    chunk['document_name'] = f"Document {doc_id}"
-            
-            enhanced_chunks.append(chunk)
-        
-        logger.info(f"🧠 Generating answer with {len(enhanced_chunks)} context chunks")
-        
-        # Step 3: Generate answer using LLM with enhanced chunks
-        llm_result = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            llm_service.generate_answer,
-            enhanced_chunks,
-            request.question,
-            request.max_tokens,
-            request.temperature
-            
-        )
-        
-        # Step 4: Format sources properly
-        sources = []
-        seen_documents = set()
+        enhanced_chunks = await run_in_executor(DB_POOL, attach_document_info, db, search_results['results'][:request.top_k])
+        
+        # Step 3: Reuse the answer to a similar question asked with the same context
+        answer_cache = rag_service.answer_cache if request.use_cache else None
+        cached = None
+        if answer_cache is not None:
+            fingerprint = context_fingerprint(
+                enhanced_chunks, max_tokens=request.max_tokens, temperature=request.temperature
+            )
+            cached = await run_in_executor(EMBEDDING_POOL, answer_cache.get, request.question, fingerprint)
         
-        for chunk in enhanced_chunks[:3]:  # Top 3 sources
-            doc_name = chunk.get('document_name', 'Unknown')
-            
-            # Avoid duplicate documents
-            if doc_name in seen_documents:
-                continue
-            seen_documents.add(doc_name)
+        if cached is not None:
+            logger.info(f"♻️ Answer cache hit (similarity {cached['similarity']:.3f}): '{cached['question'][:50]}'")
+            llm_result = cached['response']
+        else:
+            logger.info(f"🧠 Generating answer with {len(enhanced_chunks)} context chunks")
             
-            source_info = SourceInfo(
-                document_name=doc_name,
-                page=chunk.get('page'),
-                similarity_score=round(chunk.get('similarity_score', 0.0), 3),
-                content=chunk.get('text', '')[:200] + "..." if chunk.get('text') else "No content available"
+            # Step 4: Generate answer using LLM with enhanced chunks
+            generation_start = time.time()
+            llm_result = await llm_service.agenerate_answer(
+                enhanced_chunks,
+                request.question,
+                request.max_tokens,
+                request.temperature
             )
-            sources.append(source_info)
+            if answer_cache is not None and llm_result.get('success', True):
+                await run_in_executor(
+                    EMBEDDING_POOL, answer_cache.put, request.question, fingerprint,
+                    {'answer': llm_result['answer'], 'llm_used': llm_result.get('llm_used')},
+                    time.time() - generation_start
+                )
+        
+        # Step 5: Format sources properly
+        sources = build_sources(enhanced_chunks)
         
-        # Step 5: Create response
+        # Step 6: Create response
         response = QueryResponse(
             success=True,
             answer=llm_result['answer'],
             sources=sources,
             llm_used=llm_result.get('llm_used'),
             response_time=time.time() - start_time,
-            context_chunks_count=len(enhanced_chunks)
+            context_chunks_count=len(enhanced_chunks),
+            reranked=search_results.get('reranked'),
+            cached=cached is not None if answer_cache is not None else None
         )
         
-        # Step 6: Save to history
-        save_query_to_history(db, request.question, response)
+        # Step 7: Save to history
+        await run_in_executor(DB_POOL, save_query_to_history, db, request.question, response)
         
         logger.info(f"✅ Question answered in {response.response_time:.2f}s using {response.llm_used}")
         
@@ -249,11 +382,110 @@ async def ask_question(
             error=str(e)
         )
 
+@router.post("/ask/stream")
+async def ask_question_stream(
+    request: QueryRequest,
+    db: Session = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Ask a question and stream the answer as Server-Sent Events.
+    
+    Events, in order:
+    - ``sources``: citations, sent right after retrieval
+    - ``token``: one per answer text delta
+    - ``done``: the final QueryResponse fields plus time_to_first_token
+    """
+    start_time = time.time()
+    logger.info(f"🤔 Streaming answer for: '{request.question[:50]}...'")
+    
+    selected_doc_ids = await run_in_executor(DB_POOL, resolve_document_ids, db, request.document_ids)
+    search_results = await retrieve_chunks(
+        rag_service, request, request.question, selected_doc_ids, start_time
+    )
+    
+    async def event_stream():
+        if not search_results.get('success') or not search_results.get('results'):
+            logger.warning("No relevant documents found")
+            response = QueryResponse(
+                success=False,
+                answer="I couldn't find any relevant information in the documents to answer your question.",
+                sources=[],
+                response_time=time.time() - start_time,
+                context_chunks_count=0,
+                error="No relevant documents found"
+            )
+            yield format_sse("done", response.model_dump())
+            return
+        
+        enhanced_chunks = await run_in_executor(DB_POOL, attach_document_info, db, search_results['results'][:request.top_k])
+        sources = build_sources(enhanced_chunks)
+        
+        yield format_sse("sources", {
+            "sources": [source.model_dump() for source in sources],
+            "context_chunks_count": len(enhanced_chunks),
+            "retrieval_time": time.time() - start_time,
+            "reranked": search_results.get('reranked')
+        })
+        
+        result = {}
+        try:
+            async for event in llm_service.stream_answer(
+                enhanced_chunks,
+                request.question,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature
+            ):
+                if event["type"] == "token":
+                    yield format_sse("token", {"content": event["content"]})
+                else:
+                    result = event
+        except Exception as e:
+            logger.error(f"❌ Error streaming answer: {e}")
+            result = {"type": "error", "error": str(e)}
+        
+        if result.get("type") == "error":
+            response = QueryResponse(
+                success=False,
+                answer=result.get("partial_answer") or "I apologize, but I encountered an error while processing your question.",
+                sources=sources,
+                llm_used=result.get("llm_used"),
+                response_time=time.time() - start_time,
+                context_chunks_count=len(enhanced_chunks),
+                error=result.get("error")
+            )
+        else:
+            response = QueryResponse(
+                success=result.get("success", False),
+                answer=result.get("answer", ""),
+                sources=sources,
+                llm_used=result.get("llm_used"),
+                response_time=time.time() - start_time,
+                context_chunks_count=len(enhanced_chunks),
+                error=result.get("error")
+            )
+        
+        await run_in_executor(DB_POOL, save_query_to_history, db, request.question, response)
+        
+        logger.info(f"✅ Streamed answer in {response.response_time:.2f}s using {response.llm_used} (TTFT: {result.get('time_to_first_token')})")
+        
+        yield format_sse("done", {**response.model_dump(), "time_to_first_token": result.get("time_to_first_token")})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/ask-with-context", response_model=QueryResponse)
 async def ask_question_with_context(
     request: QueryRequest,
     conversation_context: List[Dict[str, str]] = Body(default=[]),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service),
+    llm_service: LLMService = Depends(get_llm_service)
 ):
     """
     Ask a question with conversation context for follow-up questions.
@@ -280,29 +512,19 @@ async def ask_question_with_context(
     
     try:
         # Step 1: Search with enhanced understanding
-        selected_doc_ids = []
-        if request.document_ids:
-            selected_docs = db.query(DocumentDB).filter(
-                DocumentDB.id.in_(request.document_ids)
-            ).all()
-            selected_doc_ids = [f"{doc.id}_{doc.filename}" for doc in selected_docs]
+        selected_doc_ids = await run_in_executor(DB_POOL, resolve_document_ids, db, request.document_ids)
         
         # Use original question for search but consider context
-        search_results = rag_service.search_documents(
-            query=request.question,  # Original question for better search
-            top_k=request.top_k,
-            score_threshold=request.score_threshold,
-            document_ids=selected_doc_ids if selected_doc_ids else None
+        search_results = await retrieve_chunks(
+            rag_service, request, request.question, selected_doc_ids, start_time  # Original question for better search
         )
         
         if not search_results.get('success') or not search_results.get('results'):
             # Try searching with full context if no results
             if conversation_context:
-                search_results = rag_service.search_documents(
-                    query=enhanced_question,
-                    top_k=request.top_k,
-                    score_threshold=request.score_threshold * 0.8,  # Lower threshold for context queries
-                    document_ids=selected_doc_ids if selected_doc_ids else None
+                search_results = await retrieve_chunks(
+                    rag_service, request, enhanced_question, selected_doc_ids, start_time,
+                    score_threshold=request.score_threshold * 0.8  # Lower threshold for context queries
                 )
         
         if not search_results.get('success') or not search_results.get('results'):
@@ -316,24 +538,10 @@ async def ask_question_with_context(
             )
         
         # Step 2: Enhance chunks with document info
-        chunks = search_results['results'][:request.top_k]
-        enhanced_chunks = []
-        
-        for chunk in chunks:
-            doc_id = chunk.get('document_id')
-            if doc_id:
-                document = db.query(DocumentDB).filter(DocumentDB.document_id == doc_id).first()
-                if document:
-                    chunk['document_name'] = document.filename
-                    chunk['document_type'] = document.file_type
-                else:
-                    chunk['document_name'] = f"Document {doc_id}"
-            enhanced_chunks.append(chunk)
+        enhanced_chunks = await run_in_executor(DB_POOL, attach_document_info, db, search_results['results'][:request.top_k])
         
         # Step 3: Generate context-aware answer
-        llm_result = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            llm_service.generate_answer,
+        llm_result = await llm_service.agenerate_answer(
             enhanced_chunks,
             enhanced_question,  # Pass the context-enhanced question
             request.max_tokens,
@@ -341,22 +549,7 @@ async def ask_question_with_context(
         )
         
         # Step 4: Format sources
-        sources = []
-        seen_documents = set()
-        
-        for chunk in enhanced_chunks[:3]:
-            doc_name = chunk.get('document_name', 'Unknown')
-            if doc_name in seen_documents:
-                continue
-            seen_documents.add(doc_name)
-            
-            source_info = SourceInfo(
-                document_name=doc_name,
-                page=chunk.get('page'),
-                similarity_score=round(chunk.get('similarity_score', 0.0), 3),
-                content=chunk.get('text', '')[:200] + "..." if chunk.get('text') else "No content available"
-            )
-            sources.append(source_info)
+        sources = build_sources(enhanced_chunks)
         
         response = QueryResponse(
             success=True,
@@ -364,11 +557,12 @@ async def ask_question_with_context(
             sources=sources,
             llm_used=llm_result.get('llm_used'),
             response_time=time.time() - start_time,
-            context_chunks_count=len(enhanced_chunks)
+            context_chunks_count=len(enhanced_chunks),
+            reranked=search_results.get('reranked')
         )
         
         # Save to history
-        save_query_to_history(db, request.question, response)
+        await run_in_executor(DB_POOL, save_query_to_history, db, request.question, response)
         
         logger.info(f"✅ Context-aware question answered in {response.response_time:.2f}s")
         
@@ -385,6 +579,113 @@ async def ask_question_with_context(
             error=str(e)
         )
 
+@router.post("/ask-batch", response_model=BatchQueryResponse)
+async def ask_question_batch(
+    request: BatchQueryRequest,
+    db: Session = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service),
+    llm_service: LLMService = Depends(get_llm_service)
+):
+    """
+    Answer many questions in one call (evaluation runs, bulk FAQ generation).
+    
+    All questions are embedded and searched together, then answered by at
+    most ``max_concurrency`` concurrent LLM calls. Results are returned in
+    question order, each with its own success flag.
+    """
+    start_time = time.time()
+    logger.info(f"📦 Processing batch of {len(request.questions)} questions")
+    
+    # Step 1: One embedding batch and one index search for every question
+    selected_doc_ids = await run_in_executor(DB_POOL, resolve_document_ids, db, request.document_ids)
+    search_results = await run_in_executor(
+        EMBEDDING_POOL,
+        rag_service.search_batch,
+        queries=request.questions,
+        top_k=request.top_k,
+        score_threshold=request.score_threshold,
+        document_ids=selected_doc_ids if selected_doc_ids else None
+    )
+    
+    # Step 2: One document lookup for the chunks of every question
+    contexts = [item['results'][:request.top_k] for item in search_results['results']]
+    await run_in_executor(DB_POOL, attach_document_info, db, [chunk for chunks in contexts for chunk in chunks])
+    retrieval_time = time.time() - start_time
+    
+    # Step 3: Generate answers with bounded concurrency
+    semaphore = asyncio.Semaphore(request.max_concurrency)
+    
+    async def answer(question: str, chunks: List[Dict[str, Any]]) -> BatchQueryResult:
+        if not chunks:
+            return BatchQueryResult(
+                question=question,
+                success=False,
+                answer="I couldn't find any relevant information in the documents to answer your question.",
+                sources=[],
+                response_time=time.time() - start_time,
+                context_chunks_count=0,
+                error=search_results.get('error') or "No relevant documents found"
+            )
+        try:
+            async with semaphore:
+                llm_result = await llm_service.agenerate_answer(
+                    chunks,
+                    question,
+                    request.max_tokens,
+                    request.temperature
+                )
+            return BatchQueryResult(
+                question=question,
+                success=llm_result.get('success', False),
+                answer=llm_result['answer'],
+                sources=build_sources(chunks),
+                llm_used=llm_result.get('llm_used'),
+                response_time=time.time() - start_time,
+                context_chunks_count=len(chunks),
+                error=llm_result.get('error')
+            )
+        except Exception as e:
+            logger.error(f"❌ Error answering batch question '{question[:50]}': {e}")
+            return BatchQueryResult(
+                question=question,
+                success=False,
+                answer="I apologize, but I encountered an error while processing your question.",
+                sources=[],
+                response_time=time.time() - start_time,
+                context_chunks_count=len(chunks),
+                error=str(e)
+            )
+    
+    generation_start = time.time()
+    results = await asyncio.gather(*[
+        answer(question, chunks) for question, chunks in zip(request.questions, contexts)
+    ])
+    generation_time = time.time() - generation_start
+    
+    # Step 4: Save to history
+    await run_in_executor(DB_POOL, save_batch_to_history, db, results)
+    
+    total_time = time.time() - start_time
+    succeeded = sum(1 for result in results if result.success)
+    logger.info(f"✅ Answered {succeeded}/{len(results)} batch questions in {total_time:.2f}s")
+    
+    return BatchQueryResponse(
+        success=search_results.get('success', False),
+        results=results,
+        stats=BatchQueryStats(
+            questions=len(results),
+            succeeded=succeeded,
+            failed=len(results) - succeeded,
+            unique_chunks=search_results.get('unique_chunks', 0),
+            retrieval_time=retrieval_time,
+            generation_time=generation_time,
+            total_time=total_time,
+            questions_per_second=len(results) / total_time if total_time > 0 else 0.0
+        ),
+        error=search_results.get('error')
+    )
+
+
 @router.get("/history", response_model=QueryHistoryList)
 async def get_query_history(
     limit: int = Query(50, ge=1, le=500, description="Maximum number of queries to return"),
@@ -395,7 +696,7 @@ async def get_query_history(
     Get query history with pagination.
     Returns recent queries ordered by creation time (newest first).
     """
-    try:
+    def load_history():
         # Get total count
         total_count = db.query(QueryHistoryDB).count()
         
@@ -407,6 +708,10 @@ async def get_query_history(
             .limit(limit)
             .all()
         )
+        return total_count, queries
+    
+    try:
+        total_count, queries = await run_in_executor(DB_POOL, load_history)
         
         return QueryHistoryList(
             queries=queries,
@@ -421,7 +726,10 @@ async def get_query_history(
 
 
 @router.post("/search", response_model=SearchResponse)
-async def search_documents(request: SearchRequest):
+async def search_documents(
+    request: SearchRequest,
+    rag_service: RAGService = Depends(get_rag_service)
+):
     """
     Search through uploaded documents for relevant chunks.
     
@@ -432,10 +740,15 @@ async def search_documents(request: SearchRequest):
         logger.info(f"🔍 Searching with RAG service: '{request.query[:50]}...'")
         
         # Use the same RAG service that powers /documents/search
-        rag_results = rag_service.search_documents(
+        rag_results = await run_in_executor(
+            EMBEDDING_POOL,
+            rag_service.search_documents,
             query=request.query,
             top_k=min(request.top_k, 50),  # Reasonable limit
-            score_threshold=max(0.0, min(1.0, request.score_threshold))
+            score_threshold=max(0.0, min(1.0, request.score_threshold)),
+            mode=request.mode,
+            fusion=request.fusion,
+            alpha=request.alpha
         )
         
         # Check if RAG service returned results
@@ -458,6 +771,7 @@ async def search_documents(request: SearchRequest):
                 'document_name': result.get('source', result.get('document_name', 'Unknown')),
                 'chunk_index': result.get('chunk_index', 0),
                 'rank': result.get('rank', len(formatted_results) + 1),
+                **{key: float(result[key]) for key in ('bm25_score', 'hybrid_score') if key in result},
                 'metadata': {
                     'page': result.get('page'),
                     'source': result.get('source'),
@@ -488,7 +802,10 @@ async def search_documents(request: SearchRequest):
 
 
 @router.get("/status")
-async def get_service_status():
+async def get_service_status(
+    rag_service: RAGService = Depends(get_rag_service),
+    llm_service: LLMService = Depends(get_llm_service)
+):
     """
     Get the status of all RAG and LLM services.
     
@@ -522,7 +839,10 @@ async def get_service_status():
 
 
 @router.get("/health")
-async def health_check():
+async def health_check(
+    rag_service: RAGService = Depends(get_rag_service),
+    llm_service: LLMService = Depends(get_llm_service)
+):
     """Simple health check for the query service."""
     try:
         # Test if services are responsive
@@ -543,7 +863,11 @@ async def health_check():
 
 # Helper endpoint for testing prompts (development only)
 @router.post("/test-prompt")
-async def test_prompt(question: str, context: str = "Test context"):
+async def test_prompt(
+    question: str,
+    context: str = "Test context",
+    llm_service: LLMService = Depends(get_llm_service)
+):
     """
     Test endpoint for prompt engineering.
     Only use this for development and testing.
@@ -558,9 +882,7 @@ async def test_prompt(question: str, context: str = "Test context"):
         }]
         
         # Generate answer
-        result = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            llm_service.generate_answer,
+        result = await llm_service.agenerate_answer(
             mock_chunks,
             question
         )
@@ -4,6 +4,8 @@ import platform
 import psutil
 from typing import Dict, Any
 
+from app.utils.executors import executor_stats, lag_monitor
+
 router = APIRouter(prefix="/system", tags=["system"])
 
 @router.get("/capabilities")
@@ -47,4 +49,13 @@ async def get_system_capabilities() -> Dict[str, Any]:
         "gpu": gpu_info,
         "system": system_info,
         "model": model_info
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/event-loop")
+async def get_event_loop_stats() -> Dict[str, Any]:
+    """Event loop lag and the load on the executors that keep blocking work off it"""
+    return {
+        "event_loop_lag": lag_monitor.get_stats(),
+        "executors": executor_stats()
+    }
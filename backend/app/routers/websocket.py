@@ -1,13 +1,12 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from typing import Dict, Any
 import json
-import asyncio
 import logging
 from datetime import datetime
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.services.llm import LLMService
+from app.utils.service_manager import service_manager
 
 logger = logging.getLogger(__name__)
 
@@ -99,41 +98,40 @@ async def stream_answer_generation(
         
         enhanced_question = f"{context_prompt}{question}" if context_prompt else question
         
-        # Simulate streaming (in real implementation, modify LLM service to support streaming)
-        # For now, we'll simulate by sending words progressively
-        llm_service = LLMService()
+        llm_service = service_manager.get_llm_service()
         
-        # Get full answer first (in production, use actual streaming API)
-        result = llm_service.generate_answer(
+        # Forward token deltas as the LLM produces them
+        result = None
+        async for event in llm_service.stream_answer(
             context_chunks,
             enhanced_question,
             max_tokens=512,
             temperature=0.3
-        )
+        ):
+            if event["type"] == "token":
+                await manager.send_json(client_id, {
+                    "type": "answer_stream_chunk",
+                    "delta": event["content"],
+                    "is_complete": False
+                })
+            elif event["type"] == "error":
+                raise Exception(event["error"])
+            else:
+                result = event
         
-        full_answer = result.get('answer', '')
-        words = full_answer.split()
+        if result is None:
+            raise Exception("LLM stream ended without a final answer")
         
-        # Stream words with natural pacing
-        current_text = ""
-        for i, word in enumerate(words):
-            current_text += word + " "
-            
-            await manager.send_json(client_id, {
-                "type": "answer_stream_chunk",
-                "content": current_text,
-                "is_complete": False
-            })
-            
-            # Natural typing delay
-            await asyncio.sleep(0.05)  # 50ms between words
+        logger.info(f"Streamed answer to {client_id} (TTFT: {result.get('time_to_first_token')}, total: {result.get('response_time', 0):.2f}s)")
         
         # Send completion signal
         await manager.send_json(client_id, {
             "type": "answer_stream_end",
-            "content": current_text.strip(),
+            "content": result.get('answer', ''),
             "is_complete": True,
             "llm_used": result.get('llm_used'),
+            "time_to_first_token": result.get('time_to_first_token'),
+            "response_time": result.get('response_time'),
             "timestamp": datetime.utcnow().isoformat()
         })
         
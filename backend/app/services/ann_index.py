@@ -0,0 +1,160 @@
+import math
+import time
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+from app.config import (
+    VECTOR_INDEX_HNSW_EF_SEARCH,
+    VECTOR_INDEX_HNSW_M,
+    VECTOR_INDEX_NLIST,
+    VECTOR_INDEX_NPROBE,
+    VECTOR_INDEX_PQ_M,
+)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# k-means gains little from more than this many training points per list
+_TRAINING_POINTS_PER_LIST = 256
+
+
+def create_index(index_type: str, dim: int, num_vectors: int = 0) -> faiss.Index:
+    """
+    Create an empty inner-product index of the given type.
+
+    Args:
+        index_type: One of INDEX_TYPES
+        dim: Embedding dimension
+        num_vectors: Expected store size, used to size IVF lists
+    """
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, VECTOR_INDEX_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = max(40, 2 * VECTOR_INDEX_HNSW_M)
+        index.hnsw.efSearch = VECTOR_INDEX_HNSW_EF_SEARCH
+        return index
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = choose_nlist(num_vectors)
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, choose_pq_m(dim), 8, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = min(VECTOR_INDEX_NPROBE, nlist)
+        # The index owns the quantizer once the Python reference goes away
+        quantizer.this.disown()
+        index.own_fields = True
+        return index
+
+    raise ValueError(f"Unknown vector index type '{index_type}', expected one of {INDEX_TYPES}")
+
+
+def choose_nlist(num_vectors: int) -> int:
+    """Number of IVF lists: configured, or ~4*sqrt(n) with enough points to train."""
+    if VECTOR_INDEX_NLIST > 0:
+        return VECTOR_INDEX_NLIST
+    nlist = int(4 * math.sqrt(max(num_vectors, 1)))
+    return max(1, min(nlist, max(num_vectors // 39, 1), 65536))
+
+
+def choose_pq_m(dim: int) -> int:
+    """Largest number of PQ sub-quantizers <= VECTOR_INDEX_PQ_M that divides ``dim``."""
+    for m in range(min(VECTOR_INDEX_PQ_M, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Name (from INDEX_TYPES) of a CPU or GPU index."""
+    name = type(index).__name__
+    if name.startswith("GpuIndex"):
+        return {"GpuIndexIVFFlat": "ivf_flat", "GpuIndexIVFPQ": "ivf_pq"}.get(name, "flat")
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def train_index(index: faiss.Index, vectors: np.ndarray, seed: int = 0):
+    """Train ``index`` (if it needs it) on a sample of ``vectors``."""
+    if index.is_trained:
+        return
+    ivf = faiss.extract_index_ivf(index)
+    sample_size = min(len(vectors), ivf.nlist * _TRAINING_POINTS_PER_LIST)
+    if sample_size < len(vectors):
+        rows = np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)
+        vectors = vectors[np.sort(rows)]
+    index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+
+
+def search_parameters(index: faiss.Index, selector=None) -> Optional[faiss.SearchParameters]:
+    """Per-query search parameters for ``index``, optionally restricted by ``selector``."""
+    # GPU indexes take their nprobe from the index itself
+    index_type = "gpu" if type(index).__name__.startswith("GpuIndex") else index_type_of(index)
+    if index_type == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = VECTOR_INDEX_HNSW_EF_SEARCH
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = min(VECTOR_INDEX_NPROBE, faiss.extract_index_ivf(index).nlist)
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+
+    if selector is not None:
+        params.sel = selector
+    return params
+
+
+def evaluate_index(index: faiss.Index, vectors: np.ndarray, queries: np.ndarray,
+                   k: int = 10, params: Optional[faiss.SearchParameters] = None) -> Dict[str, Any]:
+    """
+    Measure recall@k and latency of ``index`` against exact search.
+
+    Args:
+        index: Index holding ``vectors`` (vector id == row)
+        vectors: The raw vectors, used for the exact ground truth
+        queries: Normalized query vectors
+        k: Number of neighbours compared
+        params: Search parameters to evaluate (defaults to search_parameters)
+    """
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(np.ascontiguousarray(vectors, dtype=np.float32))
+    _, expected = exact.search(queries, k)
+
+    if params is None:
+        params = search_parameters(index)
+
+    # Time one query at a time, matching how the API searches
+    start = time.perf_counter()
+    found = np.vstack([index.search(query.reshape(1, -1), k, params=params)[1] for query in queries])
+    latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    hits = sum(len(set(f[f >= 0]) & set(e[e >= 0])) for f, e in zip(found, expected))
+    return {
+        'index_type': index_type_of(index),
+        'vectors': int(index.ntotal),
+        'queries': len(queries),
+        'k': k,
+        f'recall_at_{k}': hits / float(expected.size),
+        'latency_ms': latency_ms,
+    }
+
+
+def sample_queries(vectors: np.ndarray, count: int, noise: float = 0.05, seed: int = 0) -> np.ndarray:
+    """Perturbed copies of stored vectors, normalized, to use as evaluation queries."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), min(count, len(vectors)), replace=False)
+    queries = vectors[rows] + noise * rng.standard_normal((len(rows), vectors.shape[1])).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries.astype(np.float32)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.config import ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_SECONDS
+from app.services.embedding_cache import normalize_query
+
+
+def context_fingerprint(chunks: List[Dict[str, Any]], **settings) -> str:
+    """
+    Digest of the context an answer was generated from.
+
+    Covers each chunk's id and text, in order, and the generation
+    ``settings`` (e.g. max_tokens, temperature), so an answer is only reused
+    when the same context would be sent to the LLM in the same way.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    for chunk in chunks:
+        digest.update(str(chunk.get('chunk_id')).encode("utf-8") + b"\0")
+        digest.update(hashlib.blake2b(chunk.get('text', '').encode("utf-8"), digest_size=16).digest())
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """
+    Thread-safe semantic cache of generated answers.
+
+    A question matches a cached one when the cosine similarity of their
+    query embeddings is at least ``similarity_threshold``, so rephrasings
+    of a popular question share one LLM generation. A match is only served
+    if the context retrieved for the new question has the same fingerprint
+    (see context_fingerprint) as the cached answer's: adding, deleting or
+    re-indexing documents changes what is retrieved and so invalidates
+    affected answers without explicit flushing.
+
+    Entries are evicted least recently used beyond ``max_entries`` and
+    expire after ``ttl_seconds``. Embeddings are kept in one matrix so a
+    lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, embedding_service, max_entries: int = ANSWER_CACHE_SIZE,
+                 ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 similarity_threshold: float = ANSWER_CACHE_SIMILARITY):
+        self.embedding_service = embedding_service
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._embeddings: Optional[np.ndarray] = None  # (max_entries, dim), one row per slot
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * max(max_entries, 0)
+        self._order: "OrderedDict[int, None]" = OrderedDict()  # Used slots, least recent first
+        self._slot_by_question: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.time_saved = 0.0
+        self._lookup_time = 0.0
+
+    def _embed(self, question: str) -> np.ndarray:
+        embedding = np.asarray(self.embedding_service.embed_query(question), dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _free(self, slot: int):
+        entry = self._entries[slot]
+        self._entries[slot] = None
+        self._order.pop(slot, None)
+        if self._slot_by_question.get(entry['key']) == slot:
+            del self._slot_by_question[entry['key']]
+
+    def get(self, question: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer to ``question`` generated from the same context.
+
+        Returns:
+            The cached 'response' with the 'similarity' and 'question' it
+            matched, or None
+        """
+        if self.max_entries <= 0:
+            return None
+        start = time.perf_counter()
+        embedding = self._embed(question)
+
+        with self._lock:
+            try:
+                if not self._order:
+                    self.misses += 1
+                    return None
+
+                now = time.monotonic()
+                similarities = self._embeddings @ embedding
+                candidates = np.flatnonzero(similarities >= self.similarity_threshold)
+                stale = False
+                for slot in candidates[np.argsort(-similarities[candidates], kind='stable')]:
+                    entry = self._entries[slot]
+                    if entry is None:
+                        continue
+                    if now - entry['created'] > self.ttl_seconds:
+                        self._free(slot)
+                        self.expirations += 1
+                        continue
+                    if entry['fingerprint'] != fingerprint:
+                        stale = True
+                        continue
+
+                    self._order.move_to_end(slot)
+                    self.hits += 1
+                    self.time_saved += entry['generation_time']
+                    return {
+                        'response': entry['response'],
+                        'similarity': float(similarities[slot]),
+                        'question': entry['question'],
+                    }
+
+                self.stale += stale
+                self.misses += 1
+                return None
+            finally:
+                self._lookup_time += time.perf_counter() - start
+
+    def put(self, question: str, fingerprint: str, response: Dict[str, Any], generation_time: float):
+        """
+        Cache ``response`` for ``question`` asked with the given context fingerprint.
+
+        Args:
+            question: The question that was answered
+            fingerprint: context_fingerprint of the context used
+            response: What to serve on a hit (e.g. the answer and LLM used)
+            generation_time: Seconds the answer took to generate
+        """
+        if self.max_entries <= 0:
+            return
+        embedding = self._embed(question)
+        key = normalize_query(question).lower()
+
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+
+            slot = self._slot_by_question.get(key)
+            if slot is None:
+                if len(self._order) >= self.max_entries:
+                    self._free(next(iter(self._order)))
+                    self.evictions += 1
+                slot = self._entries.index(None)
+
+            self._embeddings[slot] = embedding
+            self._entries[slot] = {
+                'key': key,
+                'question': question,
+                'fingerprint': fingerprint,
+                'response': response,
+                'generation_time': generation_time,
+                'created': time.monotonic(),
+            }
+            self._slot_by_question[key] = slot
+            self._order[slot] = None
+            self._order.move_to_end(slot)
+
+    def clear(self):
+        with self._lock:
+            for slot in list(self._order):
+                self._free(slot)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._order),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'similarity_threshold': self.similarity_threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_misses': self.stale,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'time_saved_seconds': round(self.time_saved, 3),
+                'avg_lookup_ms': self._lookup_time / lookups * 1000 if lookups else 0.0,
+            }
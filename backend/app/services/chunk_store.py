@@ -0,0 +1,392 @@
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# One fixed-width record per chunk; the row number is the chunk's vector id
+ROW_DTYPE = np.dtype([
+    ('text_offset', '<i8'),
+    ('text_length', '<i4'),
+    ('document', '<i4'),      # Row in the interned document table
+    ('chunk_index', '<i4'),
+    ('chunk_size', '<i4'),
+    ('extra_offset', '<i8'),  # JSON of any non-standard chunk keys
+    ('extra_length', '<i4'),
+    ('flags', '<i4'),
+])
+
+# Row flag: the chunk's document was deleted (the row is a tombstone until
+# the vector store compacts)
+ROW_DELETED = 1
+
+# Keys stored in dedicated columns; anything else goes to the per-chunk extra
+_STANDARD_KEYS = {'text', 'chunk_id', 'document_id', 'chunk_index', 'chunk_size', 'metadata', 'vector_index'}
+
+
+class ChunkStore:
+    """
+    Columnar on-disk store for chunk text and metadata.
+
+    Layout inside ``store_dir``:
+        text.bin        UTF-8 arena with every chunk's text (memory-mapped)
+        rows.bin        fixed-width records (ROW_DTYPE) with arena offsets
+        documents.jsonl interned document table: one line per distinct
+                        (document_id, metadata) pair
+
+    Only the small row table and the document table are held in memory;
+    chunk text is read from the arena on demand, so search only touches the
+    text of the top-k hits. All files are append-only and rows are written
+    last, so a crash mid-append leaves at most an ignored tail. The one
+    in-place write is the ROW_DELETED flag set when a document is deleted;
+    deleted rows keep their row ids until ``copy_live_rows`` rewrites the
+    store without them.
+    """
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        self.text_path = self.store_dir / "text.bin"
+        self.rows_path = self.store_dir / "rows.bin"
+        self.documents_path = self.store_dir / "documents.jsonl"
+
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._row_count = 0
+        self._documents: List[Dict[str, Any]] = []
+        self._document_refs: Dict[tuple, int] = {}
+        self._refs_by_document_id: Dict[str, List[int]] = {}
+        # Contiguous [start, end) row ranges per document id, for filtered search
+        self._ranges_by_document_id: Dict[str, List[List[int]]] = {}
+        self._deleted_count = 0
+
+        self._text_size = 0
+        self._text_map: Optional[mmap.mmap] = None
+        self._text_file = None
+        self._rows_file = None
+        self._documents_file = None
+
+        self._load()
+
+    def _load(self):
+        if self.documents_path.exists():
+            valid_bytes = 0
+            with open(self.documents_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Partially written trailing line
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self._register_document(entry['document_id'], entry.get('metadata') or {})
+                    valid_bytes += len(line)
+            # Cut the torn line off so the next entry starts on a fresh line
+            if valid_bytes < self.documents_path.stat().st_size:
+                with open(self.documents_path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+        self._text_size = self.text_path.stat().st_size if self.text_path.exists() else 0
+
+        rows = np.zeros(0, dtype=ROW_DTYPE)
+        rows_file_size = 0
+        if self.rows_path.exists():
+            raw = self.rows_path.read_bytes()
+            rows_file_size = len(raw)
+            raw = raw[:len(raw) - len(raw) % ROW_DTYPE.itemsize]
+            rows = np.frombuffer(raw, dtype=ROW_DTYPE).copy()
+
+        # Keep only rows whose text and document were fully written
+        valid = len(rows)
+        if valid:
+            ends = np.maximum(
+                rows['text_offset'] + rows['text_length'],
+                rows['extra_offset'] + rows['extra_length'],
+            )
+            bad = np.nonzero((ends > self._text_size) | (rows['document'] >= len(self._documents)))[0]
+            if len(bad):
+                valid = int(bad[0])
+                print(f"⚠️ Chunk store has a torn tail, keeping {valid} of {len(rows)} rows")
+
+        self._rows = rows
+        self._row_count = valid
+        self._deleted_count = int(np.count_nonzero(rows['flags'][:valid] & ROW_DELETED))
+        self._index_ranges(0, valid)
+        if valid * ROW_DTYPE.itemsize < rows_file_size:
+            self._truncate_rows_file(valid)
+
+        self._open_files()
+
+    def _open_files(self):
+        self._text_file = open(self.text_path, 'ab')
+        self._rows_file = open(self.rows_path, 'ab')
+        self._documents_file = open(self.documents_path, 'a')
+
+    def _close_files(self):
+        for handle in (self._text_file, self._rows_file, self._documents_file):
+            if handle is not None:
+                handle.close()
+        self._text_file = self._rows_file = self._documents_file = None
+        if self._text_map is not None:
+            self._text_map.close()
+            self._text_map = None
+
+    def _truncate_rows_file(self, count: int):
+        with open(self.rows_path, 'r+b') as f:
+            f.truncate(count * ROW_DTYPE.itemsize)
+
+    def _register_document(self, document_id: str, metadata: Dict[str, Any]) -> int:
+        key = (document_id, json.dumps(metadata, sort_keys=True, default=str))
+        ref = self._document_refs.get(key)
+        if ref is None:
+            ref = len(self._documents)
+            self._documents.append({'document_id': document_id, 'metadata': metadata})
+            self._document_refs[key] = ref
+            self._refs_by_document_id.setdefault(document_id, []).append(ref)
+        return ref
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    def append(self, chunks: List[Dict[str, Any]]) -> int:
+        """
+        Append chunks; their row ids continue from the current length.
+
+        Returns:
+            Row id of the first appended chunk
+        """
+        first_row = self._row_count
+        if not chunks:
+            return first_row
+
+        records = np.zeros(len(chunks), dtype=ROW_DTYPE)
+        arena = bytearray()
+        new_documents = []
+
+        for i, chunk in enumerate(chunks):
+            document_id = chunk.get('document_id') or ""
+            metadata = chunk.get('metadata') or {}
+            known = len(self._documents)
+            ref = self._register_document(document_id, metadata)
+            if ref >= known:
+                new_documents.append(self._documents[ref])
+
+            text = (chunk.get('text') or "").encode('utf-8')
+            records[i]['text_offset'] = self._text_size + len(arena)
+            records[i]['text_length'] = len(text)
+            arena += text
+
+            chunk_index = int(chunk.get('chunk_index', 0))
+            extra = {k: v for k, v in chunk.items() if k not in _STANDARD_KEYS}
+            chunk_id = chunk.get('chunk_id')
+            if chunk_id is not None and chunk_id != f"{document_id}_chunk_{chunk_index}":
+                extra['chunk_id'] = chunk_id
+            if extra:
+                encoded = json.dumps(extra, default=str).encode('utf-8')
+                records[i]['extra_offset'] = self._text_size + len(arena)
+                records[i]['extra_length'] = len(encoded)
+                arena += encoded
+
+            records[i]['document'] = ref
+            records[i]['chunk_index'] = chunk_index
+            records[i]['chunk_size'] = int(chunk.get('chunk_size', len(chunk.get('text') or "")))
+
+        # Text and documents first; the rows are the commit record
+        self._text_file.write(arena)
+        self._text_file.flush()
+        for entry in new_documents:
+            self._documents_file.write(json.dumps(entry, default=str) + "\n")
+        self._documents_file.flush()
+        self._rows_file.write(records.tobytes())
+        self._rows_file.flush()
+
+        self._text_size += len(arena)
+        self._append_rows(records)
+        return first_row
+
+    def _append_rows(self, records: np.ndarray):
+        needed = self._row_count + len(records)
+        if needed > len(self._rows):
+            grown = np.zeros(max(needed, 2 * len(self._rows), 1024), dtype=ROW_DTYPE)
+            grown[:self._row_count] = self._rows[:self._row_count]
+            self._rows = grown
+        self._rows[self._row_count:needed] = records
+        self._index_ranges(self._row_count, needed)
+        self._row_count = needed
+
+    def _index_ranges(self, start: int, end: int):
+        """Extend the per-document row ranges with the live rows in ``start:end``."""
+        if start >= end:
+            return
+        refs = self._rows['document'][start:end].astype(np.int64)
+        refs[(self._rows['flags'][start:end] & ROW_DELETED) != 0] = -1
+        # Split into runs of consecutive rows sharing a document entry; runs of
+        # the same document id with different metadata are merged below
+        run_starts = np.concatenate(([0], np.flatnonzero(np.diff(refs)) + 1))
+        run_ends = np.append(run_starts[1:], len(refs))
+        for run_start, run_end in zip(run_starts, run_ends):
+            if refs[run_start] < 0:
+                continue
+            document_id = self._documents[int(refs[run_start])]['document_id']
+            ranges = self._ranges_by_document_id.setdefault(document_id, [])
+            if ranges and ranges[-1][1] == start + run_start:
+                ranges[-1][1] = start + int(run_end)
+            else:
+                ranges.append([start + int(run_start), start + int(run_end)])
+
+    def _read_bytes(self, offset: int, length: int) -> bytes:
+        if length == 0:
+            return b""
+        if self._text_map is None or offset + length > len(self._text_map):
+            # Remap to cover text appended since the last read
+            if self._text_map is not None:
+                self._text_map.close()
+            with open(self.text_path, 'rb') as f:
+                self._text_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._text_map[offset:offset + length]
+
+    def get(self, row_id: int) -> Dict[str, Any]:
+        """Materialize one chunk as the dict shape produced by ChunkingService."""
+        if row_id < 0 or row_id >= self._row_count:
+            raise IndexError(f"Chunk row {row_id} out of range")
+
+        row = self._rows[row_id]
+        document = self._documents[int(row['document'])]
+        chunk_index = int(row['chunk_index'])
+        chunk = {
+            'text': self._read_bytes(int(row['text_offset']), int(row['text_length'])).decode('utf-8'),
+            'chunk_id': f"{document['document_id']}_chunk_{chunk_index}",
+            'document_id': document['document_id'],
+            'chunk_index': chunk_index,
+            'chunk_size': int(row['chunk_size']),
+            'metadata': dict(document['metadata']),
+            'vector_index': row_id,
+        }
+        if row['extra_length']:
+            chunk.update(json.loads(self._read_bytes(int(row['extra_offset']), int(row['extra_length']))))
+        return chunk
+
+    def get_many(self, row_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        return [self.get(int(row_id)) for row_id in row_ids]
+
+    def document_ranges(self, document_ids: Iterable[str]) -> List[Tuple[int, int]]:
+        """Sorted ``[start, end)`` row ranges covering the given documents' live rows."""
+        ranges = [
+            (start, end)
+            for document_id in set(document_ids)
+            for start, end in self._ranges_by_document_id.get(document_id, [])
+        ]
+        return sorted(ranges)
+
+    def document_ids(self) -> List[str]:
+        """Ids of the documents with live rows."""
+        return list(self._ranges_by_document_id)
+
+    def rows_for_documents(self, document_ids: Iterable[str]) -> np.ndarray:
+        """Row ids of every chunk belonging to the given documents."""
+        ranges = self.document_ranges(document_ids)
+        if not ranges:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges])
+
+    @property
+    def deleted_count(self) -> int:
+        """Number of rows flagged ROW_DELETED."""
+        return self._deleted_count
+
+    def delete_documents(self, document_ids: Iterable[str]) -> int:
+        """
+        Flag every row of the given documents as deleted.
+
+        Only the affected records are rewritten, so the cost is proportional
+        to the documents' chunk count.
+
+        Returns:
+            Number of rows deleted
+        """
+        document_ids = set(document_ids)
+        ranges = self.document_ranges(document_ids)
+        if not ranges:
+            return 0
+
+        with open(self.rows_path, 'r+b') as f:
+            for start, end in ranges:
+                self._rows['flags'][start:end] |= ROW_DELETED
+                f.seek(start * ROW_DTYPE.itemsize)
+                f.write(self._rows[start:end].tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        for document_id in document_ids:
+            self._ranges_by_document_id.pop(document_id, None)
+        deleted = sum(end - start for start, end in ranges)
+        self._deleted_count += deleted
+        return deleted
+
+    def deleted_rows(self) -> np.ndarray:
+        """Row ids of deleted rows."""
+        return np.flatnonzero(self._rows['flags'][:self._row_count] & ROW_DELETED).astype(np.int64)
+
+    def live_ranges(self) -> List[Tuple[int, int]]:
+        """Sorted ``[start, end)`` ranges of rows that are not deleted."""
+        live = (self._rows['flags'][:self._row_count] & ROW_DELETED) == 0
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], live.astype(np.int8), [0]))))
+        return [(int(start), int(end)) for start, end in zip(edges[::2], edges[1::2])]
+
+    def copy_live_rows(self, target_dir: Path, batch_size: int = 1000) -> "ChunkStore":
+        """
+        Write the live rows, renumbered from 0, to a new store in ``target_dir``.
+
+        Returns:
+            The new store (open)
+        """
+        target = ChunkStore(target_dir)
+        target.reset()
+        for start, end in self.live_ranges():
+            for batch_start in range(start, end, batch_size):
+                chunks = self.get_many(range(batch_start, min(batch_start + batch_size, end)))
+                for chunk in chunks:
+                    chunk.pop('vector_index')
+                target.append(chunks)
+        return target
+
+    def truncate(self, count: int):
+        """Drop rows from ``count`` onwards (used to realign with the index)."""
+        if count >= self._row_count:
+            return
+        self._close_files()
+        self._truncate_rows_file(count)
+        self._row_count = count
+        self._deleted_count = int(np.count_nonzero(self._rows['flags'][:count] & ROW_DELETED))
+        self._ranges_by_document_id = {}
+        self._index_ranges(0, count)
+        self._open_files()
+
+    def reset(self):
+        """Delete all stored chunks."""
+        self._close_files()
+        for path in (self.text_path, self.rows_path, self.documents_path):
+            path.unlink(missing_ok=True)
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._row_count = 0
+        self._documents = []
+        self._document_refs = {}
+        self._refs_by_document_id = {}
+        self._ranges_by_document_id = {}
+        self._deleted_count = 0
+        self._text_size = 0
+        self._open_files()
+
+    def close(self):
+        self._close_files()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'rows': self._row_count,
+            'documents': len(self._ranges_by_document_id),
+            'deleted_rows': self._deleted_count,
+            'text_bytes': self._text_size,
+            'row_table_bytes': self._row_count * ROW_DTYPE.itemsize,
+        }
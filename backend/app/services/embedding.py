@@ -6,7 +6,9 @@ from sentence_transformers import SentenceTransformer
 from pathlib import Path
 import pickle
 import hashlib
-from app.config import DATA_DIR
+from app.config import DATA_DIR, QUERY_BATCH_MAX_SIZE
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embedding_cache import ChunkEmbeddingCache, QueryEmbeddingCache, normalize_query
 
 class EmbeddingService:
     """Service for generating and managing document embeddings using GPU acceleration."""
@@ -29,6 +31,12 @@ class EmbeddingService:
         self.embeddings_dir = DATA_DIR / "embeddings"
         self.embeddings_dir.mkdir(parents=True, exist_ok=True)
         
+        # Repeated questions skip the forward pass
+        self.query_cache = QueryEmbeddingCache()
+        
+        # Chunk text seen before (re-uploads, rebuilds) is never re-embedded
+        self.chunk_cache = ChunkEmbeddingCache(self.embeddings_dir / "chunk_cache", model_name)
+        
         print(f"✅ EmbeddingService initialized with {model_name}")
     
     def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
@@ -48,11 +56,11 @@ class EmbeddingService:
         print(f"🔄 Generating embeddings for {len(texts)} texts using {self.device}")
         
         try:
-            # Generate embeddings in batches
+            # Generate embeddings in batches (progress only for multi-batch inputs)
             embeddings = self.model.encode(
                 texts,
                 batch_size=batch_size,
-                show_progress_bar=True,
+                show_progress_bar=len(texts) > batch_size,
                 convert_to_numpy=True,
                 device=self.device
             )
@@ -64,6 +72,91 @@ class EmbeddingService:
             print(f"❌ Error generating embeddings: {e}")
             raise
     
+    def embed_chunks(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """
+        Embed chunk texts, only running the model on text not seen before.
+        
+        Args:
+            texts: Chunk texts to embed
+            batch_size: Batch size for the texts that do need the model
+        
+        Returns:
+            numpy array of embeddings, one row per text
+        """
+        if not texts:
+            return np.array([])
+        
+        rows = self.chunk_cache.lookup(texts)
+        missing = [i for i, row in enumerate(rows) if row is None]
+        
+        if missing:
+            # Embed each distinct new text once
+            new_texts = list(dict.fromkeys(texts[i] for i in missing))
+            new_rows = dict(zip(new_texts, self.chunk_cache.put_many(
+                new_texts, self.generate_embeddings(new_texts, batch_size=batch_size)
+            )))
+            for i in missing:
+                rows[i] = new_rows[texts[i]]
+        
+        if len(missing) < len(texts):
+            print(f"♻️ Reused {len(texts) - len(missing)} of {len(texts)} cached chunk embeddings")
+        
+        return self.chunk_cache.vectors(rows)
+    
+    @property
+    def query_batcher(self) -> Optional[EmbeddingBatcher]:
+        """Micro-batcher for uncached queries, created on first use (None if disabled)."""
+        if QUERY_BATCH_MAX_SIZE <= 1:
+            return None
+        if getattr(self, "_query_batcher", None) is None:
+            self._query_batcher = EmbeddingBatcher(
+                lambda texts: self.generate_embeddings(texts, batch_size=len(texts)),
+                name="query-embedding-batcher"
+            )
+        return self._query_batcher
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embed a search query, serving repeated queries from the LRU cache.
+        
+        Uncached queries from concurrent callers are encoded together by
+        the query micro-batcher.
+        
+        Returns:
+            Read-only (1, dim) array; copy before modifying it
+        """
+        batcher = self.query_batcher
+        return self.query_cache.get_or_compute(
+            self.model_name, query,
+            lambda text: batcher.embed(f"query: {text}") if batcher else self.generate_embeddings([f"query: {text}"])
+        )
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed several search queries, running the model once for all uncached ones.
+        
+        Returns:
+            (len(queries), dim) array, one row per query
+        """
+        if not queries:
+            return np.zeros((0, self.get_embedding_dim()), dtype=np.float32)
+        
+        # One lookup per distinct query; repeats within the batch share a row
+        embeddings, missing = {}, {}
+        for query in queries:
+            key = normalize_query(query)
+            if key not in embeddings:
+                embeddings[key] = self.query_cache.get(self.model_name, query)
+                if embeddings[key] is None:
+                    missing[key] = query
+        
+        if missing:
+            computed = self.generate_embeddings([f"query: {query}" for query in missing.values()])
+            for row, (key, query) in enumerate(missing.items()):
+                embeddings[key] = self.query_cache.put(self.model_name, query, computed[row:row + 1])
+        
+        return np.vstack([embeddings[normalize_query(query)] for query in queries])
+    
     def save_embeddings(self, embeddings: np.ndarray, texts: List[str], 
                        document_id: str) -> str:
         """
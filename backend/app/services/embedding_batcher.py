@@ -0,0 +1,135 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config import QUERY_BATCH_MAX_SIZE, QUERY_BATCH_MAX_WAIT_MS
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batches concurrent single-text embedding requests.
+
+    Callers submit one text each and get a future. A background thread
+    takes the first waiting request, collects whatever else arrives within
+    ``max_wait_ms`` (up to ``max_batch_size`` texts), encodes them in one
+    model call and resolves every caller's future with its row. Under
+    concurrent load this replaces many batch-size-1 forward passes with a
+    few larger ones; a lone request waits at most ``max_wait_ms``.
+
+    Futures are ``concurrent.futures.Future``, so both threads (``embed``)
+    and coroutines (``embed_async``) can wait on them.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], np.ndarray],
+                 max_batch_size: int = QUERY_BATCH_MAX_SIZE,
+                 max_wait_ms: float = QUERY_BATCH_MAX_WAIT_MS,
+                 name: str = "embedding-batcher"):
+        self.encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.largest_batch = 0
+        self._total_wait = 0.0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue ``text``; the future resolves to its (1, dim) embedding."""
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        self._ensure_started()
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed ``text`` as part of the next batch, blocking until it is done."""
+        return self.submit(text).result()
+
+    async def embed_async(self, text: str) -> np.ndarray:
+        """Embed ``text`` as part of the next batch without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _collect(self, first) -> List[Any]:
+        """The first request plus whatever arrives before the batch fills or the wait ends."""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # Stop once this batch is done
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            self._encode_batch(self._collect(first))
+
+    def _encode_batch(self, batch: List[Any]):
+        started = time.perf_counter()
+        # Skip requests whose callers gave up
+        batch = [(text, future, queued_at) for text, future, queued_at in batch
+                 if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        # Identical texts in a batch are encoded once
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            embeddings = self.encode(texts)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        rows = {text: row for row, text in enumerate(texts)}
+        for text, future, _ in batch:
+            row = rows[text]
+            future.set_result(embeddings[row:row + 1])
+
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self._total_wait += sum(started - queued_at for _, _, queued_at in batch)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Finish queued requests and stop the batching thread."""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'batches': self.batches,
+                'requests': self.requests,
+                'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'avg_wait_ms': self._total_wait / self.requests * 1000 if self.requests else 0.0,
+            }
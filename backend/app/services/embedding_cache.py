@@ -0,0 +1,289 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: the chunk cache is then only safe within one process
+    fcntl = None
+
+from app.config import QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL_SECONDS
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Cache key form of a query: surrounding and repeated whitespace removed."""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache of query embeddings, bounded by size and age.
+
+    Keys are (model name, normalized query text), so switching models never
+    serves a stale vector. Cached arrays are read-only; callers get the
+    shared array and must copy before modifying it.
+    """
+
+    def __init__(self, max_entries: int = QUERY_EMBEDDING_CACHE_SIZE,
+                 ttl_seconds: float = QUERY_EMBEDDING_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_name: str, text: str):
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, model_name: str, text: str, embedding: np.ndarray) -> np.ndarray:
+        """Cache a read-only copy of ``embedding`` and return it."""
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        if self.max_entries <= 0:
+            return embedding
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            self._entries[key] = (time.monotonic(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return embedding
+
+    def get_or_compute(self, model_name: str, text: str,
+                       compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Return the cached embedding for ``text`` or compute and cache it."""
+        embedding = self.get(model_name, text)
+        if embedding is None:
+            embedding = self.put(model_name, text, compute(text))
+        return embedding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ChunkEmbeddingCache:
+    """
+    Persistent content-addressed cache of chunk embeddings.
+
+    Vectors are keyed by a 128-bit BLAKE2 digest of the chunk text and
+    stored per model in ``<cache_dir>/<model slug>/``:
+        meta.json    model name and embedding dimension
+        vectors.f32  raw float32 rows, read through a memory map
+        keys.bin     one 16-byte digest per row
+
+    Both files are append-only and the key is written after its vector, so
+    a torn write only loses the unfinished tail. Only the digest -> row map
+    is held in memory.
+
+    Several processes (the API and ingestion workers) may share one cache:
+    writes take an exclusive ``flock`` on ``lock``, and each process picks
+    up rows appended by the others before looking keys up.
+    """
+
+    KEY_SIZE = 16
+
+    def __init__(self, cache_dir: Path, model_name: str):
+        self.model_name = model_name
+        self.cache_dir = Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.meta_path = self.cache_dir / "meta.json"
+        self.vectors_path = self.cache_dir / "vectors.f32"
+        self.keys_path = self.cache_dir / "keys.bin"
+        self.lock_path = self.cache_dir / "lock"
+
+        self.dim: Optional[int] = None
+        self._rows: Dict[bytes, int] = {}
+        self._count = 0
+        self._map: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    @classmethod
+    def key(cls, text: str) -> bytes:
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=cls.KEY_SIZE).digest()
+
+    @contextmanager
+    def _process_lock(self):
+        """Exclusive lock across processes sharing this cache directory."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> bool:
+        """Load the embedding dimension; False if there is no usable metadata."""
+        if not self.meta_path.exists():
+            return False
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            meta = {}
+        if meta.get('model_name') != self.model_name or not meta.get('dim'):
+            return False
+        self.dim = int(meta['dim'])
+        return True
+
+    def _load(self):
+        with self._process_lock():
+            if not self.meta_path.exists():
+                return
+            if not self._read_meta():
+                print(f"⚠️ Discarding chunk embedding cache with unexpected metadata: {self.cache_dir}")
+                self._clear_files()
+                return
+
+            keys = self.keys_path.read_bytes() if self.keys_path.exists() else b""
+            vector_rows = self.vectors_path.stat().st_size // (4 * self.dim) if self.vectors_path.exists() else 0
+            count = min(len(keys) // self.KEY_SIZE, vector_rows)
+
+            # Drop any torn tail so the two files stay row-aligned
+            with open(self.keys_path, 'ab') as f:
+                f.truncate(count * self.KEY_SIZE)
+            with open(self.vectors_path, 'ab') as f:
+                f.truncate(count * 4 * self.dim)
+
+            for row in range(count):
+                self._rows[keys[row * self.KEY_SIZE:(row + 1) * self.KEY_SIZE]] = row
+            self._count = count
+
+    def _refresh(self):
+        """Index rows appended by other processes since the last look."""
+        if self.dim is None and not self._read_meta():
+            return
+        try:
+            key_rows = self.keys_path.stat().st_size // self.KEY_SIZE
+            vector_rows = self.vectors_path.stat().st_size // (4 * self.dim)
+        except FileNotFoundError:
+            return
+        # Keys are written after their vectors, so complete keys have vectors
+        count = min(key_rows, vector_rows)
+        if count <= self._count:
+            return
+        with open(self.keys_path, 'rb') as f:
+            f.seek(self._count * self.KEY_SIZE)
+            keys = f.read((count - self._count) * self.KEY_SIZE)
+        for offset in range(0, len(keys), self.KEY_SIZE):
+            self._rows.setdefault(keys[offset:offset + self.KEY_SIZE], self._count + offset // self.KEY_SIZE)
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def lookup(self, texts: List[str]) -> List[Optional[int]]:
+        """Row of each text's cached vector, or None when it is not cached."""
+        with self._lock:
+            self._refresh()
+            rows = [self._rows.get(self.key(text)) for text in texts]
+            found = sum(row is not None for row in rows)
+            self.hits += found
+            self.misses += len(rows) - found
+            return rows
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray) -> List[int]:
+        """Cache vectors for ``texts``; returns their rows."""
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with self._lock, self._process_lock():
+            self._refresh()
+            if self.dim is None:
+                self.dim = embeddings.shape[1]
+                self.meta_path.write_text(json.dumps({'model_name': self.model_name, 'dim': self.dim}))
+
+            rows, new_keys, new_rows = [], [], []
+            for text, vector in zip(texts, embeddings):
+                key = self.key(text)
+                row = self._rows.get(key)
+                if row is None:
+                    row = self._count + len(new_keys)
+                    new_keys.append(key)
+                    new_rows.append(vector)
+                    self._rows[key] = row
+                rows.append(row)
+
+            if new_keys:
+                # Drop the torn tail of a writer that died mid-write, so new rows land where they are counted
+                with open(self.vectors_path, 'ab') as f:
+                    f.truncate(self._count * 4 * self.dim)
+                    f.write(np.vstack(new_rows).tobytes())
+                with open(self.keys_path, 'ab') as f:
+                    f.truncate(self._count * self.KEY_SIZE)
+                    f.write(b"".join(new_keys))
+                self._count += len(new_keys)
+            return rows
+
+    def vectors(self, rows: List[int]) -> np.ndarray:
+        """Copy the cached vectors at ``rows`` out of the memory map."""
+        with self._lock:
+            if not rows:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            if self._map is None or len(self._map) < self._count:
+                self._map = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(self._count, self.dim))
+            return np.array(self._map[np.asarray(rows, dtype=np.int64)])
+
+    def _clear_files(self):
+        self._map = None
+        for path in (self.meta_path, self.vectors_path, self.keys_path):
+            path.unlink(missing_ok=True)
+        self.dim = None
+        self._rows = {}
+        self._count = 0
+
+    def clear(self):
+        with self._lock, self._process_lock():
+            self._clear_files()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': self._count,
+                'bytes': self._count * (4 * (self.dim or 0) + self.KEY_SIZE),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,254 @@
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import JOB_ARTIFACT_DIR, JOB_POLL_INTERVAL_SECONDS
+from app.services.chunking import ChunkingService
+from app.services.document_processor import DocumentProcessor
+from app.services.job_queue import JobQueue
+
+INGEST_JOB = "ingest_document"
+
+# Chunks embedded per progress update
+_EMBED_PROGRESS_BATCH = 64
+# Heartbeats are sent well within JOB_STALE_SECONDS while a job runs
+_HEARTBEAT_INTERVAL_SECONDS = 15
+
+ProgressCallback = Callable[[str, int, str], None]
+
+
+def extract_text(file_path: str, reuse_processed: bool = False) -> Tuple[str, int]:
+    """
+    Extract a document's text, saving it under PROCESSED_DIR.
+
+    Args:
+        file_path: Path to the document file
+        reuse_processed: Read the previously saved text instead of
+            extracting again, if it is at least as new as the file
+
+    Returns:
+        Tuple of (text, char_count)
+    """
+    if reuse_processed:
+        processed_path = DocumentProcessor.processed_path(file_path)
+        try:
+            if (processed_path.stat().st_size > 0 and
+                    processed_path.stat().st_mtime >= Path(file_path).stat().st_mtime):
+                text = processed_path.read_text(encoding="utf-8")
+                print(f"♻️ Reusing extracted text: {processed_path.name}")
+                return text, len(text)
+        except OSError:
+            pass  # Not extracted yet, fall through
+
+    return DocumentProcessor.process_document(file_path)
+
+
+def prepare_document(embedding_service, chunking_service: ChunkingService, file_path: str,
+                     document_id: str, metadata: Dict[str, Any] = None, reuse_processed: bool = False,
+                     progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """
+    Extract, chunk and embed a document without touching the vector store.
+
+    Args:
+        embedding_service: Service providing ``embed_chunks``
+        chunking_service: Service used to split the text
+        file_path: Path to the document file
+        document_id: Unique identifier for the document
+        metadata: Additional metadata for the document
+        reuse_processed: Reuse previously extracted text (see extract_text)
+        progress: Optional ``(stage, percent, details)`` callback
+
+    Returns:
+        Result dict; on success it carries the 'chunks' and their 'embeddings'
+    """
+    def report(stage: str, percent: int, details: str = ""):
+        if progress is not None:
+            progress(stage, percent, details)
+
+    report("extracting", 10, "Starting text extraction...")
+    text, char_count = extract_text(file_path, reuse_processed)
+    report("extracting", 30, f"Extracted {char_count} characters")
+
+    if not text.strip():
+        return {
+            'success': False,
+            'error': 'No text could be extracted from document',
+            'document_id': document_id
+        }
+
+    report("chunking", 40, "Splitting into chunks...")
+    doc_metadata = metadata or {}
+    doc_metadata.update({
+        'file_path': str(file_path),
+        'char_count': char_count,
+        'filename': Path(file_path).name
+    })
+    chunks = chunking_service.chunk_text(text=text, document_id=document_id, metadata=doc_metadata)
+    report("chunking", 50, f"Created {len(chunks)} chunks")
+
+    report("embedding", 60, "Generating embeddings...")
+    texts = [chunk['text'] for chunk in chunks]
+    batches = []
+    for start in range(0, len(texts), _EMBED_PROGRESS_BATCH):
+        batches.append(embedding_service.embed_chunks(texts[start:start + _EMBED_PROGRESS_BATCH]))
+        done = min(start + _EMBED_PROGRESS_BATCH, len(texts))
+        report("embedding", 60 + int(done / len(texts) * 30), f"Embedded {done}/{len(texts)} chunks")
+
+    return {
+        'success': True,
+        'document_id': document_id,
+        'char_count': char_count,
+        'processed_path': str(DocumentProcessor.processed_path(file_path)),
+        'chunks_created': len(chunks),
+        'metadata': doc_metadata,
+        'chunks': chunks,
+        'embeddings': np.vstack(batches).astype(np.float32) if batches else np.zeros((0, 0), np.float32),
+    }
+
+
+def save_prepared(path: Path, chunks: List[Dict[str, Any]], embeddings: np.ndarray):
+    """Write prepared chunks and embeddings for the API process to index."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp_path, embeddings=embeddings, chunks=np.array(json.dumps(chunks, default=str)))
+    os.replace(tmp_path, path)
+
+
+def load_prepared(path: Path) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    with np.load(path, allow_pickle=False) as data:
+        return json.loads(str(data['chunks'])), data['embeddings']
+
+
+class IngestWorker:
+    """
+    Runs ingestion jobs from the queue: extraction, chunking and embedding.
+
+    Workers never write the vector store. Each job's chunks and embeddings
+    are saved to an artifact file and the job is marked ready; the API
+    process indexes it (see app.utils.job_monitor). The embedding model is
+    loaded on the first job.
+    """
+
+    def __init__(self, queue: JobQueue, embedding_service=None,
+                 chunking_service: Optional[ChunkingService] = None,
+                 worker_id: Optional[str] = None, artifact_dir: Path = JOB_ARTIFACT_DIR):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.artifact_dir = Path(artifact_dir)
+        self._embedding_service = embedding_service
+        self.chunking_service = chunking_service or ChunkingService(chunk_size=1000, chunk_overlap=200)
+
+    @property
+    def embedding_service(self):
+        if self._embedding_service is None:
+            from app.services.embedding import EmbeddingService
+            self._embedding_service = EmbeddingService()
+        return self._embedding_service
+
+    def run_once(self) -> bool:
+        """Process one queued job; False if the queue was empty."""
+        job = self.queue.claim(self.worker_id)
+        if job is None:
+            return False
+
+        print(f"⚙️ Worker {self.worker_id} processing job {job['id']} ({job['job_type']})")
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(_HEARTBEAT_INTERVAL_SECONDS):
+                self.queue.heartbeat(job['id'], self.worker_id)
+
+        threading.Thread(target=heartbeat, name="job-heartbeat", daemon=True).start()
+        try:
+            result = self._run_job(job)
+        except Exception as e:
+            print(f"❌ Job {job['id']} failed: {e}")
+            result = {'success': False, 'error': str(e)}
+        finally:
+            stop_heartbeat.set()
+
+        if not self.queue.mark_ready(job['id'], self.worker_id, result):
+            print(f"⚠️ Job {job['id']} was reassigned or cancelled, discarding this worker's result")
+            if result.get('artifact'):
+                Path(result['artifact']).unlink(missing_ok=True)
+        return True
+
+    def _run_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        if job['job_type'] != INGEST_JOB:
+            raise ValueError(f"Unknown job type: {job['job_type']}")
+
+        payload = job['payload']
+        prepared = prepare_document(
+            self.embedding_service,
+            self.chunking_service,
+            file_path=payload['file_path'],
+            document_id=payload['document_id'],
+            metadata=payload.get('metadata'),
+            reuse_processed=payload.get('reuse_processed', False),
+            progress=lambda stage, percent, details: self.queue.update_progress(
+                job['id'], self.worker_id, stage, percent, details
+            ),
+        )
+        if not prepared['success']:
+            return prepared
+
+        artifact = self.artifact_dir / f"{job['id']}.npz"
+        save_prepared(artifact, prepared.pop('chunks'), prepared.pop('embeddings'))
+        prepared['artifact'] = str(artifact)
+        return prepared
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None,
+                    poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        """Process jobs until ``stop_event`` is set, polling while idle."""
+        stop_event = stop_event or threading.Event()
+        print(f"👷 Ingestion worker {self.worker_id} started")
+        while not stop_event.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as e:
+                print(f"❌ Worker {self.worker_id} error: {e}")
+            stop_event.wait(poll_interval)
+        print(f"👋 Ingestion worker {self.worker_id} stopped")
+
+
+def worker_process_main(index: int = 0):
+    """Entry point of one worker process; stops on SIGTERM or SIGINT."""
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+    worker = IngestWorker(JobQueue(), worker_id=f"{socket.gethostname()}-{os.getpid()}-{index}")
+    worker.run_forever(stop_event)
+
+
+def start_worker_processes(count: int) -> List[multiprocessing.Process]:
+    """Start ``count`` worker processes (spawned, so they share no state with the caller)."""
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for index in range(count):
+        # Not daemonic: workers start their own PDF extraction processes
+        process = context.Process(target=worker_process_main, args=(index,), name=f"ingest-worker-{index}")
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def stop_worker_processes(processes: List[multiprocessing.Process], timeout: float = 10.0):
+    """Ask workers to stop after their current job, killing any that don't in time."""
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            process.kill()
+            process.join()
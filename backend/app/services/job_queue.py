@@ -0,0 +1,276 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import JOB_MAX_ATTEMPTS, JOB_QUEUE_PATH, JOB_STALE_SECONDS
+
+# Job lifecycle: a worker claims a queued job and, once its work is done,
+# hands it back as ready; the API process (the only writer of the vector
+# store) then commits the result and marks it completed or failed
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_READY = "ready"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    job_type TEXT NOT NULL,
+    ref TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    details TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_ref ON jobs (ref, created_at);
+"""
+
+
+class JobQueue:
+    """
+    Durable job queue in a SQLite database, shared by the API and workers.
+
+    Every call opens its own short-lived connection, so one JobQueue can be
+    used from any thread and any number of processes can share the file.
+    Claiming takes SQLite's write lock, so each job goes to one worker.
+    """
+
+    def __init__(self, db_path: Path = JOB_QUEUE_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def enqueue(self, job_type: str, payload: Dict[str, Any], ref: Optional[str] = None) -> str:
+        """
+        Queue a job.
+
+        Args:
+            job_type: Kind of work, used by workers to dispatch
+            payload: JSON-serializable job arguments
+            ref: Optional external key (e.g. a document id) to look jobs up by
+
+        Returns:
+            The new job's id
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, job_type, ref, payload, status, stage, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, ref, json.dumps(payload, default=str), JOB_QUEUED, JOB_QUEUED, now, now),
+            )
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job for ``worker_id``, or None if there is none."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (JOB_QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker_id = ?, attempts = attempts + 1, "
+                    "stage = 'starting', heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                    (JOB_RUNNING, worker_id, now, now, row['id']),
+                )
+                job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self._to_dict(job)
+
+    def update_progress(self, job_id: str, worker_id: str, stage: str, progress: int, details: str = ""):
+        """Record a running job's progress; doubles as its heartbeat."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, details = ?, heartbeat_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND worker_id = ?",
+                (stage, int(progress), details, now, now, job_id, JOB_RUNNING, worker_id),
+            )
+
+    def heartbeat(self, job_id: str, worker_id: str):
+        """Tell the queue ``worker_id`` is still working on ``job_id``."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ? AND worker_id = ?",
+                (time.time(), job_id, JOB_RUNNING, worker_id),
+            )
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None, from_status: Optional[str] = None,
+                from_worker: Optional[str] = None, **fields) -> bool:
+        assignments = ["status = ?", "updated_at = ?"]
+        values: List[Any] = [status, time.time()]
+        if result is not None:
+            assignments.append("result = ?")
+            values.append(json.dumps(result, default=str))
+        if error is not None:
+            assignments.append("error = ?")
+            values.append(error)
+        for column, value in fields.items():
+            assignments.append(f"{column} = ?")
+            values.append(value)
+        query = f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?"
+        values.append(job_id)
+        if from_status is not None:
+            query += " AND status = ?"
+            values.append(from_status)
+        if from_worker is not None:
+            query += " AND worker_id = ?"
+            values.append(from_worker)
+        with self._connect() as conn:
+            return conn.execute(query, values).rowcount > 0
+
+    def mark_ready(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """
+        A worker finished its part; the result waits for the API to commit it.
+
+        Returns:
+            False if the job was meanwhile recovered and handed to another worker
+        """
+        return self._finish(job_id, JOB_READY, result=result, from_status=JOB_RUNNING, from_worker=worker_id,
+                     stage="indexing", progress=90, details="Waiting to be indexed")
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> bool:
+        """
+        The API committed a ready job's result.
+
+        Returns:
+            False if the job was meanwhile cancelled (see cancel_for_ref)
+        """
+        return self._finish(job_id, JOB_COMPLETED, result=result, from_status=JOB_READY,
+                            stage="complete", progress=100, details="")
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, JOB_FAILED, error=error, stage="error", progress=0, details=error)
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS,
+                      max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """
+        Recover jobs whose worker stopped heartbeating (e.g. it crashed).
+
+        They are queued again, or handed to the API as failed once they have
+        used ``max_attempts`` attempts.
+
+        Returns:
+            Number of jobs recovered
+        """
+        cutoff = time.time() - stale_seconds
+        with self._connect() as conn:
+            stale = conn.execute(
+                "SELECT id, attempts FROM jobs WHERE status = ? AND heartbeat_at < ?", (JOB_RUNNING, cutoff)
+            ).fetchall()
+        for row in stale:
+            if row['attempts'] >= max_attempts:
+                error = f"Worker stopped responding after {row['attempts']} attempts"
+                self._finish(row['id'], JOB_READY, result={'success': False, 'error': error},
+                             from_status=JOB_RUNNING)
+            else:
+                self._finish(row['id'], JOB_QUEUED, from_status=JOB_RUNNING,
+                             stage=JOB_QUEUED, progress=0, details="Retrying", worker_id=None)
+        return len(stale)
+
+    def cancel_for_ref(self, ref: str, error: str) -> List[Dict[str, Any]]:
+        """
+        Fail ``ref``'s unfinished (queued, running or ready) jobs, e.g. because
+        their document was deleted. A worker still running one then cannot
+        mark it ready and discards its result.
+
+        Returns:
+            The cancelled jobs, as they were before cancelling
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE ref = ? AND status IN (?, ?, ?)", (ref, JOB_QUEUED, JOB_RUNNING, JOB_READY)
+            ).fetchall()
+        cancelled = []
+        for row in rows:
+            job = self._to_dict(row)
+            if self._finish(job['id'], JOB_FAILED, error=error, from_status=job['status'],
+                            stage="error", progress=0, details=error):
+                cancelled.append(job)
+        return cancelled
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def latest_for_ref(self, ref: str) -> Optional[Dict[str, Any]]:
+        """Most recently queued job for ``ref``."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE ref = ? ORDER BY created_at DESC LIMIT 1", (ref,)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 100,
+                  updated_since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Jobs, oldest first, optionally filtered by status and last update."""
+        query, values = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status is not None:
+            query += " AND status = ?"
+            values.append(status)
+        if updated_since is not None:
+            query += " AND updated_at > ?"
+            values.append(updated_since)
+        query += " ORDER BY created_at LIMIT ?"
+        values.append(limit)
+        with self._connect() as conn:
+            return [self._to_dict(row) for row in conn.execute(query, values).fetchall()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = conn.execute(
+                "SELECT MIN(created_at) FROM jobs WHERE status = ?", (JOB_QUEUED,)
+            ).fetchone()[0]
+        return {
+            'queued': counts.get(JOB_QUEUED, 0),
+            'running': counts.get(JOB_RUNNING, 0),
+            'ready': counts.get(JOB_READY, 0),
+            'completed': counts.get(JOB_COMPLETED, 0),
+            'failed': counts.get(JOB_FAILED, 0),
+            'oldest_queued_seconds': time.time() - oldest if oldest else 0.0,
+        }
@@ -0,0 +1,201 @@
+import json
+import math
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words, and identifiers joined by - . / _ (e.g. "PN-4821/B", "v2.3.1")
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+_PART_PATTERN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms of ``text``.
+
+    Compound identifiers are kept whole and also split into their parts, so
+    "PN-4821" matches a query for "PN-4821" exactly as well as for "4821".
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        parts = _PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
+
+
+class LexicalIndex:
+    """
+    Inverted index with BM25 scoring, row-aligned with the vector index.
+
+    Row ids are the vector ids, so lexical hits resolve through the same
+    chunk store. Postings are kept in memory as compact arrays per term;
+    on disk, ``terms.jsonl`` holds one line of term frequencies per row and
+    is only appended to. The index is derived data: ``sync`` trims rows the
+    chunk store no longer has and indexes rows it is missing, so stores
+    created before the index existed pick it up on load.
+    """
+
+    def __init__(self, index_dir: Path):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.terms_path = self.index_dir / "terms.jsonl"
+
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._lengths = array('i')
+        self._total_length = 0
+        self._file = None
+        self._load()
+
+    def _load(self):
+        rows: List[Dict[str, int]] = []
+        valid_bytes = 0
+        if self.terms_path.exists():
+            with open(self.terms_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Partially written trailing line
+                    try:
+                        rows.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+                    valid_bytes += len(line)
+            if valid_bytes < self.terms_path.stat().st_size:
+                with open(self.terms_path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+        for frequencies in rows:
+            self._index_row(frequencies)
+        self._file = open(self.terms_path, 'a', encoding='utf-8')
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _index_row(self, frequencies: Dict[str, int]):
+        row = len(self._lengths)
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array('i'), array('i'))
+            postings[0].append(row)
+            postings[1].append(frequency)
+        length = sum(frequencies.values())
+        self._lengths.append(length)
+        self._total_length += length
+
+    def add(self, start_row: int, texts: List[str]):
+        """Index ``texts`` as rows ``start_row``, ``start_row + 1``, ..."""
+        if start_row != len(self):
+            raise ValueError(f"Lexical index has {len(self)} rows, cannot add at row {start_row}")
+        lines = []
+        for text in texts:
+            frequencies = dict(Counter(tokenize(text)))
+            self._index_row(frequencies)
+            lines.append(json.dumps(frequencies, separators=(',', ':')) + "\n")
+        self._file.write("".join(lines))
+        self._file.flush()
+
+    def sync(self, chunk_store) -> int:
+        """
+        Align the index with ``chunk_store``.
+
+        Returns:
+            Number of rows indexed from the chunk store
+        """
+        if len(self) > len(chunk_store):
+            print("⚠️ Lexical index is ahead of the chunk store, rebuilding")
+            self.reset()
+        missing = range(len(self), len(chunk_store))
+        for start in range(missing.start, missing.stop, 1000):
+            rows = range(start, min(start + 1000, missing.stop))
+            self.add(start, [chunk['text'] for chunk in chunk_store.get_many(rows)])
+        if len(missing):
+            print(f"🔤 Indexed {len(missing)} chunks for lexical search")
+        return len(missing)
+
+    def search(self, query: str, top_k: int,
+               ranges: Optional[Iterable[Tuple[int, int]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        BM25 search.
+
+        Args:
+            query: Query text
+            top_k: Number of rows to return
+            ranges: Optional ``[start, end)`` row ranges to restrict results to
+
+        Returns:
+            (scores, rows) arrays, best first; only rows matching a query term
+        """
+        count = len(self)
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term in self._postings]
+        if count == 0 or not terms:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)
+        average_length = self._total_length / count if self._total_length else 1.0
+        scores = np.zeros(count, dtype=np.float32)
+        for term in terms:
+            rows, frequencies = (np.frombuffer(values, dtype=np.int32) for values in self._postings[term])
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            tf = frequencies.astype(np.float32)
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / average_length)
+            scores[rows] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        if ranges is not None:
+            mask = np.zeros(count, dtype=bool)
+            for start, end in ranges:
+                mask[start:end] = True
+            scores[~mask] = 0.0
+
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        order = matched[np.argsort(-scores[matched], kind='stable')]
+        return scores[order], order.astype(np.int64)
+
+    def copy_rows(self, ranges: List[Tuple[int, int]], target_dir: Path):
+        """Write the rows in sorted ``[start, end)`` ``ranges``, renumbered from 0, to ``target_dir``."""
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        self._file.flush()
+        ranges = iter(ranges)
+        current = next(ranges, None)
+        with open(self.terms_path, 'rb') as source, open(target_dir / "terms.jsonl", 'wb') as target:
+            for row, line in enumerate(source):
+                while current is not None and row >= current[1]:
+                    current = next(ranges, None)
+                if current is None:
+                    break
+                if row >= current[0]:
+                    target.write(line)
+
+    def reset(self):
+        """Delete all indexed rows."""
+        if self._file is not None:
+            self._file.close()
+        self.terms_path.unlink(missing_ok=True)
+        self._postings = {}
+        self._lengths = array('i')
+        self._total_length = 0
+        self._file = open(self.terms_path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'rows': len(self),
+            'terms': len(self._postings),
+            'average_length': self._total_length / len(self) if len(self) else 0.0,
+        }
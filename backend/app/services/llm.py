@@ -1,12 +1,26 @@
 import os
+import json
 import torch
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Tuple
 from abc import ABC, abstractmethod
 import time
-import requests
 import gc
 
+import httpx
+
+from app.config import (
+    GROQ_BASE_URL, LLM_DISPATCH_MODE, LLM_HEDGE_DEFAULT_DELAY_SECONDS, LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_HEDGE_MIN_SAMPLES, LLM_HEDGE_PERCENTILE, LLM_ROUTING, LLM_WARMUP_CHECK_API, OPENAI_BASE_URL
+)
+from app.services.llm_routing import CircuitBreaker, CircuitOpenError, LatencyHistogram
+from app.utils.executors import LLM_POOL, run_in_executor
+from app.utils.http_clients import AsyncClientPool, llm_http_limits, llm_http_timeout
+from app.utils.streaming import iterate_in_thread
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,7 +32,8 @@ try:
         AutoTokenizer,
         AutoModelForCausalLM,
         pipeline,
-        BitsAndBytesConfig
+        BitsAndBytesConfig,
+        TextIteratorStreamer
     )
     TRANSFORMERS_AVAILABLE = True
 except ImportError:
@@ -36,7 +51,7 @@ except ImportError:
 
 # Try importing OpenAI
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI, OpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
@@ -50,6 +65,31 @@ class BaseLLM(ABC):
         """Generate response from the LLM."""
         pass
 
+    def stream_response(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        """
+        Generate a response as a stream of text deltas.
+        
+        Backends without native streaming yield the full response at once.
+        Unlike generate_response, failures raise instead of returning an
+        error message, so callers can fall back before anything was sent.
+        """
+        yield self.generate_response(prompt, max_tokens=max_tokens, temperature=temperature)
+
+    async def agenerate_response(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7) -> str:
+        """
+        Async generate_response.
+        
+        Backends without an async client run generate_response on the LLM
+        executor, so a slow local generation never blocks the event loop.
+        """
+        return await run_in_executor(
+            LLM_POOL, self.generate_response, prompt, max_tokens=max_tokens, temperature=temperature
+        )
+
+    async def aclose(self):
+        """Close the backend's async client, if it has one."""
+        pass
+
     @abstractmethod
     def is_available(self) -> bool:
         """Check if the LLM is available and working."""
@@ -57,9 +97,15 @@ class BaseLLM(ABC):
 
 
 class LocalLLM(BaseLLM):
-    """Local LLM using llama-cpp-python (preferred) or Transformers (fallback) with GPU acceleration."""
+    """
+    Local LLM using llama-cpp-python (preferred) or Transformers (fallback) with GPU acceleration.
+    
+    With ``lazy=True`` no model is loaded until ensure_loaded, which the
+    first generation calls; until then the backend counts as available.
+    """
 
-    def __init__(self, model_path: str = None, use_4bit_quantization: bool = True, n_gpu_layers: int = -1):
+    def __init__(self, model_path: str = None, use_4bit_quantization: bool = True, n_gpu_layers: int = -1,
+                 lazy: bool = False):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model = None
         self.tokenizer = None # Only used if falling back to transformers pipeline
@@ -69,6 +115,8 @@ class LocalLLM(BaseLLM):
         self.model_path = model_path # Path to .gguf model or transformers model ID
         self.use_4bit_quantization = use_4bit_quantization and torch.cuda.is_available()
         self.n_gpu_layers = n_gpu_layers # Number of layers to offload to GPU (-1 for all)
+        self._load_lock = threading.Lock()
+        self._load_attempted = False
 
         # Pre-defined order of preference for local model loading
         # Prioritize GGUF models for low VRAM
@@ -91,7 +139,22 @@ class LocalLLM(BaseLLM):
             "distilgpt2",
         ]
 
-        self._initialize_model()
+        if not lazy:
+            self._load_attempted = True
+            self._initialize_model()
+
+    def ensure_loaded(self) -> bool:
+        """Load the model on the first call (concurrent callers wait for it); whether one is loaded."""
+        if not self._load_attempted:
+            with self._load_lock:
+                if not self._load_attempted:
+                    try:
+                        self._initialize_model()
+                    except Exception as e:
+                        logger.error(f"❌ Failed to initialize local LLM: {e}")
+                    finally:
+                        self._load_attempted = True
+        return self._available
 
     def _get_quantization_config(self):
         """Get 4-bit quantization config for memory efficiency (for transformers models)."""
@@ -283,7 +346,7 @@ class LocalLLM(BaseLLM):
 
     def generate_response(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> str:
         """Generate response using local LLM with optimized settings for QA."""
-        if not self._available:
+        if not self.ensure_loaded():
             raise Exception("Local LLM not available")
         
         try:
@@ -304,23 +367,7 @@ class LocalLLM(BaseLLM):
                 generated_text = response_obj['choices'][0]['text'].strip()
             elif self.pipeline: # Using Transformers pipeline
                 logger.debug(f"Generating response with Transformers pipeline for prompt: {prompt[:100]}...")
-                generation_kwargs = {
-                    "max_new_tokens": max_tokens,
-                    "temperature": temperature,
-                    "do_sample": True if temperature > 0.0 else False,
-                    "pad_token_id": self.tokenizer.eos_token_id,
-                    "eos_token_id": self.tokenizer.eos_token_id,
-                    "repetition_penalty": 1.1,
-                    # "length_penalty": 1.0, # Not always compatible with all models or sampling strategies
-                    "early_stopping": True,
-                    "num_beams": 1, # Keep at 1 for speed on consumer hardware
-                }
-                
-                if generation_kwargs["do_sample"]:
-                    generation_kwargs.update({
-                        "top_k": 50,
-                        "top_p": 0.95,
-                    })
+                generation_kwargs = self._generation_kwargs(max_tokens, temperature)
                 
                 with torch.no_grad(): # Save memory
                     response = self.pipeline(prompt, **generation_kwargs)
@@ -345,6 +392,67 @@ class LocalLLM(BaseLLM):
             logger.error(f"Error generating response with local LLM: {e}")
             return "I encountered an error while generating a response."
     
+    def _generation_kwargs(self, max_tokens: int, temperature: float) -> Dict[str, Any]:
+        """Transformers generation settings shared by blocking and streaming generation."""
+        generation_kwargs = {
+            "max_new_tokens": max_tokens,
+            "temperature": temperature,
+            "do_sample": True if temperature > 0.0 else False,
+            "pad_token_id": self.tokenizer.eos_token_id,
+            "eos_token_id": self.tokenizer.eos_token_id,
+            "repetition_penalty": 1.1,
+            # "length_penalty": 1.0, # Not always compatible with all models or sampling strategies
+            "early_stopping": True,
+            "num_beams": 1, # Keep at 1 for speed on consumer hardware
+        }
+        
+        if generation_kwargs["do_sample"]:
+            generation_kwargs.update({
+                "top_k": 50,
+                "top_p": 0.95,
+            })
+        return generation_kwargs
+
+    def stream_response(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> Iterator[str]:
+        """Stream a response from the local model token by token."""
+        if not self.ensure_loaded():
+            raise Exception("Local LLM not available")
+        
+        max_tokens = min(max_tokens, 512)
+        temperature = max(0.0, min(temperature, 1.0))
+        
+        if LLAMA_CPP_AVAILABLE and isinstance(self.model, Llama): # Using llama-cpp-python
+            stream = self.model.create_completion(
+                prompt=prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=0.95,
+                repeat_penalty=1.1,
+                stop=["\n###", "\n##", "\n\n", "Question:", "User:", "###", "##"],
+                stream=True
+            )
+            for chunk in stream:
+                text = chunk['choices'][0]['text']
+                if text:
+                    yield text
+        elif self.pipeline: # Using Transformers with a background generate()
+            streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+            generation_kwargs = dict(inputs, streamer=streamer, **self._generation_kwargs(max_tokens, temperature))
+            
+            def generate():
+                with torch.no_grad():
+                    self.model.generate(**generation_kwargs)
+            
+            thread = threading.Thread(target=generate, name="local-llm-generate", daemon=True)
+            thread.start()
+            for text in streamer:
+                if text:
+                    yield text
+            thread.join()
+        else:
+            raise Exception("No active local model to generate response.")
+
     def _post_process_qa_response(self, text: str, original_prompt: str) -> str:
         """Enhanced post-processing specifically for QA responses."""
         if not text:
@@ -391,18 +499,29 @@ class LocalLLM(BaseLLM):
         return text
     
     def is_available(self) -> bool:
-        """Check if local LLM is available."""
-        return self._available
+        """Check if local LLM is available (or not loaded yet, and may be)."""
+        return self._available or not self._load_attempted
 
 
 class OpenAILLM(BaseLLM):
-    """OpenAI API-based LLM - optimized for QA tasks."""
+    """
+    OpenAI API-based LLM - optimized for QA tasks.
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo-0125"):
+    The sync and async clients each keep a pool of keep-alive connections;
+    async requests are limited to LLM_MAX_CONCURRENCY at a time.
+    """
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-3.5-turbo-0125",
+                 base_url: Optional[str] = OPENAI_BASE_URL):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
+        self.base_url = base_url
         self._available = False
         self.client = None
+        self._async = AsyncClientPool(lambda: AsyncOpenAI(
+            api_key=self.api_key, base_url=self.base_url,
+            http_client=httpx.AsyncClient(limits=llm_http_limits(), timeout=llm_http_timeout())
+        ))
         
         if not OPENAI_AVAILABLE:
             logger.warning("OpenAI library not available. Install with: pip install openai")
@@ -413,8 +532,11 @@ class OpenAILLM(BaseLLM):
             return
             
         try:
-            self.client = OpenAI(api_key=self.api_key)
-            self._test_connection()
+            self.client = OpenAI(
+                api_key=self.api_key, base_url=self.base_url,
+                http_client=httpx.Client(limits=llm_http_limits(), timeout=llm_http_timeout())
+            )
+            # The connection is checked by LLMService.warm_up, not here, so creating the backend costs no request
             self._available = True
             logger.info(f"✅ OpenAI LLM initialized with model: {self.model}")
         except Exception as e:
@@ -443,43 +565,85 @@ class OpenAILLM(BaseLLM):
             raise Exception("OpenAI LLM not available")
         
         try:
-            # Create messages for chat completion
-            messages = [
-                {
-                    "role": "system", 
-                    "content": "You are a helpful assistant that answers questions accurately based on provided context. If you don't know the answer, say so clearly."
-                },
-                {"role": "user", "content": prompt}
-            ]
+            response = self.client.chat.completions.create(**self._completion_kwargs(prompt, max_tokens, temperature))
+            return self._response_text(response)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=0.95,
-                frequency_penalty=0.1,
-                presence_penalty=0.1
-            )
-            
-            if not response.choices or not response.choices[0].message.content:
-                raise Exception("Empty response from OpenAI API")
-            
-            return response.choices[0].message.content.strip()
+        except Exception as e:
+            logger.error(f"Error generating response with OpenAI: {e}")
+            return "I encountered an error while generating a response."
+    
+    async def agenerate_response(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7) -> str:
+        """Generate a response with the pooled async OpenAI client."""
+        if not self._available or not self.client:
+            raise Exception("OpenAI LLM not available")
+        
+        try:
+            async with self._async.request() as client:
+                response = await client.chat.completions.create(
+                    **self._completion_kwargs(prompt, max_tokens, temperature)
+                )
+            return self._response_text(response)
             
         except Exception as e:
             logger.error(f"Error generating response with OpenAI: {e}")
             return "I encountered an error while generating a response."
     
+    async def aclose(self):
+        await self._async.aclose()
+    
+    def _completion_kwargs(self, prompt: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": self._build_messages(prompt),
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": 0.95,
+            "frequency_penalty": 0.1,
+            "presence_penalty": 0.1
+        }
+    
+    @staticmethod
+    def _response_text(response) -> str:
+        if not response.choices or not response.choices[0].message.content:
+            raise Exception("Empty response from OpenAI API")
+        return response.choices[0].message.content.strip()
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system", 
+                "content": "You are a helpful assistant that answers questions accurately based on provided context. If you don't know the answer, say so clearly."
+            },
+            {"role": "user", "content": prompt}
+        ]
+    
+    def stream_response(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        """Stream a response from the OpenAI API as content deltas."""
+        if not self._available or not self.client:
+            raise Exception("OpenAI LLM not available")
+        
+        stream = self.client.chat.completions.create(
+            **self._completion_kwargs(prompt, max_tokens, temperature), stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
     def is_available(self) -> bool:
         """Check if OpenAI LLM is available."""
         return self._available
 
 
 class GroqLLM(BaseLLM):
-    """Groq-hosted LLM via OpenAI-compatible API - optimized for fast inference."""
+    """
+    Groq-hosted LLM via OpenAI-compatible API - optimized for fast inference.
+    
+    Requests go through pooled httpx clients (one sync, one async), so
+    connections are reused instead of paying a TCP and TLS handshake per
+    call; async requests are limited to LLM_MAX_CONCURRENCY at a time.
+    """
     
-    def __init__(self, api_key: str = None, model: str = "llama3-8b-8192"):
+    def __init__(self, api_key: str = None, model: str = "llama3-8b-8192", base_url: str = GROQ_BASE_URL):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         # Updated model options for better QA performance (Groq models change)
         self.model = model
@@ -490,19 +654,19 @@ class GroqLLM(BaseLLM):
             return
         
         # Groq's API is OpenAI-compatible but uses its own base URL
-        self.endpoint = "https://api.groq.com/openai/v1/chat/completions"
+        self.endpoint = f"{base_url.rstrip('/')}/chat/completions"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.client = httpx.Client(headers=self.headers, limits=llm_http_limits(), timeout=llm_http_timeout())
+        self._async = AsyncClientPool(lambda: httpx.AsyncClient(
+            headers=self.headers, limits=llm_http_limits(), timeout=llm_http_timeout()
+        ))
         
-        # Test connection at initialization
-        try:
-            self._test_connection()
-            self._available = True
-            logger.info(f"✅ Groq LLM initialized with model: {self.model}")
-        except Exception as e:
-            logger.error(f"Failed to initialize Groq LLM: {e}")
+        # The connection is checked by LLMService.warm_up, not here, so creating the backend costs no request
+        self._available = True
+        logger.info(f"✅ Groq LLM initialized with model: {self.model}")
     
     def _test_connection(self):
         """Test Groq API connection."""
@@ -516,12 +680,7 @@ class GroqLLM(BaseLLM):
             "temperature": 0.1
         }
         try:
-            response = requests.post(
-                self.endpoint, 
-                headers=self.headers, 
-                json=data, 
-                timeout=10
-            )
+            response = self.client.post(self.endpoint, json=data, timeout=10)
             response.raise_for_status() # Raises HTTPError for bad responses (4xx or 5xx)
             response_json = response.json()
             if not response_json.get("choices"):
@@ -536,6 +695,52 @@ class GroqLLM(BaseLLM):
         if not self._available:
             raise Exception("Groq LLM not available")
         
+        data = self._build_payload(prompt, max_tokens, temperature)
+        
+        try:
+            response = self.client.post(self.endpoint, json=data)
+            return self._response_text(response)
+            
+        except httpx.TimeoutException:
+            logger.error("Groq API request timed out")
+            return "The request timed out. Please try again."
+        except Exception as e:
+            logger.error(f"Groq API error: {e}")
+            return "I encountered an error while generating a response."
+    
+    async def agenerate_response(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7) -> str:
+        """Generate a response with the pooled async client."""
+        if not self._available:
+            raise Exception("Groq LLM not available")
+        
+        data = self._build_payload(prompt, max_tokens, temperature)
+        
+        try:
+            async with self._async.request() as client:
+                response = await client.post(self.endpoint, json=data)
+            return self._response_text(response)
+            
+        except httpx.TimeoutException:
+            logger.error("Groq API request timed out")
+            return "The request timed out. Please try again."
+        except Exception as e:
+            logger.error(f"Groq API error: {e}")
+            return "I encountered an error while generating a response."
+    
+    async def aclose(self):
+        await self._async.aclose()
+    
+    @staticmethod
+    def _response_text(response: httpx.Response) -> str:
+        response.raise_for_status()
+        response_data = response.json()
+        
+        if not response_data.get("choices") or not response_data["choices"][0].get("message", {}).get("content"):
+            raise Exception("Empty response from Groq API")
+            
+        return response_data["choices"][0]["message"]["content"].strip()
+    
+    def _build_payload(self, prompt: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
         # Create optimized messages for QA
         messages = [
             {
@@ -545,7 +750,7 @@ class GroqLLM(BaseLLM):
             {"role": "user", "content": prompt}
         ]
         
-        data = {
+        return {
             "model": self.model,
             "messages": messages,
             "max_tokens": max_tokens,
@@ -555,28 +760,27 @@ class GroqLLM(BaseLLM):
             "presence_penalty": 0.1,
             "stop": None # Let the model decide or use specific tokens if needed
         }
+    
+    def stream_response(self, prompt: str, max_tokens: int = 512, temperature: float = 0.7) -> Iterator[str]:
+        """Stream a response from the Groq API by reading its SSE stream."""
+        if not self._available:
+            raise Exception("Groq LLM not available")
         
-        try:
-            response = requests.post(
-                self.endpoint, 
-                headers=self.headers, 
-                json=data, 
-                timeout=60  # Increased timeout for complex queries
-            )
+        data = self._build_payload(prompt, max_tokens, temperature)
+        data["stream"] = True
+        
+        with self.client.stream("POST", self.endpoint, json=data) as response:
             response.raise_for_status()
-            response_data = response.json()
-            
-            if not response_data.get("choices") or not response_data["choices"][0].get("message", {}).get("content"):
-                raise Exception("Empty response from Groq API")
-                
-            return response_data["choices"][0]["message"]["content"].strip()
-            
-        except requests.exceptions.Timeout:
-            logger.error("Groq API request timed out")
-            return "The request timed out. Please try again."
-        except Exception as e:
-            logger.error(f"Groq API error: {e}")
-            return "I encountered an error while generating a response."
+            for line in response.iter_lines():
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
     
     def is_available(self) -> bool:
         """Check if Groq LLM is available."""
@@ -586,7 +790,11 @@ class GroqLLM(BaseLLM):
 class LLMService:
     """Enhanced LLM service with intelligent fallback and optimization for RAG QA."""
     
-    def __init__(self, prefer_local: bool = False, local_model_path: Optional[str] = None, n_gpu_layers: int = -1):
+    DISPATCH_MODES = ("fallback", "hedged", "race")
+    ROUTING_POLICIES = ("health", "static")
+    
+    def __init__(self, prefer_local: bool = False, local_model_path: Optional[str] = None, n_gpu_layers: int = -1,
+                 dispatch_mode: str = LLM_DISPATCH_MODE, routing: str = LLM_ROUTING):
         self.local_llm = None
         self.openai_llm = None
         self.groq_llm = None
@@ -596,9 +804,27 @@ class LLMService:
         self.local_model_path = local_model_path
         self.n_gpu_layers = n_gpu_layers
         
+        self._init_dispatch(dispatch_mode, routing)
         self._initialize_llms()
         self._set_priority()
     
+    def _init_dispatch(self, dispatch_mode: str = LLM_DISPATCH_MODE, routing: str = LLM_ROUTING):
+        """
+        Dispatch mode (see LLM_DISPATCH_MODE), routing policy (see LLM_ROUTING),
+        per-backend latency histograms and circuit breakers, and hedging counters.
+        """
+        if dispatch_mode not in self.DISPATCH_MODES:
+            logger.warning(f"Unknown LLM dispatch mode '{dispatch_mode}', using 'fallback'")
+            dispatch_mode = "fallback"
+        if routing not in self.ROUTING_POLICIES:
+            logger.warning(f"Unknown LLM routing policy '{routing}', using 'health'")
+            routing = "health"
+        self.dispatch_mode = dispatch_mode
+        self.routing = routing
+        self.latency: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self.breakers: Dict[str, CircuitBreaker] = defaultdict(CircuitBreaker)
+        self.hedge_stats = {'requests': 0, 'hedged': 0, 'won_by_fallback': 0, 'cancelled': 0}
+    
     def _initialize_llms(self):
         """Initialize all available LLMs."""
         groq_key = os.getenv("GROQ_API_KEY")
@@ -626,7 +852,8 @@ class LLMService:
                 self.local_llm = LocalLLM(
                     model_path=self.local_model_path,
                     use_4bit_quantization=True, 
-                    n_gpu_layers=self.n_gpu_layers
+                    n_gpu_layers=self.n_gpu_layers,
+                    lazy=True  # Loaded by warm_up or the first local generation
                 )
             except Exception as e:
                 logger.error(f"❌ Failed to initialize local LLM: {e}")
@@ -670,12 +897,102 @@ class LLMService:
         else:
             logger.info("ℹ️ No fallback LLM available.")
 
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Load the local model and send each routed API backend a short test
+        request, so the first questions pay for neither.
+        
+        Blocking; run it off the event loop. The test requests' outcomes go
+        to the backends' circuit breakers, and the primary/fallback order is
+        set again once the local model has loaded (or failed to).
+        
+        Returns:
+            Whether a primary LLM is available, and per-backend results
+        """
+        backends = {}
+        # Bound once: cleanup() may drop self.local_llm while the model loads
+        local_llm = self.local_llm
+        if local_llm:
+            start = time.perf_counter()
+            loaded = local_llm.ensure_loaded()
+            backends["local"] = {
+                "available": loaded, "model": local_llm.model_name,
+                "seconds": round(time.perf_counter() - start, 2)
+            }
+            self._set_priority()
+        
+        for api_llm in (self.primary_llm, self.fallback_llm):
+            if not isinstance(api_llm, (OpenAILLM, GroqLLM)) or not LLM_WARMUP_CHECK_API:
+                continue
+            llm_type = self._get_llm_type(api_llm)
+            start = time.perf_counter()
+            try:
+                api_llm._test_connection()
+            except Exception as e:
+                self.breakers[llm_type].record_failure(time.perf_counter() - start)
+                backends[llm_type] = {"available": False, "error": str(e)}
+                continue
+            elapsed = time.perf_counter() - start
+            self.breakers[llm_type].record_success(elapsed)
+            backends[llm_type] = {"available": True, "model": api_llm.model, "seconds": round(elapsed, 2)}
+        
+        return {"ready": self.primary_llm is not None, "backends": backends}
+
     # ***** MODIFIED METHOD *****
     def generate_answer(self, context_chunks: List[Dict[str, Any]], question: str, 
                         max_tokens: int = 512, temperature: float = 0.3) -> Dict[str, Any]: # Added max_tokens, temperature
         """Generate answer using RAG with enhanced context processing."""
         start_time = time.time()
         
+        invalid = self._check_request(context_chunks, question, start_time)
+        if invalid:
+            return invalid
+        
+        try:
+            # Assuming _build_context, _create_enhanced_rag_prompt, _format_sources are defined correctly below
+            context_text = self._build_context(context_chunks, max_length=3000) # Increased max_length slightly
+            prompt = self._create_enhanced_rag_prompt(context_text, question)
+            
+            # ***** MODIFIED CALL *****
+            answer, llm_used = self._generate_with_fallback(prompt, max_tokens=max_tokens, temperature=temperature)
+            
+            return self._answer_result(answer, llm_used, context_chunks, context_text, start_time)
+            
+        except Exception as e:
+            logger.error(f"Error in generate_answer: {e}", exc_info=True)
+            return self._error_result(e, start_time)
+    
+    async def agenerate_answer(self, context_chunks: List[Dict[str, Any]], question: str,
+                               max_tokens: int = 512, temperature: float = 0.3) -> Dict[str, Any]:
+        """
+        Async generate_answer.
+        
+        API backends are awaited on their pooled async clients, so the number
+        of concurrent generations is bounded by LLM_MAX_CONCURRENCY per
+        backend rather than by the LLM executor's threads.
+        """
+        start_time = time.time()
+        
+        invalid = self._check_request(context_chunks, question, start_time)
+        if invalid:
+            return invalid
+        
+        try:
+            context_text = self._build_context(context_chunks, max_length=3000)
+            prompt = self._create_enhanced_rag_prompt(context_text, question)
+            
+            answer, llm_used = await self._agenerate_with_fallback(prompt, max_tokens=max_tokens, temperature=temperature)
+            
+            return self._answer_result(answer, llm_used, context_chunks, context_text, start_time)
+            
+        except Exception as e:
+            logger.error(f"Error in agenerate_answer: {e}", exc_info=True)
+            return self._error_result(e, start_time)
+    
+    @staticmethod
+    def _check_request(context_chunks: List[Dict[str, Any]], question: str,
+                       start_time: float) -> Optional[Dict[str, Any]]:
+        """The failed result for a request that cannot be answered, or None."""
         if not context_chunks:
             return {
                 "success": False, "answer": "No relevant context found to answer the question.",
@@ -689,73 +1006,280 @@ class LLMService:
                 "sources": [], "response_time": time.time() - start_time,
                 "error": "Empty question", "llm_used": "N/A"
             }
+        return None
+    
+    def _answer_result(self, answer: str, llm_used: str, context_chunks: List[Dict[str, Any]],
+                       context_text: str, start_time: float) -> Dict[str, Any]:
+        sources = self._format_sources(context_chunks) # This should format sources based on the provided context_chunks
         
-        try:
-            # Assuming _build_context, _create_enhanced_rag_prompt, _format_sources are defined correctly below
-            context_text = self._build_context(context_chunks, max_length=3000) # Increased max_length slightly
-            prompt = self._create_enhanced_rag_prompt(context_text, question)
-            
-            # ***** MODIFIED CALL *****
-            answer, llm_used = self._generate_with_fallback(prompt, max_tokens=max_tokens, temperature=temperature)
+        return {
+            "success": True, "answer": answer, "sources": sources, "llm_used": llm_used,
+            "response_time": time.time() - start_time,
+            "context_chunks_count": len(context_chunks), "context_length": len(context_text)
+        }
+    
+    @staticmethod
+    def _error_result(error: Exception, start_time: float) -> Dict[str, Any]:
+        return {
+            "success": False, "answer": "I encountered an error while processing your question.",
+            "sources": [], "response_time": time.time() - start_time,
+            "error": str(error), "llm_used": "Error"
+        }
+
+    async def stream_answer(self, context_chunks: List[Dict[str, Any]], question: str,
+                            max_tokens: int = 512, temperature: float = 0.3) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a RAG answer as events.
+        
+        Yields ``{"type": "token", "content": delta}`` for every text delta and
+        ends with a ``{"type": "done", ...}`` event carrying the same fields as
+        generate_answer plus ``time_to_first_token``. Backends are tried in
+        _route order; the next one only if the current one fails before
+        producing any text. A failure after that ends the stream with a
+        ``{"type": "error"}`` event.
+        """
+        start_time = time.time()
+        
+        if not context_chunks or not question.strip():
+            yield {"type": "done", **self.generate_answer(context_chunks, question, max_tokens, temperature)}
+            return
+        
+        context_text = self._build_context(context_chunks, max_length=3000)
+        prompt = self._create_enhanced_rag_prompt(context_text, question)
+        sources = self._format_sources(context_chunks)
+        
+        for active_llm in self._route():
+            llm_type_str = self._get_llm_type(active_llm)
+            if not self.breakers[llm_type_str].allow_request():
+                logger.info(f"⛔ Skipping {llm_type_str.upper()}: circuit breaker open")
+                continue
+            parts = []
+            time_to_first_token = None
+            logger.info(f"🎯 Streaming with {llm_type_str.upper()} (Model: {getattr(active_llm, 'model_name', getattr(active_llm, 'model', 'N/A'))})")
             
-            sources = self._format_sources(context_chunks) # This should format sources based on the provided context_chunks
+            started = time.perf_counter()
+            recorded = False
+            try:
+                try:
+                    async for token in iterate_in_thread(
+                        lambda llm=active_llm: llm.stream_response(prompt, max_tokens=max_tokens, temperature=temperature)
+                    ):
+                        if time_to_first_token is None:
+                            token = token.lstrip()
+                            if not token:
+                                continue
+                            time_to_first_token = time.time() - start_time
+                            logger.info(f"⚡ First token from {llm_type_str.upper()} after {time_to_first_token:.2f}s")
+                        parts.append(token)
+                        yield {"type": "token", "content": token}
+                except Exception as e:
+                    recorded = True
+                    self._record_outcome(active_llm, started, None)
+                    logger.error(f"Streaming with {llm_type_str} failed: {e}")
+                    if parts:
+                        yield {"type": "error", "error": str(e), "llm_used": llm_type_str, "partial_answer": "".join(parts)}
+                        return
+                    continue
+                
+                answer = "".join(parts).strip()
+                recorded = True
+                self._record_outcome(active_llm, started, answer)
+                if not answer:
+                    logger.warning(f"{llm_type_str} streamed an empty answer")
+                    continue
+            finally:
+                if not recorded:  # The client went away mid-stream
+                    self.breakers[llm_type_str].record_cancelled()
             
-            return {
-                "success": True, "answer": answer, "sources": sources, "llm_used": llm_used,
-                "response_time": time.time() - start_time,
+            yield {
+                "type": "done", "success": True, "answer": answer, "sources": sources, "llm_used": llm_type_str,
+                "response_time": time.time() - start_time, "time_to_first_token": time_to_first_token,
                 "context_chunks_count": len(context_chunks), "context_length": len(context_text)
             }
-            
-        except Exception as e:
-            logger.error(f"Error in generate_answer: {e}", exc_info=True)
-            return {
-                "success": False, "answer": "I encountered an error while processing your question.",
-                "sources": [], "response_time": time.time() - start_time,
-                "error": str(e), "llm_used": "Error"
-            }
+            return
+        
+        yield {
+            "type": "done", "success": False, "answer": "I encountered an error while processing your question.",
+            "sources": [], "response_time": time.time() - start_time,
+            "error": "No LLM available or all LLMs failed to generate a valid response.", "llm_used": "Error"
+        }
 
     # ***** MODIFIED METHOD *****
     def _generate_with_fallback(self, prompt: str, max_tokens: int, temperature: float) -> tuple[str, str]: # Added max_tokens, temperature
-        """Generate response with intelligent fallback."""
-        active_llm = None
-        llm_type_str = "N/A"
-
-        if self.primary_llm and self.primary_llm.is_available():
-            active_llm = self.primary_llm
+        """Generate response with intelligent fallback, trying backends in _route order."""
+        for position, active_llm in enumerate(self._route()):
+            role = "primary" if position == 0 else "fallback"
             llm_type_str = self._get_llm_type(active_llm)
-            logger.info(f"🎯 Using primary LLM: {llm_type_str.upper()} (Model: {getattr(active_llm, 'model_name', getattr(active_llm, 'model', 'N/A'))})")
+            if not self.breakers[llm_type_str].allow_request():
+                logger.info(f"⛔ Skipping {llm_type_str.upper()}: circuit breaker open")
+                continue
+            logger.info(f"🎯 Using {role} LLM: {llm_type_str.upper()} (Model: {getattr(active_llm, 'model_name', getattr(active_llm, 'model', 'N/A'))})")
+            started = time.perf_counter()
             try:
                 answer = active_llm.generate_response(
                     prompt, 
                     max_tokens=max_tokens,    # Use passed argument
                     temperature=temperature # Use passed argument
                 )
-                if answer and "encountered an error" not in answer.lower() and "couldn't generate" not in answer.lower(): # Basic check for valid answer
-                    return answer, llm_type_str
-                logger.warning(f"Primary LLM ({llm_type_str}) returned a non-committal or error-like answer: '{answer[:100]}...'")
             except Exception as e:
-                logger.error(f"Primary LLM ({llm_type_str}) failed: {e}")
+                self._record_outcome(active_llm, started, None)
+                logger.error(f"{role.capitalize()} LLM ({llm_type_str}) failed: {e}")
+                continue
+            if self._record_outcome(active_llm, started, answer):
+                return answer, llm_type_str
+            logger.warning(f"{role.capitalize()} LLM ({llm_type_str}) returned a non-committal or error-like answer: '{answer[:100]}...'")
         
-        if self.fallback_llm and self.fallback_llm.is_available():
-            active_llm = self.fallback_llm
+        raise Exception("No LLM available or all LLMs failed to generate a valid response.")
+    
+    async def _agenerate_with_fallback(self, prompt: str, max_tokens: int, temperature: float) -> Tuple[str, str]:
+        """
+        Async _generate_with_fallback.
+        
+        Backends are tried in _route order. In "fallback" mode the next one is
+        tried if the first fails; in "hedged" and "race" modes see
+        _agenerate_hedged.
+        """
+        candidates = self._route()
+        if self.dispatch_mode != "fallback" and len(candidates) == 2:
+            return await self._agenerate_hedged(candidates[0], candidates[1], prompt, max_tokens, temperature)
+        
+        for position, active_llm in enumerate(candidates):
+            role = "primary" if position == 0 else "fallback"
             llm_type_str = self._get_llm_type(active_llm)
-            logger.info(f"🔄 Using fallback LLM: {llm_type_str.upper()} (Model: {getattr(active_llm, 'model_name', getattr(active_llm, 'model', 'N/A'))})")
+            logger.info(f"🎯 Using {role} LLM: {llm_type_str.upper()} (Model: {getattr(active_llm, 'model_name', getattr(active_llm, 'model', 'N/A'))})")
             try:
-                answer = active_llm.generate_response(
-                    prompt,
-                    max_tokens=max_tokens,    # Use passed argument
-                    temperature=temperature # Use passed argument
-                )
-                if answer and "encountered an error" not in answer.lower() and "couldn't generate" not in answer.lower():
-                     return answer, llm_type_str
-                logger.warning(f"Fallback LLM ({llm_type_str}) also returned a non-committal or error-like answer: '{answer[:100]}...'")
-                # If fallback also fails with an error-like message, raise it to indicate generation problem
-                raise Exception(f"Fallback LLM ({llm_type_str}) generated a problematic response: {answer}")
+                answer = await self._timed_generate(active_llm, prompt, max_tokens, temperature)
+                if self._is_valid_answer(answer):
+                    return answer, llm_type_str
+                logger.warning(f"{role.capitalize()} LLM ({llm_type_str}) returned a non-committal or error-like answer: '{answer[:100]}...'")
+            except CircuitOpenError as e:
+                logger.info(f"⛔ Skipping {llm_type_str.upper()}: {e}")
             except Exception as e:
-                logger.error(f"Fallback LLM ({llm_type_str}) also failed: {e}")
+                logger.error(f"{role.capitalize()} LLM ({llm_type_str}) failed: {e}")
         
         raise Exception("No LLM available or all LLMs failed to generate a valid response.")
     
+    async def _agenerate_hedged(self, primary: BaseLLM, fallback: BaseLLM, prompt: str,
+                                max_tokens: int, temperature: float) -> Tuple[str, str]:
+        """
+        Ask the primary, and the fallback too if the primary fails or has not
+        answered within hedge_delay (immediately in "race" mode).
+        
+        The first valid answer is returned and the other request cancelled.
+        If the primary's circuit breaker is open the fallback is asked at
+        once. A local backend's generation runs on an executor thread, which keeps
+        running until it finishes even though its answer is discarded.
+        """
+        self.hedge_stats['requests'] += 1
+        delay = self.hedge_delay(primary)
+        tasks = {asyncio.create_task(self._timed_generate(primary, prompt, max_tokens, temperature)): primary}
+        hedged = False
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks, timeout=None if hedged else delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    active_llm = tasks.pop(task)
+                    llm_type_str = self._get_llm_type(active_llm)
+                    try:
+                        answer = task.result()
+                    except Exception as e:
+                        logger.error(f"LLM ({llm_type_str}) failed: {e}")
+                        continue
+                    if self._is_valid_answer(answer):
+                        if active_llm is fallback:
+                            self.hedge_stats['won_by_fallback'] += 1
+                        return answer, llm_type_str
+                    logger.warning(f"LLM ({llm_type_str}) returned a non-committal or error-like answer: '{answer[:100]}...'")
+                
+                if not hedged:
+                    hedged = True
+                    if not done:
+                        self.hedge_stats['hedged'] += 1
+                        logger.info(f"⏱️ {self._get_llm_type(primary).upper()} has not answered within {delay:.2f}s, "
+                                    f"also asking {self._get_llm_type(fallback).upper()}")
+                    tasks[asyncio.create_task(self._timed_generate(fallback, prompt, max_tokens, temperature))] = fallback
+            
+            raise Exception("No LLM available or all LLMs failed to generate a valid response.")
+        finally:
+            for task in tasks:
+                task.cancel()
+                self.hedge_stats['cancelled'] += 1
+    
+    async def _timed_generate(self, llm: BaseLLM, prompt: str, max_tokens: int, temperature: float) -> str:
+        """
+        agenerate_response through the backend's circuit breaker (raising
+        CircuitOpenError if it refuses), recording the outcome.
+        """
+        llm_type = self._get_llm_type(llm)
+        if not self.breakers[llm_type].allow_request():
+            raise CircuitOpenError(f"{llm_type} circuit breaker is open")
+        start = time.perf_counter()
+        try:
+            answer = await llm.agenerate_response(prompt, max_tokens=max_tokens, temperature=temperature)
+        except asyncio.CancelledError:
+            self.breakers[llm_type].record_cancelled()
+            raise
+        except Exception:
+            self._record_outcome(llm, start, None)
+            raise
+        self._record_outcome(llm, start, answer)
+        return answer
+    
+    def _record_outcome(self, llm: BaseLLM, start: float, answer: Optional[str]) -> bool:
+        """
+        Record a call started at ``start`` (perf_counter) in the backend's
+        circuit breaker, and a valid answer's latency in its histogram.
+        ``answer`` is None if the call raised. Returns whether it was valid.
+        """
+        elapsed = time.perf_counter() - start
+        llm_type = self._get_llm_type(llm)
+        if not self._is_valid_answer(answer):
+            self.breakers[llm_type].record_failure(elapsed)
+            return False
+        self.latency[llm_type].record(elapsed)
+        self.breakers[llm_type].record_success(elapsed)
+        return True
+    
+    def _route(self) -> List[BaseLLM]:
+        """
+        The available backends in the order to try them for one request.
+        
+        Under the "health" policy, half-open backends come first so their probe
+        is sent (with the others still behind it), then the rest by circuit
+        breaker health score rounded to a tenth (so noise does not reorder
+        them), keeping the primary/fallback order set at startup between
+        equally healthy backends. A demoted backend gets no traffic, so it
+        moves back up as its failures age out of the breaker's window. Under
+        "static", always the startup order. Backends whose breaker is open
+        are still listed, and skipped when they refuse the request.
+        """
+        candidates = [llm for llm in (self.primary_llm, self.fallback_llm) if llm and llm.is_available()]
+        if self.routing == "health":
+            def health(llm):
+                breaker = self.breakers[self._get_llm_type(llm)]
+                return breaker.state != CircuitBreaker.HALF_OPEN, -round(breaker.health_score(), 1)
+            candidates.sort(key=health)
+        return candidates
+    
+    def hedge_delay(self, llm: BaseLLM) -> float:
+        """Seconds to wait for ``llm`` before also asking the fallback."""
+        if self.dispatch_mode == "race":
+            return 0.0
+        histogram = self.latency[self._get_llm_type(llm)]
+        if len(histogram) < LLM_HEDGE_MIN_SAMPLES:
+            return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(LLM_HEDGE_MIN_DELAY_SECONDS, histogram.percentile(LLM_HEDGE_PERCENTILE / 100))
+    
+    @staticmethod
+    def _is_valid_answer(answer: Optional[str]) -> bool:
+        """False for empty answers and the error messages backends return instead of raising."""
+        if not answer:
+            return False
+        answer = answer.lower()
+        return "encountered an error" not in answer and "couldn't generate" not in answer and "request timed out" not in answer
+    
     def _get_llm_type(self, llm_instance) -> str:
         """Get LLM type string from instance."""
         if isinstance(llm_instance, GroqLLM): return "groq"
@@ -865,20 +1389,37 @@ ANSWER (based only on the context above):"""
         return {
             "local_llm": {
                 "available": self.local_llm.is_available() if self.local_llm else False,
+                "loaded": getattr(self.local_llm, 'model', None) is not None,
                 "model": getattr(self.local_llm, 'model_name', None) if self.local_llm else None,
                 "using_llama_cpp": isinstance(getattr(self.local_llm, 'model', None), Llama),
                 "quantization_info": (getattr(self.local_llm, 'use_4bit_quantization', None) if isinstance(getattr(self.local_llm, 'model', None), AutoModelForCausalLM) else None)
             },
             "openai_llm": {
                 "available": self.openai_llm.is_available() if self.openai_llm else False,
-                "model": getattr(self.openai_llm, 'model', None) if self.openai_llm else None
+                "model": getattr(self.openai_llm, 'model', None) if self.openai_llm else None,
+                "requests": self.openai_llm._async.get_stats() if self.openai_llm else None
             },
             "groq_llm": {
                 "available": self.groq_llm.is_available() if self.groq_llm else False,
-                "model": getattr(self.groq_llm, 'model', None) if self.groq_llm else None
+                "model": getattr(self.groq_llm, 'model', None) if self.groq_llm else None,
+                "requests": getattr(self.groq_llm, '_async', None) and self.groq_llm._async.get_stats()
             },
             "primary_llm": self._get_llm_type(self.primary_llm) if self.primary_llm else None,
             "fallback_llm": self._get_llm_type(self.fallback_llm) if self.fallback_llm else None,
+            "dispatch": {
+                "mode": self.dispatch_mode,
+                "hedge_delay_seconds": self.hedge_delay(self.primary_llm) if self.primary_llm else None,
+                **self.hedge_stats
+            },
+            "latency": {llm_type: histogram.get_stats() for llm_type, histogram in self.latency.items()},
+            "routing": {
+                "policy": self.routing,
+                "order": [self._get_llm_type(llm) for llm in self._route()],
+                "breakers": {
+                    self._get_llm_type(llm): self.breakers[self._get_llm_type(llm)].get_stats()
+                    for llm in (self.primary_llm, self.fallback_llm) if llm
+                }
+            },
             "gpu": gpu_info,
             "libraries": {
                 "transformers": TRANSFORMERS_AVAILABLE,
@@ -950,7 +1491,14 @@ ANSWER (based only on the context above):"""
         logger.info("🧹 Cleaning up LLM resources...")
         
         if self.local_llm:
-            self.local_llm._cleanup_model()
+            # Wait for a load in progress so the model it loads is freed too
+            with self.local_llm._load_lock:
+                self.local_llm._load_attempted = True
+                self.local_llm._available = False
+                self.local_llm._cleanup_model()
+        for api_llm in (self.openai_llm, self.groq_llm):
+            if getattr(api_llm, 'client', None) is not None:
+                api_llm.client.close()
         
         # Clear references
         self.local_llm = None
@@ -967,6 +1515,12 @@ ANSWER (based only on the context above):"""
         
         logger.info("✅ LLM cleanup completed")
 
+    async def aclose(self):
+        """Close the API backends' async clients; call from the event loop before cleanup."""
+        for api_llm in (self.openai_llm, self.groq_llm):
+            if api_llm:
+                await api_llm.aclose()
+
     def switch_primary_llm(self, llm_type: str) -> bool:
         """Switch primary LLM to specified type."""
         available_llms = {
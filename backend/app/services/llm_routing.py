@@ -0,0 +1,237 @@
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_BREAKER_ERROR_RATE,
+    LLM_BREAKER_HALF_OPEN_PROBES,
+    LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_SLOW_CALL_SECONDS,
+    LLM_BREAKER_SLOW_RATE,
+    LLM_BREAKER_WINDOW,
+    LLM_BREAKER_WINDOW_SECONDS,
+    LLM_LATENCY_WINDOW,
+)
+
+# Bucket upper bounds in seconds: 10ms to ~160s, four per doubling
+LATENCY_BUCKETS: List[float] = [0.01 * 2 ** (i / 4) for i in range(57)]
+
+
+class LatencyHistogram:
+    """
+    Histogram of one LLM backend's recent response times.
+
+    Only the last ``window`` samples are counted, so percentiles follow the
+    backend's current behaviour rather than its whole history. Samples are
+    kept as bucket indexes; percentiles are the upper bound of the bucket
+    they fall in (within 19% of the true value).
+    """
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self.window = window
+        self._counts = [0] * (len(LATENCY_BUCKETS) + 1)  # Last bucket: slower than the largest bound
+        self._samples: "deque[int]" = deque()
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def record(self, seconds: float):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        with self._lock:
+            self._samples.append(bucket)
+            self._counts[bucket] += 1
+            if len(self._samples) > self.window:
+                self._counts[self._samples.popleft()] -= 1
+            self.total += 1
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the latency ``fraction`` of recent samples fall under; None without samples."""
+        with self._lock:
+            if not self._samples:
+                return None
+            rank = max(1, int(round(fraction * len(self._samples))))
+            seen = 0
+            for bucket, count in enumerate(self._counts):
+                seen += count
+                if seen >= rank:
+                    return LATENCY_BUCKETS[min(bucket, len(LATENCY_BUCKETS) - 1)]
+        return LATENCY_BUCKETS[-1]
+
+    def get_stats(self) -> Dict[str, Any]:
+        def ms(fraction: float) -> Optional[float]:
+            value = self.percentile(fraction)
+            return round(value * 1000, 1) if value is not None else None
+
+        with self._lock:
+            buckets = {
+                f"le_{LATENCY_BUCKETS[bucket] * 1000:.0f}ms" if bucket < len(LATENCY_BUCKETS) else "inf": count
+                for bucket, count in enumerate(self._counts) if count
+            }
+            samples, total = len(self._samples), self.total
+        return {
+            'samples': samples,
+            'total': total,
+            'p50_ms': ms(0.50),
+            'p95_ms': ms(0.95),
+            'p99_ms': ms(0.99),
+            'buckets': buckets,
+        }
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker refuses requests."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one LLM backend.
+
+    closed     requests flow; the outcomes of the last ``window`` calls of
+               the last ``window_seconds`` are kept, and once there are at
+               least ``min_calls`` the breaker
+               opens if the share of failures reaches ``error_rate`` or the
+               share of calls slower than ``slow_call_seconds`` reaches
+               ``slow_rate``
+    open       requests are refused for ``cooldown_seconds``, so a failing
+               backend costs nothing instead of a timeout per request
+    half_open  up to ``half_open_probes`` trial requests at a time are let
+               through; a success closes the breaker, a failure opens it
+               for another cooldown
+
+    Callers ask ``allow_request`` right before each call and report its
+    ``record_success``, ``record_failure`` or ``record_cancelled``.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: int = LLM_BREAKER_WINDOW, window_seconds: float = LLM_BREAKER_WINDOW_SECONDS,
+                 min_calls: int = LLM_BREAKER_MIN_CALLS,
+                 error_rate: float = LLM_BREAKER_ERROR_RATE,
+                 slow_call_seconds: float = LLM_BREAKER_SLOW_CALL_SECONDS,
+                 slow_rate: float = LLM_BREAKER_SLOW_RATE,
+                 cooldown_seconds: float = LLM_BREAKER_COOLDOWN_SECONDS,
+                 half_open_probes: int = LLM_BREAKER_HALF_OPEN_PROBES):
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._outcomes: "deque[tuple]" = deque(maxlen=window)  # (finished at, succeeded, seconds)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a request may be sent now; a half-open breaker counts it as a probe."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._outcomes.append((time.monotonic(), True, seconds))
+            self._trip_if_unhealthy()
+
+    def record_failure(self, seconds: float = 0.0):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append((time.monotonic(), False, seconds))
+            self._trip_if_unhealthy()
+
+    def record_cancelled(self):
+        """A request was abandoned without an outcome (e.g. it lost a hedge)."""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        self.times_opened += 1
+
+    def _trip_if_unhealthy(self):
+        if self._state != self.CLOSED:
+            return
+        failure_rate, slow_rate = self._rates()
+        if len(self._outcomes) < self.min_calls:
+            return
+        if failure_rate >= self.error_rate or slow_rate >= self.slow_rate:
+            self._open()
+
+    def _rates(self):
+        expired = time.monotonic() - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < expired:
+            self._outcomes.popleft()
+        if not self._outcomes:
+            return 0.0, 0.0
+        failures = sum(1 for _, succeeded, _ in self._outcomes if not succeeded)
+        slow = sum(1 for _, _, seconds in self._outcomes if seconds >= self.slow_call_seconds)
+        return failures / len(self._outcomes), slow / len(self._outcomes)
+
+    def health_score(self) -> float:
+        """
+        0 (unusable) to 1 (healthy): the share of recent calls that succeeded,
+        times the share that were not slow; 0 while open and halved while
+        half-open. A backend without recent calls scores 1.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == self.OPEN:
+                return 0.0
+            failure_rate, slow_rate = self._rates()
+        score = (1.0 - failure_rate) * (1.0 - slow_rate)
+        return score / 2 if state == self.HALF_OPEN else score
+
+    def get_stats(self) -> Dict[str, Any]:
+        score = self.health_score()
+        with self._lock:
+            failure_rate, slow_rate = self._rates()
+            return {
+                'state': self._current_state(),
+                'health_score': round(score, 3),
+                'calls': len(self._outcomes),
+                'failure_rate': round(failure_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_in_seconds': (
+                    round(max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at)), 1)
+                    if self._state == self.OPEN else None
+                ),
+            }
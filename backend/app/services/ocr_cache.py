@@ -0,0 +1,57 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from app.config import OCR_CACHE_DIR, OCR_DPI, OCR_LANGUAGE
+
+
+def file_hash(file_path: Union[str, Path]) -> str:
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    On-disk cache of OCR output, one text file per (file hash, page).
+
+    Entries live in ``<cache_dir>/<file hash>_<dpi>dpi_<language>/``, so
+    the same file uploaded again (or re-indexed) reuses earlier OCR, while a
+    change of resolution or language does not. Pages that OCR found no text
+    on are cached too (as empty files).
+    """
+
+    def __init__(self, file_path: Union[str, Path], cache_dir: Optional[Path] = None,
+                 dpi: int = OCR_DPI, language: str = OCR_LANGUAGE):
+        self.file_hash = file_hash(file_path)
+        cache_dir = Path(cache_dir) if cache_dir is not None else OCR_CACHE_DIR
+        self.directory = cache_dir / f"{self.file_hash}_{dpi}dpi_{language}"
+
+    def _page_path(self, page: int) -> Path:
+        return self.directory / f"page-{page:05d}.txt"
+
+    def get(self, page: int) -> Optional[str]:
+        try:
+            return self._page_path(page).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def get_many(self, pages: Iterable[int]) -> Dict[int, str]:
+        """Cached text of whichever of ``pages`` have been OCRed before."""
+        cached = {}
+        for page in pages:
+            text = self.get(page)
+            if text is not None:
+                cached[page] = text
+        return cached
+
+    def put(self, page: int, text: str):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._page_path(page)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
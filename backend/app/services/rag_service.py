@@ -1,10 +1,15 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from app.services.embedding import EmbeddingService
 from app.services.chunking import ChunkingService
 from app.services.vector_store import VectorStore
 from app.services.document_processor import DocumentProcessor
+from app.services.ingestion import extract_text, prepare_document
+from app.services.reranker import RerankerService
+from app.services.answer_cache import AnswerCache
+from app.services.rebuild import VectorStoreRebuild
+from app.config import ANSWER_CACHE_ENABLED
+from app.utils.executors import EMBEDDING_POOL, EXTRACTION_POOL, run_in_executor
 from pathlib import Path
-from app.routers.websocket import websocket_manager
 import asyncio
 from datetime import datetime
 
@@ -19,11 +24,20 @@ class RAGService:
         self.embedding_service = EmbeddingService()
         self.chunking_service = ChunkingService(chunk_size=1000, chunk_overlap=200)
         self.vector_store = VectorStore(self.embedding_service)
+        self.reranker = RerankerService()  # Model loads on first rerank
+        self.answer_cache = AnswerCache(self.embedding_service) if ANSWER_CACHE_ENABLED else None
+        self.rebuild = VectorStoreRebuild(self)
+        self.rebuild.resume()  # Continue a rebuild interrupted by a restart
         
         print("✅ RAG Service initialized successfully")
     
+    def extract_text(self, file_path: str, reuse_processed: bool = False) -> Tuple[str, int]:
+        """Extract a document's text (see app.services.ingestion.extract_text)."""
+        return extract_text(file_path, reuse_processed)
+    
     def process_and_store_document(self, file_path: str, document_id: str, 
-                                 metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+                                 metadata: Dict[str, Any] = None,
+                                 reuse_processed: bool = False) -> Dict[str, Any]:
         """
         Complete pipeline: extract text, chunk, embed, and store.
         
@@ -31,6 +45,7 @@ class RAGService:
             file_path: Path to the document file
             document_id: Unique identifier for the document
             metadata: Additional metadata for the document
+            reuse_processed: Reuse previously extracted text (see extract_text)
         
         Returns:
             Processing results and statistics
@@ -38,41 +53,22 @@ class RAGService:
         print(f"📄 Processing document: {document_id}")
         
         try:
-            # Step 1: Extract text from document
-            text, char_count = DocumentProcessor.process_document(file_path)
-            
-            if not text.strip():
-                return {
-                    'success': False,
-                    'error': 'No text could be extracted from document',
-                    'document_id': document_id
-                }
-            
-            # Step 2: Chunk the text
-            doc_metadata = metadata or {}
-            doc_metadata.update({
-                'file_path': str(file_path),
-                'char_count': char_count,
-                'filename': Path(file_path).name
-            })
-            
-            chunks = self.chunking_service.chunk_text(
-                text=text,
+            # Steps 1-3: Extract, chunk and embed
+            result = prepare_document(
+                self.embedding_service,
+                self.chunking_service,
+                file_path=file_path,
                 document_id=document_id,
-                metadata=doc_metadata
+                metadata=metadata,
+                reuse_processed=reuse_processed
             )
+            if not result['success']:
+                return result
             
-            # Step 3: Add chunks to vector store
-            chunks_added = self.vector_store.add_chunks(chunks)
-            
-            result = {
-                'success': True,
-                'document_id': document_id,
-                'char_count': char_count,
-                'chunks_created': len(chunks),
-                'chunks_added': chunks_added,
-                'metadata': doc_metadata
-            }
+            # Step 4: Add chunks to vector store
+            result['chunks_added'] = self.vector_store.add_embedded_chunks(
+                result.pop('chunks'), result.pop('embeddings')
+            )
             
             print(f"✅ Successfully processed document {document_id}")
             return result
@@ -113,7 +109,7 @@ class RAGService:
         try:
             # Step 1: Extract text (0-30%)
             await send_progress("extracting", 10, "Starting text extraction...")
-            text, char_count = DocumentProcessor.process_document(file_path)
+            text, char_count = await run_in_executor(EXTRACTION_POOL, self.extract_text, file_path)
             await send_progress("extracting", 30, f"Extracted {char_count} characters")
             
             if not text.strip():
@@ -133,7 +129,9 @@ class RAGService:
                 'filename': Path(file_path).name
             })
             
-            chunks = self.chunking_service.chunk_text(
+            chunks = await run_in_executor(
+                EXTRACTION_POOL,
+                self.chunking_service.chunk_text,
                 text=text,
                 document_id=document_id,
                 metadata=doc_metadata
@@ -150,7 +148,7 @@ class RAGService:
             
             for i in range(0, len(chunks), batch_size):
                 batch = chunks[i:i + batch_size]
-                self.vector_store.add_chunks(batch)
+                await run_in_executor(EMBEDDING_POOL, self.vector_store.add_chunks, batch)
                 chunks_added += len(batch)
                 
                 progress = 60 + int((chunks_added / len(chunks)) * 30)
@@ -171,6 +169,7 @@ class RAGService:
                 'success': True,
                 'document_id': document_id,
                 'char_count': char_count,
+                'processed_path': str(DocumentProcessor.processed_path(file_path)),
                 'chunks_created': len(chunks),
                 'chunks_added': chunks_added,
                 'metadata': doc_metadata
@@ -192,7 +191,10 @@ class RAGService:
     
     def search_documents(self, query: str, top_k: int = 5, 
                         score_threshold: float = 0.3,
-                        document_ids: List[str] = None) -> Dict[str, Any]:
+                        document_ids: List[str] = None,
+                        mode: Optional[str] = None,
+                        fusion: Optional[str] = None,
+                        alpha: Optional[float] = None) -> Dict[str, Any]:
         """
         Search for relevant document chunks.
         
@@ -201,6 +203,9 @@ class RAGService:
             top_k: Number of top results to return
             score_threshold: Minimum similarity score
             document_ids: Optional list of document IDs to filter by
+            mode: "dense", "lexical" or "hybrid" (default SEARCH_MODE)
+            fusion: Hybrid fusion, "rrf" or "weighted" (default HYBRID_FUSION)
+            alpha: Weight of the dense score in weighted fusion
         
         Returns:
             Search results with metadata
@@ -214,7 +219,10 @@ class RAGService:
                 query=query,
                 top_k=top_k,
                 score_threshold=score_threshold,
-                document_ids=document_ids
+                document_ids=document_ids,
+                mode=mode,
+                fusion=fusion,
+                alpha=alpha
             )
             
             return {
@@ -235,11 +243,88 @@ class RAGService:
                 'results': []
             }
     
+    def search_batch(self, queries: List[str], top_k: int = 5,
+                     score_threshold: float = 0.3,
+                     document_ids: List[str] = None) -> Dict[str, Any]:
+        """
+        Search for relevant chunks for many queries at once.
+        
+        All queries are embedded in one model batch and looked up with one
+        index search; chunks shared between queries are read once.
+        
+        Args:
+            queries: Search queries
+            top_k: Number of top results to return per query
+            score_threshold: Minimum similarity score
+            document_ids: Optional list of document IDs to filter by
+        
+        Returns:
+            Per-query results (in order) plus the number of distinct chunks
+        """
+        print(f"🔍 Batch search for {len(queries)} queries")
+        if document_ids:
+            print(f"📌 Filtering to {len(document_ids)} selected documents")
+        
+        try:
+            batch_results = self.vector_store.search_batch(
+                queries=queries,
+                top_k=top_k,
+                score_threshold=score_threshold,
+                document_ids=document_ids
+            )
+            
+            unique_chunks = {
+                chunk.get('chunk_id') for results in batch_results for chunk in results
+            }
+            return {
+                'success': True,
+                'results': [
+                    {'query': query, 'results_count': len(results), 'results': results}
+                    for query, results in zip(queries, batch_results)
+                ],
+                'unique_chunks': len(unique_chunks),
+                'filtered_by_documents': document_ids is not None
+            }
+            
+        except Exception as e:
+            print(f"❌ Batch search error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'results': [{'query': query, 'results_count': 0, 'results': []} for query in queries],
+                'unique_chunks': 0
+            }
+    
+    def rerank(self, query: str, chunks: List[Dict[str, Any]], top_k: int,
+               budget_ms: Optional[float] = None) -> Dict[str, Any]:
+        """Reorder retrieved chunks with the cross-encoder (see RerankerService.rerank)."""
+        try:
+            return self.reranker.rerank(query, chunks, top_k, budget_ms)
+        except Exception as e:
+            print(f"❌ Rerank error, keeping retrieval order: {e}")
+            return {'results': chunks[:top_k], 'reranked': False, 'skipped_reason': 'error', 'rerank_time': 0.0}
+    
+    def remove_document(self, document_id: str) -> int:
+        """
+        Remove a document's chunks from the vector store.
+        
+        Returns:
+            Number of chunks removed
+        """
+        self.rebuild.forget_document(document_id)
+        return self.vector_store.remove_document(document_id)
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get comprehensive RAG service statistics."""
+        batcher = self.embedding_service.query_batcher
         return {
             'vector_store_stats': self.vector_store.get_stats(),
             'embedding_model': self.embedding_service.model_name,
+            'query_embedding_cache': self.embedding_service.query_cache.get_stats(),
+            'query_embedding_batcher': batcher.get_stats() if batcher else None,
+            'chunk_embedding_cache': self.embedding_service.chunk_cache.get_stats(),
+            'reranker': self.reranker.get_stats(),
+            'answer_cache': self.answer_cache.get_stats() if self.answer_cache else None,
             'chunk_size': self.chunking_service.chunk_size,
             'chunk_overlap': self.chunking_service.chunk_overlap
         }
\ No newline at end of file
@@ -0,0 +1,261 @@
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from app.config import REBUILD_MAX_ATTEMPTS, REBUILD_WORKERS
+from app.services.ingestion import prepare_document
+from app.services.vector_store import VectorStore
+
+
+class VectorStoreRebuild:
+    """
+    Rebuilds the vector store as a new generation next to the live one.
+
+    Documents are re-processed by a pool of REBUILD_WORKERS threads into a
+    separate VectorStore in the live store's ``rebuild/`` directory while
+    the live store keeps serving searches and ingestion. Extraction reuses
+    the saved text and embedding goes through the on-disk chunk embedding
+    cache, so unchanged documents cost little more than a copy.
+
+    Progress is checkpointed per document: each document's chunks are one
+    durable append to the rebuild store, and ``rebuild.json`` records the
+    document list, failures and deletions. After a crash the rebuild is
+    resumed (see ``resume``) and skips every document already in the
+    rebuild store; a rebuild that failed with an error REBUILD_MAX_ATTEMPTS
+    times is not resumed again until restarted with ``start``. When all documents are done, the new generation replaces
+    the live store in one staged swap (see VectorStore.install_generation).
+    """
+
+    def __init__(self, rag_service, workers: int = REBUILD_WORKERS):
+        self.rag_service = rag_service
+        self.workers = workers
+        self.state_path = self.live.rebuild_dir / "rebuild.json"
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._state: Optional[Dict[str, Any]] = None
+        self._target: Optional[VectorStore] = None
+        self._status: Dict[str, Any] = {'state': 'idle'}
+
+    @property
+    def live(self) -> VectorStore:
+        return self.rag_service.vector_store
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Start rebuilding the store from ``documents``.
+
+        An interrupted rebuild's completed documents are kept and reused.
+
+        Args:
+            documents: One dict per document with 'document_id', 'file_path',
+                'filename', 'created_at' and 'file_hash'
+
+        Returns:
+            The rebuild status
+        """
+        with self._lock:
+            if self.running:
+                return self.get_status()
+            state = self._load_state() or {'deleted': []}
+            state.update({
+                'id': str(uuid.uuid4()),
+                'started_at': time.time(),
+                'documents': documents,
+                # Only documents indexed after this are carried over at the swap
+                'live_documents': list(self.live.chunk_store.document_ids()),
+                'failed': {},
+                'attempts': 0,
+                'error': None,
+            })
+            self._save_state(state)
+            self._state = state
+            self._launch()
+        return self.get_status()
+
+    def resume(self) -> bool:
+        """Continue a rebuild interrupted by a restart; False if there is none."""
+        with self._lock:
+            if self.running:
+                return True
+            state = self._load_state()
+            if state is None:
+                return False
+            if state.get('attempts', 0) >= REBUILD_MAX_ATTEMPTS:
+                print(f"⚠️ Not resuming vector store rebuild {state['id']}: "
+                      f"failed {state['attempts']} times, last with: {state.get('error')}")
+                self._status = {
+                    'state': 'failed', 'rebuild_id': state['id'], 'started_at': state['started_at'],
+                    'error': state.get('error'), 'attempts': state['attempts']
+                }
+                return False
+            print(f"🔁 Resuming vector store rebuild {state['id']}")
+            self._state = state
+            self._launch()
+            return True
+
+    def forget_document(self, document_id: str):
+        """Keep a document deleted from the live store out of the rebuild."""
+        with self._lock:
+            if self._state is None:
+                return
+            self._state['deleted'].append(document_id)
+            self._save_state(self._state)
+            if self._target is not None:
+                self._target.remove_document(document_id)
+
+    def _launch(self):
+        self._status = {'state': 'running', 'rebuild_id': self._state['id'], 'started_at': self._state['started_at']}
+        self._thread = threading.Thread(target=self._run, name="vector-store-rebuild", daemon=True)
+        self._thread.start()
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _save_state(self, state: Dict[str, Any]):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _run(self):
+        start = time.time()
+        try:
+            live = self.live
+            target = VectorStore(live.embedding_service, store_dir=live.rebuild_dir,
+                                 index_type=live.index_type, train_threshold=live.train_threshold)
+            with self._lock:
+                self._target = target
+                state = self._state
+                wanted = {document['document_id'] for document in state['documents']} - set(state['deleted'])
+                # Drop documents deleted before a restart or missing from a new document list
+                for document_id in target.chunk_store.document_ids():
+                    if document_id not in wanted:
+                        target.remove_document(document_id)
+                pending = [
+                    document for document in state['documents']
+                    if document['document_id'] in wanted and not target.chunk_store.document_ranges([document['document_id']])
+                ]
+
+            total = len(wanted)
+            print(f"🏗️ Rebuilding vector store: {total - len(pending)} of {total} documents already done, "
+                  f"{self.workers} workers")
+            self._update_status(total, target)
+
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rebuild") as pool:
+                futures = {pool.submit(self._prepare, document): document for document in pending}
+                for future in as_completed(futures):
+                    self._commit(futures[future], future)
+                    self._update_status(total, target)
+
+            with self._lock:
+                self._status = dict(self._status, state='swapping')
+                # Failed documents are not "known": their live chunks are carried over
+                known = {
+                    *(document['document_id'] for document in state['documents']),
+                    *state.get('live_documents', [])
+                } - set(state['failed'])
+                carried = live.install_generation(target, known)
+                self._target = None
+                self._state = None
+                failed = state['failed']
+
+            self._status = dict(
+                self._status, state='completed', finished_at=time.time(),
+                documents_carried_over=carried, documents_failed=len(failed), failures=failed,
+                chunks=len(live.chunk_store)
+            )
+            print(f"✅ Vector store rebuilt in {time.time() - start:.1f}s")
+
+        except Exception as e:
+            print(f"❌ Vector store rebuild failed: {e}")
+            with self._lock:
+                if self._target is not None:
+                    self._target._close_store()
+                    self._target = None
+                # Counted so a rebuild that fails every time is not resumed forever
+                attempts = 0
+                if self._state is not None:
+                    self._state['attempts'] = attempts = self._state.get('attempts', 0) + 1
+                    self._state['error'] = str(e)
+                    self._save_state(self._state)
+            self._status = dict(self._status, state='failed', error=str(e), attempts=attempts,
+                                finished_at=time.time())
+
+    def _prepare(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        return prepare_document(
+            self.rag_service.embedding_service,
+            self.rag_service.chunking_service,
+            file_path=document['file_path'],
+            document_id=document['document_id'],
+            metadata={
+                'original_filename': document['filename'],
+                'file_size': os.path.getsize(document['file_path']),
+                'upload_timestamp': document['created_at'],
+                'file_hash': document['file_hash']
+            },
+            reuse_processed=True
+        )
+
+    def _commit(self, document: Dict[str, Any], future):
+        """Add a prepared document to the rebuild store; this is its checkpoint."""
+        document_id = document['document_id']
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+
+        with self._lock:
+            if document_id in self._state['deleted']:
+                return
+            if result['success']:
+                self._target.add_embedded_chunks(result['chunks'], result['embeddings'])
+                # Retried after a resume and succeeded this time
+                if self._state['failed'].pop(document_id, None) is not None:
+                    self._save_state(self._state)
+            else:
+                print(f"⚠️ Rebuild could not process {document_id}: {result.get('error')}")
+                self._state['failed'][document_id] = result.get('error', 'Processing failed')
+                self._save_state(self._state)
+
+    def _update_status(self, total: int, target: VectorStore):
+        failed = len(self._state['failed']) if self._state else 0
+        self._status = dict(
+            self._status,
+            documents_total=total,
+            documents_done=len(target.chunk_store.document_ids()),
+            documents_failed=failed,
+            chunks=len(target.chunk_store),
+        )
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Block until a running rebuild finishes; returns its status."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.get_status()
+
+    def get_status(self) -> Dict[str, Any]:
+        return dict(self._status)
+
+    def discard(self):
+        """Delete an interrupted rebuild's progress instead of resuming it."""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A rebuild is running")
+            shutil.rmtree(self.live.rebuild_dir, ignore_errors=True)
+            self._state = None
@@ -0,0 +1,186 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+from app.config import RERANK_BATCH_SIZE, RERANK_CACHE_SIZE, RERANK_MODEL
+from app.services.embedding_cache import normalize_query
+
+# Weight of the newest measurement in the per-pair scoring time estimate
+_COST_SMOOTHING = 0.3
+
+
+class RerankerService:
+    """
+    Reorders retrieved chunks by cross-encoder relevance to the query.
+
+    A cross-encoder reads the query and chunk together, so it ranks far more
+    precisely than embedding similarity but costs one forward pass per pair.
+    Pairs are scored in batches and their scores cached by (query, chunk
+    text), so repeated questions and rebuilt indexes cost nothing. The model
+    is loaded on first use.
+
+    Callers may pass a latency budget: if scoring the uncached pairs is
+    expected to take longer (based on recent per-pair timings), or the model
+    is still loading, the chunks are returned in their original order
+    instead.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = RERANK_BATCH_SIZE,
+                 cache_size: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._loading: Optional[threading.Thread] = None
+        self._cache: "OrderedDict[Tuple[str, bytes], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._seconds_per_pair: Optional[float] = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.reranked = 0
+        self.skipped = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    print(f"🚀 Loading reranker {self.model_name} on {self.device}")
+                    self._model = CrossEncoder(self.model_name, device=self.device)
+        return self._model
+
+    def _load_in_background(self):
+        with self._model_lock:
+            if self._loading is None:
+                self._loading = threading.Thread(target=lambda: self.model, name="reranker-load", daemon=True)
+                self._loading.start()
+
+    @staticmethod
+    def _text_key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _cached_scores(self, query: str, texts: List[str], count: bool = True) -> List[Optional[float]]:
+        query_key = normalize_query(query)
+        scores = []
+        with self._cache_lock:
+            for text in texts:
+                key = (query_key, self._text_key(text))
+                score = self._cache.get(key)
+                if count and score is not None:
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                elif count:
+                    self.cache_misses += 1
+                scores.append(score)
+        return scores
+
+    def _cache_scores(self, query: str, texts: List[str], scores: List[float]):
+        if self.cache_size <= 0:
+            return
+        query_key = normalize_query(query)
+        with self._cache_lock:
+            for text, score in zip(texts, scores):
+                key = (query_key, self._text_key(text))
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def estimate_ms(self, pairs: int) -> Optional[float]:
+        """Expected time to score ``pairs`` uncached pairs; None before the first measurement."""
+        if self._seconds_per_pair is None:
+            return None
+        return pairs * self._seconds_per_pair * 1000
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """Cross-encoder relevance of each text to ``query`` (higher is better)."""
+        scores = self._cached_scores(query, texts)
+        missing = list(dict.fromkeys(text for text, score in zip(texts, scores) if score is None))
+        if missing:
+            start = time.perf_counter()
+            predicted = self.model.predict(
+                [(query, text) for text in missing], batch_size=self.batch_size, show_progress_bar=False
+            )
+            elapsed = (time.perf_counter() - start) / len(missing)
+            self._seconds_per_pair = elapsed if self._seconds_per_pair is None else (
+                _COST_SMOOTHING * elapsed + (1 - _COST_SMOOTHING) * self._seconds_per_pair
+            )
+            new_scores = dict(zip(missing, (float(score) for score in predicted)))
+            self._cache_scores(query, missing, list(new_scores.values()))
+            scores = [new_scores[text] if score is None else score for text, score in zip(texts, scores)]
+        return scores
+
+    def rerank(self, query: str, chunks: List[Dict[str, Any]], top_k: int,
+               budget_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Reorder ``chunks`` by cross-encoder score and keep the best ``top_k``.
+
+        Args:
+            query: The user's question
+            chunks: Retrieved candidates (each with 'text')
+            top_k: Number of chunks to return
+            budget_ms: Time available for reranking; None or <= 0 for no limit
+
+        Returns:
+            Dict with the 'results', whether they were 'reranked', the
+            'skipped_reason' if not, and the 'rerank_time'
+        """
+        start = time.perf_counter()
+        if not chunks:
+            return {'results': [], 'reranked': False, 'skipped_reason': None, 'rerank_time': 0.0}
+
+        texts = [chunk.get('text', '') for chunk in chunks]
+        if budget_ms is not None and budget_ms > 0:
+            uncached = sum(1 for score in self._cached_scores(query, texts, count=False) if score is None)
+            skipped_reason = None
+            if uncached and self._model is None:
+                # Loading can take seconds; rerank once it is ready
+                self._load_in_background()
+                skipped_reason = 'model_loading'
+            elif uncached and (self.estimate_ms(uncached) or 0) > budget_ms:
+                skipped_reason = 'latency_budget'
+            if skipped_reason:
+                self.skipped += 1
+                print(f"⏱️ Skipping rerank of {uncached} pairs within {budget_ms:.0f}ms: {skipped_reason}")
+                return {
+                    'results': chunks[:top_k],
+                    'reranked': False,
+                    'skipped_reason': skipped_reason,
+                    'rerank_time': time.perf_counter() - start
+                }
+
+        scores = self.score(query, texts)
+        ranked = sorted(zip(scores, range(len(chunks))), key=lambda pair: (-pair[0], pair[1]))
+        results = []
+        for score, index in ranked[:top_k]:
+            chunk = dict(chunks[index])
+            chunk['rerank_score'] = score
+            results.append(chunk)
+
+        self.reranked += 1
+        return {
+            'results': results,
+            'reranked': True,
+            'skipped_reason': None,
+            'rerank_time': time.perf_counter() - start
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                'model': self.model_name,
+                'loaded': self._model is not None,
+                'reranked': self.reranked,
+                'skipped': self.skipped,
+                'cache_entries': len(self._cache),
+                'cache_hit_rate': self.cache_hits / lookups if lookups else 0.0,
+                'ms_per_pair': self._seconds_per_pair * 1000 if self._seconds_per_pair is not None else None,
+            }
@@ -0,0 +1,239 @@
+import json
+import os
+import re
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from app.config import VECTOR_STORE_COMPACT_MIN_RECORDS
+
+# Header of a vector segment: magic, embedding dim, vector id of the first row
+_SEGMENT_MAGIC = b"VSEG"
+_SEGMENT_HEADER = struct.Struct("<4sIq")
+_SEGMENT_PATTERN = re.compile(r"^segment-(\d+)\.vectors$")
+
+
+class VectorStorePersistence:
+    """
+    Append-only persistence for the vector store's FAISS index.
+
+    The index on disk is a snapshot (``faiss_index``) plus segment files
+    holding every vector added since. Each ``segment-<base>.vectors`` file is
+    a small header followed by raw float32 rows, where ``base`` is the vector
+    id of its first row. Adding vectors only appends to the newest segment, so
+    the cost of an add is proportional to the new data. Once the segments
+    outgrow the snapshot they are folded into a new snapshot by a background
+    thread. Chunk text and metadata live in the ChunkStore.
+    """
+
+    def __init__(self, store_dir: Path, embedding_dim: int,
+                 compact_min_records: int = VECTOR_STORE_COMPACT_MIN_RECORDS):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.embedding_dim = embedding_dim
+        self.compact_min_records = compact_min_records
+
+        self.index_path = self.store_dir / "faiss_index"
+        self.legacy_chunks_path = self.store_dir / "chunks.json"
+
+        self.snapshot_count = 0
+        self.log_count = 0
+        self._segment = None
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    def _segment_path(self, base: int) -> Path:
+        return self.store_dir / f"segment-{base:012d}.vectors"
+
+    def _list_segments(self) -> List[int]:
+        bases = []
+        for path in self.store_dir.iterdir():
+            match = _SEGMENT_PATTERN.match(path.name)
+            if match:
+                bases.append(int(match.group(1)))
+        return sorted(bases)
+
+    def load(self) -> Optional[faiss.Index]:
+        """
+        Load the snapshot and replay the segments on top of it.
+
+        Returns:
+            CPU FAISS index, or None if nothing is stored yet
+        """
+        index = None
+        if self.index_path.exists():
+            index = faiss.read_index(str(self.index_path))
+        self.snapshot_count = index.ntotal if index is not None else 0
+
+        next_id = self.snapshot_count
+        new_vectors = []
+        for base in self._list_segments():
+            vectors = self._read_segment(base)
+            if base > next_id:
+                print(f"⚠️ Gap before segment {base}, ignoring newer segments")
+                break
+            skip = next_id - base
+            if skip < len(vectors):
+                new_vectors.append(vectors[skip:])
+                next_id = base + len(vectors)
+
+        if new_vectors:
+            if index is None:
+                index = faiss.IndexFlatIP(self.embedding_dim)
+            index.add(np.vstack(new_vectors).astype(np.float32))
+
+        self.log_count = next_id - self.snapshot_count
+
+        # Always append to a fresh segment so a torn tail is never extended
+        self._open_segment(next_id)
+
+        return index
+
+    def load_legacy_chunks(self) -> Optional[List[Dict[str, Any]]]:
+        """Chunk metadata from a pre-ChunkStore ``chunks.json``, if present."""
+        if not self.legacy_chunks_path.exists():
+            return None
+        with open(self.legacy_chunks_path, 'r') as f:
+            return json.load(f)
+
+    def retire_legacy_chunks(self):
+        """Keep the migrated ``chunks.json`` aside instead of re-importing it."""
+        if self.legacy_chunks_path.exists():
+            os.replace(self.legacy_chunks_path, self.legacy_chunks_path.with_suffix(".json.migrated"))
+
+    def _read_segment(self, base: int) -> np.ndarray:
+        """Read one segment's rows, ignoring a partially written tail."""
+        path = self._segment_path(base)
+        empty = np.zeros((0, self.embedding_dim), dtype=np.float32)
+
+        with open(path, 'rb') as f:
+            header = f.read(_SEGMENT_HEADER.size)
+            if len(header) < _SEGMENT_HEADER.size:
+                return empty
+            magic, dim, header_base = _SEGMENT_HEADER.unpack(header)
+            if magic != _SEGMENT_MAGIC or dim != self.embedding_dim or header_base != base:
+                print(f"⚠️ Ignoring incompatible segment: {path.name}")
+                return empty
+            payload = f.read()
+
+        row_bytes = 4 * self.embedding_dim
+        rows = len(payload) // row_bytes
+        return np.frombuffer(payload[:rows * row_bytes], dtype=np.float32).reshape(rows, self.embedding_dim)
+
+    def _open_segment(self, base: int):
+        """Start a new segment whose first row will get vector id ``base``."""
+        self._close_segment()
+        self._segment = open(self._segment_path(base), 'wb')
+        self._segment.write(_SEGMENT_HEADER.pack(_SEGMENT_MAGIC, self.embedding_dim, base))
+        self._segment.flush()
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.close()
+        self._segment = None
+
+    def append(self, embeddings: np.ndarray):
+        """Append newly added vectors to the open segment."""
+        self._segment.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        self._segment.flush()
+        self.log_count += len(embeddings)
+
+    @property
+    def is_compacting(self) -> bool:
+        return self._compaction_thread is not None and self._compaction_thread.is_alive()
+
+    def should_compact(self) -> bool:
+        """Compact once the segments hold more rows than the snapshot."""
+        return (
+            not self.is_compacting
+            and self.log_count >= max(self.compact_min_records, self.snapshot_count)
+        )
+
+    def compact(self, index: faiss.Index, background: bool = True):
+        """
+        Fold the segments into a new snapshot of ``index``.
+
+        Must be called while the caller holds the vector store lock: the index
+        is serialized and a new segment opened synchronously, and only the
+        disk writes happen on the background thread.
+        """
+        self.wait_for_compaction()
+
+        index_bytes = faiss.serialize_index(index)
+        snapshot_count = index.ntotal
+
+        # Rows added from here on belong to the next snapshot's segments
+        self._open_segment(snapshot_count)
+        self.log_count = 0
+
+        def write_snapshot():
+            try:
+                tmp_index_path = self.index_path.with_suffix(".tmp")
+                faiss.write_index(faiss.deserialize_index(index_bytes), str(tmp_index_path))
+                os.replace(tmp_index_path, self.index_path)
+
+                # Everything but the segment opened above is in the snapshot
+                # (or is a stale tail past it)
+                for base in self._list_segments():
+                    if base != snapshot_count:
+                        self._segment_path(base).unlink(missing_ok=True)
+
+                self.snapshot_count = snapshot_count
+                print(f"💾 Compacted vector store snapshot with {snapshot_count} vectors")
+            except Exception as e:
+                print(f"❌ Error compacting vector store: {e}")
+
+        if background:
+            self._compaction_thread = threading.Thread(
+                target=write_snapshot, name="vector-store-compaction", daemon=True
+            )
+            self._compaction_thread.start()
+        else:
+            write_snapshot()
+
+    def wait_for_compaction(self):
+        """Block until a running background compaction has finished."""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+
+    def install_snapshot(self, snapshot_path: Path):
+        """
+        Replace the stored index with the snapshot at ``snapshot_path``.
+
+        Only used while the store is closed. Safe to repeat after a crash:
+        once the snapshot has been moved into place there is nothing to do.
+        """
+        if not Path(snapshot_path).exists():
+            return
+        for base in self._list_segments():
+            self._segment_path(base).unlink(missing_ok=True)
+        os.replace(snapshot_path, self.index_path)
+
+    def reset(self):
+        """Delete everything on disk and start an empty segment."""
+        self.wait_for_compaction()
+        self._close_segment()
+
+        self.index_path.unlink(missing_ok=True)
+        for base in self._list_segments():
+            self._segment_path(base).unlink(missing_ok=True)
+
+        self.snapshot_count = 0
+        self.log_count = 0
+        self._open_segment(0)
+
+    def close(self):
+        self.wait_for_compaction()
+        self._close_segment()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'snapshot_vectors': self.snapshot_count,
+            'segment_vectors': self.log_count,
+            'segments': len(self._list_segments()),
+            'compacting': self.is_compacting,
+        }
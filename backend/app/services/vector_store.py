@@ -1,22 +1,58 @@
 import faiss
 import numpy as np
-from typing import List, Dict, Any, Tuple, Optional
+from typing import Iterable, List, Dict, Any, Tuple, Optional
 import pickle
-import json
+import os
+import shutil
+import threading
+import time
 from pathlib import Path
-from app.config import DATA_DIR
+from app.config import (
+    DATA_DIR, VECTOR_INDEX_TYPE, VECTOR_INDEX_TRAIN_THRESHOLD,
+    SEARCH_MODE, HYBRID_FUSION, HYBRID_CANDIDATES, HYBRID_RRF_K, HYBRID_ALPHA,
+    VECTOR_STORE_DELETE_COMPACT_RATIO
+)
+from app.services.ann_index import (
+    INDEX_TYPES, create_index, evaluate_index, index_type_of,
+    sample_queries, search_parameters, train_index,
+)
 from app.services.embedding import EmbeddingService
+from app.services.chunk_store import ChunkStore
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_persistence import VectorStorePersistence
+
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+FUSION_METHODS = ("rrf", "weighted")
 
 class VectorStore:
     """FAISS-based vector store with GPU acceleration for semantic search."""
     
-    def __init__(self, embedding_service: EmbeddingService):
+    def __init__(self, embedding_service: EmbeddingService, store_dir: Optional[Path] = None,
+                 index_type: Optional[str] = None, train_threshold: Optional[int] = None):
         self.embedding_service = embedding_service
         self.embedding_dim = embedding_service.get_embedding_dim()
         
         # FAISS index with GPU support if available
         self.index = None
-        self.chunks = []
+        
+        # Target ANN index type; the store starts as flat and migrates to it
+        # in the background once it holds train_threshold vectors
+        self.index_type = (index_type or VECTOR_INDEX_TYPE).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown vector index type '{self.index_type}', expected one of {INDEX_TYPES}")
+        self.train_threshold = train_threshold if train_threshold is not None else VECTOR_INDEX_TRAIN_THRESHOLD
+        self._migration_thread: Optional[threading.Thread] = None
+        self._index_generation = 0
+        self.index_report: Optional[Dict[str, Any]] = None
+        
+        # Serializes index mutation, persistence and search
+        self._lock = threading.RLock()
+        
+        # Deleted documents' rows are skipped by search until they make up this
+        # fraction of the store, then compacted away on a background thread
+        self.delete_compact_ratio = VECTOR_STORE_DELETE_COMPACT_RATIO
+        self._deleted_selector = None
+        self._compaction_thread: Optional[threading.Thread] = None
         
         # Production-safe GPU detection
         try:
@@ -26,42 +62,129 @@ class VectorStore:
             self.is_gpu_enabled = False
         
         # Storage paths
-        self.vector_store_dir = DATA_DIR / "vector_store"
+        self.vector_store_dir = Path(store_dir) if store_dir else DATA_DIR / "vector_store"
         self.vector_store_dir.mkdir(parents=True, exist_ok=True)
-        self.index_path = self.vector_store_dir / "faiss_index"
-        self.chunks_path = self.vector_store_dir / "chunks.json"
+        # A complete store generation (compacted or rebuilt) is staged here
+        # before it replaces the live files; rebuilds are built in rebuild_dir
+        self.staging_dir = self.vector_store_dir / "staging"
+        self.rebuild_dir = self.vector_store_dir / "rebuild"
+        
+        # Finish (or discard) an install interrupted by a crash
+        self._install_staged()
         
         # Initialize or load existing index
-        self._initialize_index()
+        self._open_store()
+        self._maybe_migrate_index()
         
         print(f"🗂️ VectorStore initialized (GPU: {self.is_gpu_enabled}, Dim: {self.embedding_dim})")
 
+    def _open_store(self):
+        """Open the on-disk stores and load the index from them."""
+        self.persistence = VectorStorePersistence(self.vector_store_dir, self.embedding_dim)
+        self.index_path = self.persistence.index_path
+        
+        # Chunk text and metadata, row-aligned with the index (row id == vector id)
+        self.chunk_store = ChunkStore(self.vector_store_dir / "chunks")
+        
+        # BM25 inverted index over the same rows, for lexical and hybrid search
+        self.lexical_index = LexicalIndex(self.vector_store_dir / "lexical")
+        
+        self._initialize_index()
+    
+    def _close_store(self):
+        self.persistence.close()
+        self.chunk_store.close()
+        self.lexical_index.close()
     
     def _initialize_index(self):
         """Initialize FAISS index with GPU support if available."""
-        if self.index_path.exists():
-            print("📂 Loading existing FAISS index...")
-            self._load_index()
-        else:
+        print("📂 Loading existing FAISS index...")
+        self._load_index()
+        if self.index is None:
             print("🆕 Creating new FAISS index...")
             self._create_new_index()
             print(f"FAISS index dimension: {self.index.d}")
+        self.lexical_index.sync(self.chunk_store)
 
     def _create_new_index(self):
-        """Create a new FAISS index."""
-        cpu_index = faiss.IndexFlatIP(self.embedding_dim)
-        
+        """Create a new FAISS index (flat until the store is large enough to train)."""
+        self._index_generation += 1
+        self.index = self._to_device(faiss.IndexFlatIP(self.embedding_dim))
+    
+    def _to_device(self, cpu_index):
+        """Move an index to the GPU when available, otherwise keep it on CPU."""
         if self.is_gpu_enabled:
             try:
                 print("🚀 Attempting GPU acceleration for FAISS")
                 res = faiss.StandardGpuResources()
-                self.index = faiss.index_cpu_to_gpu(res, 0, cpu_index)
+                return faiss.index_cpu_to_gpu(res, 0, cpu_index)
             except Exception as e:
                 print(f"⚠️ GPU acceleration failed: {e}, falling back to CPU")
-                self.index = cpu_index
-        else:
-            print("💻 Using CPU for FAISS")
-            self.index = cpu_index
+                return cpu_index
+        print("💻 Using CPU for FAISS")
+        return cpu_index
+    
+    def _maybe_migrate_index(self):
+        """Start a background migration to the configured index type once due."""
+        if self.index_type == "flat" or self.index is None:
+            return
+        if self.index.ntotal < self.train_threshold or index_type_of(self.index) != "flat":
+            return
+        if self._migration_thread is not None and self._migration_thread.is_alive():
+            return
+        
+        self._migration_thread = threading.Thread(
+            target=self._migrate_index, name="vector-index-migration", daemon=True
+        )
+        self._migration_thread.start()
+    
+    def _migrate_index(self):
+        """
+        Build and train the configured index next to the live flat index.
+        
+        Searches keep using the flat index meanwhile; vectors added during the
+        build are copied over before the new index is swapped in.
+        """
+        try:
+            with self._lock:
+                generation = self._index_generation
+                built = self.index.ntotal
+                vectors = self.index.reconstruct_n(0, built)
+            
+            print(f"🏗️ Building {self.index_type} index over {built} vectors")
+            start = time.time()
+            target = create_index(self.index_type, self.embedding_dim, built)
+            train_index(target, vectors)
+            target.add(vectors)
+            build_seconds = time.time() - start
+            
+            report = evaluate_index(target, vectors, sample_queries(vectors, 200))
+            report['build_seconds'] = build_seconds
+            print(f"📈 {self.index_type} index: recall@10={report['recall_at_10']:.3f}, "
+                  f"{report['latency_ms']:.2f}ms/query (built in {build_seconds:.1f}s)")
+            
+            with self._lock:
+                if generation != self._index_generation:
+                    print("⚠️ Vector store changed during index migration, discarding")
+                    return
+                if self.index.ntotal > built:
+                    target.add(self.index.reconstruct_n(built, self.index.ntotal - built))
+                
+                self._index_generation += 1
+                self.index = self._to_device(target)
+                self.index_report = report
+                self.persistence.compact(self._get_cpu_index())
+            
+            print(f"✅ Switched vector store to {self.index_type} index")
+            
+        except Exception as e:
+            print(f"❌ Error migrating vector index: {e}")
+    
+    def wait_for_migration(self):
+        """Block until a running index migration has finished."""
+        if self._migration_thread is not None:
+            self._migration_thread.join()
+            self._migration_thread = None
     
     def add_chunks(self, chunks: List[Dict[str, Any]]) -> int:
         """
@@ -81,174 +204,629 @@ class VectorStore:
         # Extract texts for embedding
         texts = [chunk['text'] for chunk in chunks]
         
-        # Generate embeddings
-        embeddings = self.embedding_service.generate_embeddings(texts)
+        # Generate embeddings (cached by content)
+        embeddings = self.embedding_service.embed_chunks(texts)
         
-        # Normalize embeddings for cosine similarity
-        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return self.add_embedded_chunks(chunks, embeddings)
+    
+    def add_embedded_chunks(self, chunks: List[Dict[str, Any]], embeddings: np.ndarray) -> int:
+        """
+        Add chunks whose embeddings were computed elsewhere (e.g. by an
+        ingestion worker process).
         
-        # Add to FAISS index
-        self.index.add(embeddings.astype(np.float32))
+        Args:
+            chunks: List of chunk dictionaries with 'text' and metadata
+            embeddings: One embedding row per chunk, from the same model
         
-        # Store chunk metadata
-        start_idx = len(self.chunks)
-        for i, chunk in enumerate(chunks):
-            chunk['vector_index'] = start_idx + i
-            self.chunks.append(chunk)
+        Returns:
+            Number of chunks added
+        """
+        if not chunks:
+            return 0
+        if len(embeddings) != len(chunks):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(chunks)} chunks")
         
-        print(f"✅ Added {len(chunks)} chunks. Total chunks: {len(self.chunks)}")
+        # Normalize embeddings for cosine similarity
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
         
-        # Save updated index and metadata
-        self._save_index()
+        embeddings = embeddings.astype(np.float32)
+        
+        with self._lock:
+            # Store chunk metadata first; a crash before the vectors land is
+            # repaired on load by trimming the chunk store to the index
+            start_idx = len(self.chunk_store)
+            for i, chunk in enumerate(chunks):
+                chunk['vector_index'] = start_idx + i
+            self.chunk_store.append(chunks)
+            self.lexical_index.add(start_idx, [chunk['text'] for chunk in chunks])
+            
+            # Add to FAISS index
+            self.index.add(embeddings)
+            
+            print(f"✅ Added {len(chunks)} chunks. Total chunks: {len(self.chunk_store)}")
+            
+            # Append only the new vectors to disk
+            self._save_index(embeddings)
+            
+            self._maybe_migrate_index()
         
         return len(chunks)
     
     def search(self, query: str, top_k: int = 5, 
                score_threshold: float = 0.3, 
-               document_ids: List[str] = None) -> List[Dict[str, Any]]:
+               document_ids: List[str] = None,
+               mode: Optional[str] = None,
+               fusion: Optional[str] = None,
+               alpha: Optional[float] = None) -> List[Dict[str, Any]]:
         """
-        Search for similar chunks using semantic similarity.
+        Search for similar chunks using semantic similarity, BM25, or both.
         
         Args:
             query: Search query
             top_k: Number of top results to return
-            score_threshold: Minimum similarity score (0-1)
+            score_threshold: Minimum similarity score (0-1); lexical matches
+                are kept regardless in hybrid mode
             document_ids: Optional list of document IDs to filter by
+            mode: "dense", "lexical" or "hybrid" (default SEARCH_MODE)
+            fusion: Hybrid fusion, "rrf" or "weighted" (default HYBRID_FUSION)
+            alpha: Weight of the dense score in weighted fusion (default HYBRID_ALPHA)
         
         Returns:
             List of similar chunks with scores
         """
-        if not self.chunks or self.index.ntotal == 0:
+        mode = (mode or SEARCH_MODE).lower()
+        fusion = (fusion or HYBRID_FUSION).lower()
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}', expected one of {FUSION_METHODS}")
+        
+        if self._live_count() == 0 or self.index.ntotal == 0:
             print("⚠️ Vector store is empty")
             return []
         
-        print(f"🔍 Searching for: '{query[:50]}...' (top_k={top_k}, filter_docs={len(document_ids) if document_ids else 'None'})")
+        print(f"🔍 Searching for: '{query[:50]}...' (top_k={top_k}, mode={mode}, filter_docs={len(document_ids) if document_ids else 'None'})")
+        
+        if mode == "lexical":
+            with self._lock:
+                return self._lexical_search(query, top_k, document_ids)
         
         # Generate query embedding
-        query_embedding = self.embedding_service.generate_embeddings([f"query: {query}"])
+        query_embedding = self.embedding_service.embed_query(query)
         query_embedding = query_embedding / np.linalg.norm(query_embedding, axis=1, keepdims=True)
         
+        with self._lock:
+            if mode == "hybrid":
+                return self._hybrid_search(
+                    query, query_embedding, top_k, score_threshold, document_ids,
+                    fusion, HYBRID_ALPHA if alpha is None else alpha
+                )
+            return self._search_index(query_embedding, top_k, score_threshold, document_ids)
+    
+    def search_batch(self, queries: List[str], top_k: int = 5,
+                     score_threshold: float = 0.3,
+                     document_ids: List[str] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one embedding batch and one index search.
+        
+        Args:
+            queries: Search queries
+            top_k: Number of top results to return per query
+            score_threshold: Minimum similarity score (0-1)
+            document_ids: Optional list of document IDs to filter by
+        
+        Returns:
+            One result list per query, in order
+        """
+        if not queries:
+            return []
+        if self._live_count() == 0 or self.index.ntotal == 0:
+            print("⚠️ Vector store is empty")
+            return [[] for _ in queries]
+        
+        print(f"🔍 Searching for {len(queries)} queries (top_k={top_k}, filter_docs={len(document_ids) if document_ids else 'None'})")
+        
+        query_embeddings = np.array(self.embedding_service.embed_queries(queries), dtype=np.float32)
+        query_embeddings /= np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+        
+        with self._lock:
+            return self._search_rows(query_embeddings, top_k, score_threshold, document_ids)
+    
+    def _search_index(self, query_embedding: np.ndarray, top_k: int,
+                      score_threshold: float,
+                      document_ids: List[str] = None) -> List[Dict[str, Any]]:
+        """Search the index with a normalized query embedding (caller holds the lock)."""
+        return self._search_rows(query_embedding, top_k, score_threshold, document_ids)[0]
+    
+    def _search_rows(self, query_embeddings: np.ndarray, top_k: int,
+                     score_threshold: float,
+                     document_ids: List[str] = None) -> List[List[Dict[str, Any]]]:
+        """Search the index with one normalized embedding per row (caller holds the lock)."""
+        query_embedding = query_embeddings.astype(np.float32)
+        
         if document_ids:
-            # Option B: Filter during search - Create subset index
+            # Filter inside the main index search using the documents' row ranges
             print(f"🎯 Filtering search to {len(document_ids)} selected documents")
             
-            # Get indices of chunks belonging to selected documents
-            valid_indices = []
-            for i, chunk in enumerate(self.chunks):
-                if chunk.get('document_id') in document_ids:
-                    valid_indices.append(i)
+            ranges = self.chunk_store.document_ranges(document_ids)
+            selected = sum(end - start for start, end in ranges)
             
-            if not valid_indices:
+            if selected == 0:
                 print("⚠️ No chunks found for selected documents")
-                return []
-            
-            print(f"📊 Found {len(valid_indices)} chunks from selected documents")
-            
-            # Create temporary index with only selected document chunks
-            subset_embeddings = []
-            for idx in valid_indices:
-                # Extract embedding from main index
-                embedding = np.zeros((1, self.embedding_dim), dtype=np.float32)
-                self.index.reconstruct(idx, embedding[0])
-                subset_embeddings.append(embedding[0])
-            
-            subset_embeddings = np.array(subset_embeddings).astype(np.float32)
-            
-            # Create temporary FAISS index
-            subset_index = faiss.IndexFlatIP(self.embedding_dim)
-            subset_index.add(subset_embeddings)
-            
-            # Search in subset
-            scores, subset_indices = subset_index.search(
-                query_embedding.astype(np.float32), 
-                min(top_k, len(valid_indices))
-            )
-            
-            # Map back to original chunks
-            results = []
-            for score, subset_idx in zip(scores[0], subset_indices[0]):
-                if subset_idx >= 0 and score >= score_threshold:
-                    original_idx = valid_indices[subset_idx]
-                    chunk = self.chunks[original_idx].copy()
-                    chunk['similarity_score'] = float(score)
-                    results.append(chunk)
+                return [[] for _ in query_embedding]
             
-            print(f"✅ Returning {len(results)} results from selected documents")
+            print(f"📊 Found {selected} chunks from selected documents")
             
+            scores, indices = self._filtered_search(query_embedding, min(top_k, selected), ranges)
         else:
             # Search in entire index (original behavior)
-            scores, indices = self.index.search(
-                query_embedding.astype(np.float32), 
-                min(top_k, len(self.chunks))
-            )
-            
-            # Format results
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
+            scores, indices = self._dense_search(query_embedding, top_k)
+        
+        # Format results, reading each chunk once even if several queries hit it
+        chunks: Dict[int, Dict[str, Any]] = {}
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            row_results = []
+            for score, idx in zip(row_scores, row_indices):
                 if idx >= 0 and score >= score_threshold:
-                    chunk = self.chunks[idx].copy()
+                    if idx not in chunks:
+                        chunks[idx] = self.chunk_store.get(int(idx))
+                    chunk = dict(chunks[idx])
                     chunk['similarity_score'] = float(score)
-                    results.append(chunk)
-            
-            print(f"📊 Found {len(results)} results above threshold {score_threshold}")
+                    row_results.append(chunk)
+            results.append(row_results)
+        
+        found = sum(len(row_results) for row_results in results)
+        if document_ids:
+            print(f"✅ Returning {found} results from selected documents")
+        else:
+            print(f"📊 Found {found} results above threshold {score_threshold}")
         
         return results
     
-    def _save_index(self):
-        """Save FAISS index and chunk metadata to disk."""
+    def _live_count(self) -> int:
+        return len(self.chunk_store) - self.chunk_store.deleted_count
+    
+    def _search_ranges(self, document_ids: List[str] = None) -> Optional[List[Tuple[int, int]]]:
+        """Row ranges a search may return: the documents' rows, the live rows, or None for all rows."""
+        if document_ids:
+            return self.chunk_store.document_ranges(document_ids)
+        if self.chunk_store.deleted_count:
+            return self.chunk_store.live_ranges()
+        return None
+    
+    def _dense_search(self, query_embedding: np.ndarray, k: int,
+                      ranges: Optional[List[Tuple[int, int]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the main index, skipping deleted rows and restricted to ``ranges`` if given."""
+        if ranges is not None:
+            return self._filtered_search(query_embedding, min(k, sum(end - start for start, end in ranges)), ranges)
+        if self.chunk_store.deleted_count:
+            return self._filtered_search(query_embedding, min(k, self._live_count()), None)
+        return self.index.search(query_embedding, min(k, self.index.ntotal), params=search_parameters(self.index))
+    
+    def _lexical_search(self, query: str, top_k: int,
+                        document_ids: List[str] = None) -> List[Dict[str, Any]]:
+        """BM25 search (caller holds the lock)."""
+        ranges = self._search_ranges(document_ids)
+        if document_ids and not ranges:
+            print("⚠️ No chunks found for selected documents")
+            return []
+        
+        scores, rows = self.lexical_index.search(query, top_k, ranges)
+        results = []
+        for score, row in zip(scores, rows):
+            chunk = self.chunk_store.get(int(row))
+            chunk['bm25_score'] = float(score)
+            results.append(chunk)
+        
+        print(f"📊 Found {len(results)} lexical matches")
+        return results
+    
+    def _hybrid_search(self, query: str, query_embedding: np.ndarray, top_k: int,
+                       score_threshold: float, document_ids: List[str],
+                       fusion: str, alpha: float) -> List[Dict[str, Any]]:
+        """
+        Fuse dense and BM25 rankings of HYBRID_CANDIDATES hits each (caller
+        holds the lock).
+        
+        Every result keeps its cosine 'similarity_score' (looked up for
+        lexical-only hits) alongside 'bm25_score' and the fused 'hybrid_score'
+        it is ranked by.
+        """
+        candidates = max(top_k, HYBRID_CANDIDATES)
+        if document_ids:
+            ranges = self.chunk_store.document_ranges(document_ids)
+            if not ranges:
+                print("⚠️ No chunks found for selected documents")
+                return []
+            dense_scores, dense_rows = self._dense_search(query_embedding, candidates, ranges)
+        else:
+            dense_scores, dense_rows = self._dense_search(query_embedding, candidates)
+            ranges = self._search_ranges()
+        similarity = {int(row): float(score) for score, row in zip(dense_scores[0], dense_rows[0]) if row >= 0}
+        dense_ranking = list(similarity)
+        
+        bm25_scores, bm25_rows = self.lexical_index.search(query, candidates, ranges)
+        bm25 = {int(row): float(score) for score, row in zip(bm25_scores, bm25_rows)}
+        
+        # Cosine similarity of lexical hits the dense search did not return
+        missing = [row for row in bm25 if row not in similarity]
+        if missing:
+            scores, rows = self._filtered_search(
+                query_embedding, len(missing), [(row, row + 1) for row in missing]
+            )
+            similarity.update((int(row), float(score)) for score, row in zip(scores[0], rows[0]) if row >= 0)
+        
+        # Dense-only hits must clear the similarity threshold; lexical matches are kept
+        rows = [row for row in dense_ranking if row in bm25 or similarity[row] >= score_threshold]
+        dense_hits = set(dense_ranking)
+        rows += [row for row in bm25 if row not in dense_hits]
+        
+        if fusion == "rrf":
+            dense_rank = {row: rank for rank, row in enumerate(dense_ranking, 1)}
+            bm25_rank = {row: rank for rank, row in enumerate(bm25, 1)}
+            fused = {
+                row: (1 / (HYBRID_RRF_K + dense_rank[row]) if row in dense_rank else 0.0)
+                + (1 / (HYBRID_RRF_K + bm25_rank[row]) if row in bm25_rank else 0.0)
+                for row in rows
+            }
+        else:
+            top_bm25 = max(bm25.values(), default=0.0) or 1.0
+            fused = {
+                row: alpha * max(similarity.get(row, 0.0), 0.0) + (1 - alpha) * bm25.get(row, 0.0) / top_bm25
+                for row in rows
+            }
+        
+        results = []
+        for row in sorted(rows, key=lambda row: -fused[row])[:top_k]:
+            chunk = self.chunk_store.get(row)
+            chunk['similarity_score'] = similarity.get(row, 0.0)
+            chunk['bm25_score'] = bm25.get(row, 0.0)
+            chunk['hybrid_score'] = fused[row]
+            results.append(chunk)
+        
+        print(f"📊 Fused {len(dense_ranking)} dense and {len(bm25)} lexical candidates into {len(results)} results ({fusion})")
+        return results
+    
+    def _filtered_search(self, query_embedding: np.ndarray, k: int,
+                         ranges: Optional[List[Tuple[int, int]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Search the main index restricted to the given vector id ranges (None = all live rows)."""
+        if ranges is None:
+            selector = self._live_selector()
+        elif len(ranges) == 1:
+            selector = faiss.IDSelectorRange(ranges[0][0], ranges[0][1])
+        else:
+            selector = faiss.IDSelectorBatch(
+                np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges])
+            )
+        
         try:
-            # Save FAISS index
-            if self.is_gpu_enabled:
-                # Move to CPU before saving
-                cpu_index = faiss.index_gpu_to_cpu(self.index)
-                faiss.write_index(cpu_index, str(self.index_path))
-            else:
-                faiss.write_index(self.index, str(self.index_path))
+            return self.index.search(query_embedding, k, params=search_parameters(self.index, selector))
+        except RuntimeError as e:
+            # Some index types (e.g. on GPU) reject search-time selectors
+            print(f"⚠️ IDSelector search unsupported ({e}), using masked search")
+            return self._masked_search(query_embedding, k, self._search_ranges() if ranges is None else ranges)
+    
+    def _live_selector(self):
+        """Selector excluding deleted rows, cached until the next delete or compaction."""
+        if self._deleted_selector is None:
+            deleted = faiss.IDSelectorBatch(self.chunk_store.deleted_rows())
+            selector = faiss.IDSelectorNot(deleted)
+            selector.deleted = deleted  # IDSelectorNot does not own the inner selector
+            self._deleted_selector = selector
+        return self._deleted_selector
+    
+    def _masked_search(self, query_embedding: np.ndarray, k: int,
+                       ranges: List[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Over-fetch from the main index and keep hits inside the ranges."""
+        if len(query_embedding) > 1:
+            rows = [self._masked_search(query_embedding[i:i + 1], k, ranges) for i in range(len(query_embedding))]
+            return np.vstack([scores for scores, _ in rows]), np.vstack([indices for _, indices in rows])
+        
+        mask = np.zeros(self.index.ntotal, dtype=bool)
+        for start, end in ranges:
+            mask[start:end] = True
+        
+        fetch = min(self.index.ntotal, max(4 * k, 64))
+        while True:
+            scores, indices = self.index.search(query_embedding, fetch, params=search_parameters(self.index))
+            keep = (indices[0] >= 0) & mask[np.clip(indices[0], 0, None)]
+            if keep.sum() >= k or fetch == self.index.ntotal:
+                break
+            fetch = min(self.index.ntotal, fetch * 4)
+        
+        # Pad to k columns like a FAISS search, so batched rows stack
+        kept_scores, kept_indices = scores[0, keep][:k], indices[0, keep][:k]
+        padded_scores = np.full((1, k), -np.inf, dtype=np.float32)
+        padded_indices = np.full((1, k), -1, dtype=np.int64)
+        padded_scores[0, :len(kept_scores)] = kept_scores
+        padded_indices[0, :len(kept_indices)] = kept_indices
+        return padded_scores, padded_indices
+    
+    def remove_document(self, document_id: str) -> int:
+        """
+        Remove a document's chunks from the store.
+        
+        The rows are flagged deleted in the chunk store, which is proportional
+        to the document's size, and every search skips them from then on.
+        Their vectors, text and postings are reclaimed by ``compact_deleted``
+        on a background thread once deleted rows make up
+        delete_compact_ratio of the store.
+        
+        Args:
+            document_id: Document whose chunks to remove
+        
+        Returns:
+            Number of chunks removed
+        """
+        with self._lock:
+            removed = self.chunk_store.delete_documents([document_id])
+            if not removed:
+                return 0
+            self._deleted_selector = None
+            print(f"🗑️ Removed {removed} chunks of document {document_id}")
             
-            # Save chunk metadata
-            with open(self.chunks_path, 'w') as f:
-                json.dump(self.chunks, f, indent=2)
+            if self.chunk_store.deleted_count >= self.delete_compact_ratio * len(self.chunk_store):
+                self._start_compaction()
+        return removed
+    
+    def _start_compaction(self):
+        """Start ``compact_deleted`` on a background thread unless one is running."""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        
+        def compact():
+            try:
+                self.compact_deleted()
+            except Exception as e:
+                print(f"❌ Error compacting deleted chunks: {e}")
+        
+        self._compaction_thread = threading.Thread(
+            target=compact, name="vector-store-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+    
+    def wait_for_compaction(self):
+        """Block until a running deleted-row compaction has finished."""
+        if self._compaction_thread is not None:
+            self._compaction_thread.join()
+            self._compaction_thread = None
+    
+    def compact_deleted(self) -> int:
+        """
+        Rewrite the store without deleted rows, renumbering the live ones.
+        
+        The compacted chunk store, lexical index and FAISS snapshot are
+        written to ``staging/`` next to the live files and moved into place
+        once complete, so a crash leaves either the old store or the new one.
+        
+        Returns:
+            Number of rows reclaimed
+        """
+        with self._lock:
+            deleted = self.chunk_store.deleted_count
+            if not deleted:
+                return 0
+            
+            start = time.time()
+            print(f"🗜️ Compacting {deleted} deleted chunks out of the vector store")
+            live_ranges = self.chunk_store.live_ranges()
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            self.staging_dir.mkdir()
+            
+            self.chunk_store.copy_live_rows(self.staging_dir / "chunks").close()
+            self.lexical_index.copy_rows(live_ranges, self.staging_dir / "lexical")
+            faiss.write_index(self._live_index(live_ranges), str(self.staging_dir / "faiss_index"))
+            (self.staging_dir / "COMPLETE").touch()
+            
+            self._swap_in_staged()
+            print(f"✅ Reclaimed {deleted} chunks in {time.time() - start:.1f}s")
+            return deleted
+    
+    def install_generation(self, target: "VectorStore", known_document_ids: Iterable[str]) -> int:
+        """
+        Replace this store's contents with ``target``, a store built in
+        ``rebuild_dir``, and close ``target``.
+        
+        Documents this store holds that are neither in ``target`` nor in
+        ``known_document_ids`` (the documents the rebuild was given and
+        those already indexed when it started), i.e. documents indexed
+        while it was being built, are copied into it first so they are not
+        lost. Anything else ``target`` lacks was left out on purpose and is
+        dropped. The swap is staged like a compaction.
+        
+        Returns:
+            Number of documents carried over from this store
+        """
+        known = set(known_document_ids)
+        target.wait_for_migration()
+        with self._lock, target._lock:
+            carried = [
+                document_id for document_id in self.chunk_store.document_ids()
+                if document_id not in known and not target.chunk_store.document_ranges([document_id])
+            ]
+            if carried:
+                chunks, embeddings = self.export_documents(carried)
+                target.add_embedded_chunks(chunks, embeddings)
+                print(f"📦 Carried {len(carried)} documents indexed during the rebuild over")
             
-            print(f"💾 Saved vector store with {len(self.chunks)} chunks")
+            cpu_index = target._get_cpu_index()
+            target._close_store()
+            faiss.write_index(cpu_index, str(target.vector_store_dir / "faiss_index"))
+            (target.vector_store_dir / "COMPLETE").touch()
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+            os.replace(target.vector_store_dir, self.staging_dir)
+            
+            self._swap_in_staged()
+            print(f"✅ Installed rebuilt vector store with {len(self.chunk_store)} chunks")
+            return len(carried)
+    
+    def export_documents(self, document_ids: List[str]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Chunks and normalized embeddings of the given documents, for adding to another store."""
+        with self._lock:
+            rows = self.chunk_store.rows_for_documents(document_ids)
+            chunks = self.chunk_store.get_many(rows)
+            for chunk in chunks:
+                chunk.pop('vector_index')
+            return chunks, self._reconstruct_rows(rows)
+    
+    def _reconstruct_rows(self, rows: np.ndarray) -> np.ndarray:
+        cpu_index = self._get_cpu_index()
+        ivf = faiss.try_extract_index_ivf(cpu_index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            cpu_index = faiss.clone_index(cpu_index)
+            faiss.extract_index_ivf(cpu_index).make_direct_map()
+        if len(rows) == 0:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        return np.vstack([cpu_index.reconstruct(int(row)) for row in rows]).astype(np.float32)
+    
+    def _swap_in_staged(self):
+        """Reopen the store from a complete staged generation (caller holds the lock)."""
+        # Searches wait on the lock while the stores are swapped
+        self._close_store()
+        self._install_staged()
+        self._deleted_selector = None
+        self._index_generation += 1
+        self._open_store()
+        self._maybe_migrate_index()
+    
+    def _live_index(self, live_ranges: List[Tuple[int, int]]):
+        """CPU index of the same type holding only the vectors in ``live_ranges``."""
+        compacted = faiss.clone_index(self._get_cpu_index())
+        ivf = faiss.try_extract_index_ivf(compacted)
+        if ivf is not None:
+            ivf.make_direct_map()
+        vectors = [compacted.reconstruct_n(start, end - start) for start, end in live_ranges]
+        if ivf is not None:
+            ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+        
+        # Keeps the trained quantizer of IVF indexes
+        compacted.reset()
+        if vectors:
+            compacted.add(np.vstack(vectors))
+        return compacted
+    
+    def _install_staged(self):
+        """Move a complete staged generation into place, or discard an incomplete one."""
+        if not self.staging_dir.exists():
+            return
+        if not (self.staging_dir / "COMPLETE").exists():
+            print("⚠️ Discarding incomplete staged vector store")
+            shutil.rmtree(self.staging_dir)
+            return
+        
+        # Each move is skipped once done, so a crash here is finished on the next load
+        for name in ("chunks", "lexical"):
+            target_dir = self.vector_store_dir / name
+            target_dir.mkdir(exist_ok=True)
+            for path in (self.staging_dir / name).iterdir():
+                os.replace(path, target_dir / path.name)
+        VectorStorePersistence(self.vector_store_dir, self.embedding_dim).install_snapshot(
+            self.staging_dir / "faiss_index"
+        )
+        shutil.rmtree(self.staging_dir)
+    
+    def _save_index(self, embeddings: np.ndarray):
+        """Append new vectors to disk, compacting when due."""
+        try:
+            self.persistence.append(embeddings)
+            
+            if self.persistence.should_compact():
+                print(f"🗜️ Compacting vector store ({self.index.ntotal} vectors)")
+                self.persistence.compact(self._get_cpu_index())
             
         except Exception as e:
             print(f"❌ Error saving vector store: {e}")
     
+    def _get_cpu_index(self):
+        """Return a CPU copy of the index for serialization."""
+        if self.is_gpu_enabled and hasattr(faiss, "index_gpu_to_cpu"):
+            try:
+                return faiss.index_gpu_to_cpu(self.index)
+            except Exception:
+                pass
+        return self.index
+    
     def _load_index(self):
-        """Load FAISS index and chunk metadata from disk."""
+        """Load FAISS index snapshot and replay appended segments from disk."""
         try:
-            # Load FAISS index
-            cpu_index = faiss.read_index(str(self.index_path))
+            cpu_index = self.persistence.load()
+            self._migrate_legacy_chunks(cpu_index)
+            if cpu_index is None:
+                if len(self.chunk_store):
+                    self.chunk_store.truncate(0)
+                return
             
-            if self.is_gpu_enabled and faiss.get_num_gpus() > 0:
-                res = faiss.StandardGpuResources()
-                self.index = faiss.index_cpu_to_gpu(res, 0, cpu_index)
-            else:
-                self.index = cpu_index
+            # Realign after a crash between the chunk and vector appends
+            chunk_count = len(self.chunk_store)
+            if chunk_count > cpu_index.ntotal:
+                self.chunk_store.truncate(cpu_index.ntotal)
+            elif chunk_count < cpu_index.ntotal:
+                print(f"⚠️ Dropping {cpu_index.ntotal - chunk_count} vectors without chunk metadata")
+                cpu_index = self._drop_tail(cpu_index, chunk_count)
+                self.persistence.compact(cpu_index, background=False)
             
-            # Load chunk metadata
-            if self.chunks_path.exists():
-                with open(self.chunks_path, 'r') as f:
-                    self.chunks = json.load(f)
+            self.index = self._to_device(cpu_index)
             
-            print(f"📂 Loaded vector store with {len(self.chunks)} chunks")
+            print(f"📂 Loaded vector store with {len(self.chunk_store)} chunks")
             
         except Exception as e:
             print(f"❌ Error loading vector store: {e}")
-            self._create_new_index()
+            self.index = None
+            self.persistence.reset()
+            self.chunk_store.reset()
+    
+    def _drop_tail(self, cpu_index, count: int):
+        """Remove vectors with ids >= ``count`` from a CPU index."""
+        try:
+            cpu_index.remove_ids(faiss.IDSelectorRange(count, cpu_index.ntotal))
+            return cpu_index
+        except RuntimeError:
+            # HNSW cannot remove ids; rebuild it from the vectors to keep
+            rebuilt = create_index(index_type_of(cpu_index), self.embedding_dim, count)
+            rebuilt.add(cpu_index.reconstruct_n(0, count))
+            return rebuilt
+    
+    def _migrate_legacy_chunks(self, cpu_index):
+        """Import chunk metadata from a pre-ChunkStore ``chunks.json``."""
+        legacy_chunks = self.persistence.load_legacy_chunks()
+        if legacy_chunks is None:
+            return
+        
+        if len(self.chunk_store) == 0 and cpu_index is not None:
+            print(f"📦 Migrating {len(legacy_chunks)} chunks from chunks.json to the chunk store")
+            self.chunk_store.append(legacy_chunks[:cpu_index.ntotal])
+        self.persistence.retire_legacy_chunks()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get vector store statistics."""
         return {
-            'total_chunks': len(self.chunks),
+            'total_chunks': self._live_count(),
+            'deleted_chunks': self.chunk_store.deleted_count,
+            'compacting_deleted': self._compaction_thread is not None and self._compaction_thread.is_alive(),
             'embedding_dimension': self.embedding_dim,
             'gpu_enabled': self.is_gpu_enabled,
             'index_size': self.index.ntotal if self.index else 0,
-            'model_name': self.embedding_service.model_name
+            'index': {
+                'type': index_type_of(self.index) if self.index else None,
+                'target_type': self.index_type,
+                'train_threshold': self.train_threshold,
+                'migrating': self._migration_thread is not None and self._migration_thread.is_alive(),
+                'report': self.index_report,
+            },
+            'model_name': self.embedding_service.model_name,
+            'persistence': self.persistence.get_stats(),
+            'chunk_store': self.chunk_store.get_stats(),
+            'lexical_index': self.lexical_index.get_stats()
         }
     
     def clear(self):
         """Clear all data from the vector store."""
-        self._create_new_index()
-        self.chunks = []
+        with self._lock:
+            self._create_new_index()
+            self.index_report = None
+            self.persistence.reset()
+            self.chunk_store.reset()
+            self.lexical_index.reset()
+            self._deleted_selector = None
         print("🗑️ Vector store cleared")
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Executors for blocking work done on behalf of async request handlers
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, TypeVar
+
+from app.config import (
+    DB_EXECUTOR_WORKERS,
+    EMBEDDING_EXECUTOR_WORKERS,
+    EVENT_LOOP_LAG_INTERVAL_SECONDS,
+    EXTRACTION_EXECUTOR_WORKERS,
+    LLM_EXECUTOR_WORKERS,
+)
+
+T = TypeVar("T")
+
+# Pools, by the kind of work they run
+EMBEDDING_POOL = "embedding"    # query embedding and vector search
+EXTRACTION_POOL = "extraction"  # text extraction, indexing and file reads
+DB_POOL = "db"                  # SQLAlchemy queries
+LLM_POOL = "llm"                # local LLM generation (API backends are async)
+
+_POOL_SIZES = {
+    EMBEDDING_POOL: EMBEDDING_EXECUTOR_WORKERS,
+    EXTRACTION_POOL: EXTRACTION_EXECUTOR_WORKERS,
+    DB_POOL: DB_EXECUTOR_WORKERS,
+    LLM_POOL: LLM_EXECUTOR_WORKERS,
+}
+
+# Recent timings kept per pool and lag samples kept by the monitor
+_TIMING_WINDOW = 1024
+
+
+def _percentiles(values: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of ``values`` in milliseconds."""
+    ordered = sorted(values)
+    if not ordered:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2)
+
+    return {'p50_ms': at(0.50), 'p95_ms': at(0.95), 'p99_ms': at(0.99), 'max_ms': round(ordered[-1] * 1000, 2)}
+
+
+class InstrumentedExecutor:
+    """
+    A named thread pool that records how long tasks queue and run.
+
+    Queue wait is the time between submitting a task and a thread picking
+    it up, so a pool that is too small for its load shows up as growing
+    wait times rather than as a slow event loop.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._active = 0
+        self._wait_times = deque(maxlen=_TIMING_WINDOW)
+        self._run_times = deque(maxlen=_TIMING_WINDOW)
+
+    def submit(self, fn: Callable[..., T], *args, **kwargs) -> Future:
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self._submitted += 1
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self._active += 1
+                self._wait_times.append(started_at - submitted_at)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._run_times.append(time.perf_counter() - started_at)
+
+        return self._executor.submit(task)
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run ``fn`` on this pool and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            submitted, completed, active = self._submitted, self._completed, self._active
+            wait_times, run_times = list(self._wait_times), list(self._run_times)
+        return {
+            'max_workers': self.max_workers,
+            'submitted': submitted,
+            'completed': completed,
+            'active': active,
+            'queued': submitted - completed - active,
+            'queue_wait': _percentiles(wait_times),
+            'run_time': _percentiles(run_times),
+        }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_executors: Dict[str, InstrumentedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> InstrumentedExecutor:
+    """The pool called ``name``, created on first use (and after shutdown)."""
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            if name not in _POOL_SIZES:
+                raise ValueError(f"Unknown executor: {name}")
+            executor = _executors[name] = InstrumentedExecutor(name, _POOL_SIZES[name])
+        return executor
+
+
+async def run_in_executor(name: str, fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run blocking ``fn(*args, **kwargs)`` on the named pool and await it.
+
+    Args:
+        name: One of EMBEDDING_POOL, EXTRACTION_POOL, DB_POOL, LLM_POOL
+        fn: Function to call on a pool thread
+    """
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    with _executors_lock:
+        executors = dict(_executors)
+    return {name: executor.get_stats() for name, executor in executors.items()}
+
+
+def shutdown_executors(wait: bool = False):
+    """Stop all pools; queued tasks are cancelled."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late the event loop wakes up from a timed sleep.
+
+    Any handler that blocks the loop delays every other request by the
+    same amount, and shows up here as lag. The monitor sleeps for
+    ``interval`` in a loop and records how much later than that it woke.
+    """
+
+    def __init__(self, interval: float = EVENT_LOOP_LAG_INTERVAL_SECONDS, window: int = _TIMING_WINDOW):
+        self.interval = interval
+        self._samples = deque(maxlen=window)
+        self._max_lag = 0.0
+        self._sample_count = 0
+
+    def record(self, lag: float):
+        self._samples.append(lag)
+        self._sample_count += 1
+        self._max_lag = max(self._max_lag, lag)
+
+    async def run(self):
+        """Sample lag until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def reset(self):
+        self._samples.clear()
+        self._max_lag = 0.0
+        self._sample_count = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Lag percentiles over the recent window, plus the all-time maximum."""
+        return {
+            'interval_ms': round(self.interval * 1000, 2),
+            'samples': self._sample_count,
+            'recent': _percentiles(self._samples),
+            'max_lag_ms': round(self._max_lag * 1000, 2),
+        }
+
+
+# Process-wide monitor; started with the application
+lag_monitor = EventLoopLagMonitor()
@@ -0,0 +1,84 @@
+"""
+Pooled HTTP clients for the LLM API backends
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import (
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_KEEPALIVE_EXPIRY_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+)
+
+
+def llm_http_limits(max_connections: int = LLM_MAX_CONCURRENCY) -> httpx.Limits:
+    """Connection pool limits shared by the sync and async clients of a backend."""
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(LLM_MAX_KEEPALIVE_CONNECTIONS, max_connections),
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def llm_http_timeout(timeout: float = LLM_REQUEST_TIMEOUT_SECONDS) -> httpx.Timeout:
+    return httpx.Timeout(timeout, connect=min(LLM_CONNECT_TIMEOUT_SECONDS, timeout))
+
+
+class AsyncClientPool:
+    """
+    An async client and a concurrency limit, one per event loop.
+
+    Async clients and semaphores belong to the loop they were first used
+    on. The server runs a single loop, so this is one pooled client for the
+    process; scripts and tests that run several loops in turn get a fresh
+    client for each instead of one bound to a closed loop.
+    """
+
+    def __init__(self, make_client: Callable[[], Any], max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.make_client = make_client
+        self.max_concurrency = max_concurrency
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client = None
+        self._limit: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.requests = 0
+
+    def get(self) -> Tuple[Any, asyncio.Semaphore]:
+        """The client and semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._client = self.make_client()
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client, self._limit
+
+    @asynccontextmanager
+    async def request(self) -> AsyncIterator[Any]:
+        """Wait for a free request slot, then yield the client."""
+        client, limit = self.get()
+        async with limit:
+            self.in_flight += 1
+            self.requests += 1
+            try:
+                yield client
+            finally:
+                self.in_flight -= 1
+
+    async def aclose(self):
+        """Close the client if it belongs to the running event loop."""
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            close = getattr(self._client, "aclose", None) or self._client.close  # httpx / AsyncOpenAI
+            await close()
+        self._client = self._loop = self._limit = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+        }
@@ -0,0 +1,156 @@
+"""
+Ingestion job monitor - the API-side half of the ingestion job queue
+"""
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from app.config import JOB_POLL_INTERVAL_SECONDS
+from app.database import SessionLocal
+from app.models.document import DocumentDB
+from app.services.ingestion import load_prepared
+from app.services.job_queue import JOB_READY, JOB_RUNNING, JobQueue
+from app.utils.executors import DB_POOL, EXTRACTION_POOL, run_in_executor
+
+logger = logging.getLogger(__name__)
+
+# How often running jobs are checked for workers that died
+_STALE_CHECK_INTERVAL_SECONDS = 30.0
+
+
+class IngestJobMonitor:
+    """Indexes finished ingestion jobs and relays their progress.
+
+    Worker processes extract and embed documents; this process owns the
+    vector store, so the monitor is the only place their results are
+    written to it. Every poll it:
+      * forwards progress of running jobs to the uploading client's websocket
+      * adds the chunks of each ready job to the vector store and updates
+        the document's row
+      * requeues jobs whose worker stopped heartbeating
+    """
+
+    def __init__(self, queue: JobQueue, get_rag_service: Callable[[], Any],
+                 session_factory: Callable = SessionLocal, notifier=None,
+                 poll_interval: float = JOB_POLL_INTERVAL_SECONDS):
+        self.queue = queue
+        self.get_rag_service = get_rag_service
+        self.session_factory = session_factory
+        self.notifier = notifier
+        self.poll_interval = poll_interval
+        self._progress_seen_at = 0.0
+        self._stale_checked_at = 0.0
+
+    async def run(self):
+        """Poll the queue until cancelled."""
+        logger.info("🗂️ Ingestion job monitor started")
+        while True:
+            try:
+                await self.poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Job monitor error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def poll(self):
+        now = time.time()
+        if now - self._stale_checked_at >= _STALE_CHECK_INTERVAL_SECONDS:
+            self._stale_checked_at = now
+            recovered = await run_in_executor(DB_POOL, self.queue.requeue_stale)
+            if recovered:
+                logger.warning(f"⚠️ Recovered {recovered} ingestion jobs from unresponsive workers")
+
+        running = await run_in_executor(
+            DB_POOL, self.queue.list_jobs, status=JOB_RUNNING, updated_since=self._progress_seen_at
+        )
+        for job in running:
+            self._progress_seen_at = max(self._progress_seen_at, job['updated_at'])
+            await self._notify(job, job['stage'], job['progress'], job['details'] or "")
+
+        ready = await run_in_executor(DB_POOL, self.queue.list_jobs, status=JOB_READY)
+        for job in ready:
+            result = await run_in_executor(EXTRACTION_POOL, self.commit_job, job)
+            if result['success']:
+                await self._notify(job, "complete", 100,
+                                   f"Successfully processed: {result['chunks_created']} chunks created")
+            else:
+                await self._notify(job, "error", 0, result.get('error', 'Processing failed'))
+
+    def commit_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Index a ready job's chunks and record the outcome; returns its result."""
+        result = dict(job['result'] or {'success': False, 'error': 'Job finished without a result'})
+        artifact = result.pop('artifact', None)
+
+        document_id = job['payload'].get('document_id')
+        if result.get('success') and not self._document_exists(job['payload'].get('file_id')):
+            result = {'success': False, 'error': "Document was deleted", 'document_id': document_id}
+        if result.get('success'):
+            try:
+                chunks, embeddings = load_prepared(Path(artifact))
+                result['chunks_added'] = self.get_rag_service().vector_store.add_embedded_chunks(chunks, embeddings)
+            except Exception as e:
+                logger.error(f"❌ Indexing job {job['id']} failed: {e}")
+                result = {'success': False, 'error': f"Indexing failed: {e}", 'document_id': result.get('document_id')}
+
+        # Close the job before touching the database so it is never indexed twice
+        if result['success']:
+            if not self.queue.complete(job['id'], result):
+                # Cancelled by a delete while it was being indexed; the delete may already have run
+                self.get_rag_service().remove_document(document_id)
+                logger.info(f"🗑️ Job {job['id']} was cancelled while indexing, removed its chunks")
+                result = {'success': False, 'error': "Document was deleted", 'document_id': document_id}
+            else:
+                logger.info(f"✅ Indexed job {job['id']}: {result['chunks_created']} chunks")
+        else:
+            self.queue.fail(job['id'], result.get('error', 'Processing failed'))
+        if artifact:
+            Path(artifact).unlink(missing_ok=True)
+
+        try:
+            self._update_document(job['payload'].get('file_id'), result)
+        except Exception as e:
+            logger.error(f"❌ Could not update document for job {job['id']}: {e}")
+        return result
+
+    def _document_exists(self, file_id: Optional[str]) -> bool:
+        if not file_id:
+            return True
+        db = self.session_factory()
+        try:
+            return db.query(DocumentDB.id).filter(DocumentDB.id == file_id).first() is not None
+        finally:
+            db.close()
+
+    def _update_document(self, file_id: Optional[str], result: Dict[str, Any]):
+        if not file_id:
+            return
+        db = self.session_factory()
+        try:
+            document = db.query(DocumentDB).filter(DocumentDB.id == file_id).first()
+            if document is None:
+                return  # Deleted while it was being processed
+            if result['success']:
+                document.status = "processed"
+                document.char_count = result.get('char_count', 0)
+                document.chunks_created = result.get('chunks_created', 0)
+                document.processed_path = result.get('processed_path')
+            else:
+                document.status = "error"
+            db.commit()
+        finally:
+            db.close()
+
+    async def _notify(self, job: Dict[str, Any], stage: str, progress: int, details: str):
+        client_id = job['payload'].get('client_id')
+        if not client_id or self.notifier is None:
+            return
+        await self.notifier.send_json(client_id, {
+            "type": "document_progress",
+            "document_id": job['payload'].get('file_id'),  # Frontend tracks uploads by file id
+            "stage": stage,
+            "progress": progress,
+            "details": details
+        })
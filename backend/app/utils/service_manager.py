@@ -2,6 +2,7 @@
 Service Manager - Centralized service initialization and health monitoring
 """
 import logging
+import threading
 import time
 from typing import Dict, Any, Optional
 from pathlib import Path
@@ -9,20 +10,108 @@ import torch
 
 from app.services.rag_service import RAGService
 from app.services.llm import LLMService
+from app.services.job_queue import JobQueue
 
 logger = logging.getLogger(__name__)
 
 
 class ServiceManager:
-    """Manages all RAG system services with health monitoring."""
+    """Manages all RAG system services with health monitoring.
+    
+    This is the single process-wide container for the heavy services. Routers,
+    the websocket handler and background tasks all resolve their services
+    through it, so the embedding model and FAISS index are loaded once per
+    process and every request sees the same vector store.
+    """
     
     def __init__(self):
         """Initialize service manager."""
         self.rag_service: Optional[RAGService] = None
         self.llm_service: Optional[LLMService] = None
+        self.job_queue: Optional[JobQueue] = None
         self.initialization_time: Optional[float] = None
         self.services_healthy = False
         
+        # Guards lazy construction so concurrent first requests share one load
+        self._lock = threading.RLock()
+        self.load_counts = {"rag": 0, "llm": 0}
+        self.load_times: Dict[str, float] = {}
+        
+        # LLM warm-up progress: pending, warming, then ready, degraded (no LLM) or failed
+        self.llm_warmup: Dict[str, Any] = {"state": "pending"}
+    
+    def get_rag_service(self) -> RAGService:
+        """Return the shared RAG service, creating it on first use."""
+        if self.rag_service is None:
+            with self._lock:
+                if self.rag_service is None:
+                    self.rag_service = self._create_rag_service()
+        return self.rag_service
+    
+    def get_llm_service(self) -> LLMService:
+        """Return the shared LLM service, creating it on first use."""
+        if self.llm_service is None:
+            with self._lock:
+                if self.llm_service is None:
+                    self.llm_service = self._create_llm_service()
+        return self.llm_service
+    
+    def warm_up_llm(self) -> Dict[str, Any]:
+        """
+        Create the LLM service if needed and warm up its backends.
+        
+        Blocking: the app runs this on an executor once it is serving, so
+        requests are accepted while the local model loads; /ready reports
+        the result.
+        """
+        self.llm_warmup = {"state": "warming"}
+        start = time.time()
+        try:
+            result = self.get_llm_service().warm_up()
+        except Exception as e:
+            logger.error(f"❌ LLM warm-up failed: {e}")
+            self.llm_warmup = {"state": "failed", "error": str(e), "seconds": time.time() - start}
+            return self.llm_warmup
+        
+        self.llm_warmup = {
+            "state": "ready" if result["ready"] else "degraded",
+            "seconds": time.time() - start,
+            "backends": result["backends"]
+        }
+        if result["ready"]:
+            logger.info(f"🔥 LLM backends warmed up in {self.llm_warmup['seconds']:.2f}s")
+        else:
+            logger.warning("⚠️ LLM warm-up finished but no primary LLM is available")
+        return self.llm_warmup
+    
+    def is_ready(self) -> bool:
+        """Whether the LLM backends are warmed up and at least one is available."""
+        return self.llm_warmup.get("state") == "ready"
+    
+    def get_job_queue(self) -> JobQueue:
+        """Return the ingestion job queue shared with the worker processes."""
+        if self.job_queue is None:
+            with self._lock:
+                if self.job_queue is None:
+                    self.job_queue = JobQueue()
+        return self.job_queue
+    
+    def _create_rag_service(self) -> RAGService:
+        start = time.time()
+        service = RAGService()
+        self.load_counts["rag"] += 1
+        self.load_times["rag"] = time.time() - start
+        logger.info(f"📊 RAG Service loaded in {self.load_times['rag']:.2f}s (load #{self.load_counts['rag']})")
+        return service
+    
+    def _create_llm_service(self) -> LLMService:
+        start = time.time()
+        service = LLMService()
+        self.load_counts["llm"] += 1
+        self.load_times["llm"] = time.time() - start
+        logger.info(f"🧠 LLM Service loaded in {self.load_times['llm']:.2f}s (load #{self.load_counts['llm']})")
+        return service
+        
     def initialize_services(self) -> Dict[str, Any]:
         """
         Initialize all services with proper error handling.
@@ -46,7 +135,7 @@ class ServiceManager:
             # Initialize RAG Service
             logger.info("📊 Initializing RAG Service...")
             rag_start = time.time()
-            self.rag_service = RAGService()
+            self.get_rag_service()
             rag_time = time.time() - rag_start
             initialization_status["services_initialized"].append({
                 "service": "RAG",
@@ -65,7 +154,7 @@ class ServiceManager:
             # Initialize LLM Service
             logger.info("🧠 Initializing LLM Service...")
             llm_start = time.time()
-            self.llm_service = LLMService()
+            self.warm_up_llm()
             llm_time = time.time() - llm_start
             
             # Check LLM status
@@ -120,6 +209,9 @@ class ServiceManager:
             "timestamp": time.time(),
             "services_healthy": self.services_healthy,
             "initialization_time": self.initialization_time,
+            "load_counts": dict(self.load_counts),
+            "load_times": dict(self.load_times),
+            "llm_warmup": dict(self.llm_warmup),
             "gpu_info": self._get_gpu_info(),
             "services": {}
         }
@@ -190,10 +282,16 @@ class ServiceManager:
         
         try:
             if service_name.lower() == "rag":
-                self.rag_service = RAGService()
+                with self._lock:
+                    self.rag_service = self._create_rag_service()
                 return {"success": True, "message": f"{service_name} service restarted"}
             elif service_name.lower() == "llm":
-                self.llm_service = LLMService()
+                with self._lock:
+                    old_service = self.llm_service
+                    self.llm_service = self._create_llm_service()
+                if old_service:
+                    old_service.cleanup()
+                self.warm_up_llm()
                 return {"success": True, "message": f"{service_name} service restarted"}
             else:
                 return {"success": False, "error": f"Unknown service: {service_name}"}
@@ -204,5 +302,33 @@ class ServiceManager:
             return {"success": False, "error": error_msg}
 
 
+    def shutdown(self):
+        """Release model resources on application shutdown.
+        
+        The RAG service keeps its state on disk, so it is left in place; the
+        LLM service frees GPU memory and is recreated on next use.
+        """
+        with self._lock:
+            if self.llm_service:
+                self.llm_service.cleanup()
+            self.llm_service = None
+            self.llm_warmup = {"state": "pending"}
+
+
 # Global service manager instance
-service_manager = ServiceManager()
\ No newline at end of file
+service_manager = ServiceManager()
+
+
+def get_rag_service() -> RAGService:
+    """Dependency to get the shared RAG service."""
+    return service_manager.get_rag_service()
+
+
+def get_llm_service() -> LLMService:
+    """Dependency to get the shared LLM service."""
+    return service_manager.get_llm_service()
+
+
+def get_job_queue() -> JobQueue:
+    """Dependency to get the ingestion job queue."""
+    return service_manager.get_job_queue()
\ No newline at end of file
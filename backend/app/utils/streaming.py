@@ -0,0 +1,60 @@
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+async def iterate_in_thread(make_iterator: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+    """
+    Consume a blocking iterator on a background thread as an async generator.
+
+    Items are handed to the event loop as soon as they are produced, so the
+    consumer sees each one without waiting for the iterator to finish. If
+    the consumer stops early (e.g. the client disconnected), the producer
+    stops at the next item.
+
+    Args:
+        make_iterator: Called on the background thread to create the iterator
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def publish(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            cancelled.set()  # Event loop already closed
+
+    def produce():
+        try:
+            for item in make_iterator():
+                if cancelled.is_set():
+                    break
+                publish(item)
+        except BaseException as e:
+            publish(_DONE, e)
+            return
+        publish(_DONE)
+
+    threading.Thread(target=produce, name="stream-producer", daemon=True).start()
+
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        cancelled.set()
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
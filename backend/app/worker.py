@@ -0,0 +1,41 @@
+"""
+Ingestion worker service
+
+Runs ingestion worker processes against the job queue, for deployments
+where workers run separately from the API (set INGEST_WORKER_PROCESSES=0
+on the API then). Stops on SIGTERM/SIGINT after the current jobs.
+
+Usage, from the backend directory:
+    python -m app.worker [--processes 2]
+"""
+import argparse
+import signal
+import threading
+
+from app.services.ingestion import start_worker_processes, stop_worker_processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=2, help="Number of worker processes")
+    args = parser.parse_args()
+
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop_event.set())
+
+    processes = start_worker_processes(args.processes)
+    print(f"👷 Started {len(processes)} ingestion worker processes")
+
+    # Restart workers that die (e.g. killed for memory) until asked to stop
+    while not stop_event.wait(5):
+        for index, process in enumerate(processes):
+            if not process.is_alive():
+                print(f"⚠️ Worker {process.name} exited with code {process.exitcode}, restarting")
+                processes[index] = start_worker_processes(1)[0]
+
+    stop_worker_processes(processes)
+
+
+if __name__ == "__main__":
+    main()
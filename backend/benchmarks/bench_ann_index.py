@@ -0,0 +1,83 @@
+"""
+ANN index recall/latency benchmark
+
+Builds every supported index type over the same vectors and reports
+recall@k against exact search and per-query latency, sweeping nprobe (IVF)
+and efSearch (HNSW), to pick VECTOR_INDEX_* settings for a deployment.
+
+Vectors are synthetic clustered embeddings by default; pass --store-dir to
+use the vectors of an existing flat vector store instead.
+
+Run from the backend directory:
+    python benchmarks/bench_ann_index.py [--vectors 100000] [--dim 384] [--k 10]
+"""
+import argparse
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append('.')
+
+from app.services.ann_index import (  # noqa: E402
+    create_index, evaluate_index, sample_queries, train_index,
+)
+from app.services.vector_persistence import VectorStorePersistence  # noqa: E402
+
+
+def clustered_vectors(count: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    """Embeddings grouped around topic centres, closer to real data than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def store_vectors(store_dir: str, dim: int) -> np.ndarray:
+    index = VectorStorePersistence(store_dir, dim).load()
+    if index is None:
+        sys.exit(f"No vector store found in {store_dir}")
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--store-dir", help="Evaluate on the vectors of an existing (flat) vector store")
+    args = parser.parse_args()
+
+    vectors = store_vectors(args.store_dir, args.dim) if args.store_dir else clustered_vectors(args.vectors, args.dim)
+    queries = sample_queries(vectors, args.queries)
+
+    print(f"\n📊 recall@{args.k} vs latency over {len(vectors)} vectors (dim {vectors.shape[1]})")
+    print(f"{'index':>10} {'setting':>14} {'build':>9} {'recall':>8} {'latency':>11}")
+
+    for index_type in ("flat", "hnsw", "ivf_flat", "ivf_pq"):
+        start = time.perf_counter()
+        index = create_index(index_type, vectors.shape[1], len(vectors))
+        train_index(index, vectors)
+        index.add(vectors)
+        build = time.perf_counter() - start
+
+        if index_type == "hnsw":
+            sweep = [("efSearch", value, faiss.SearchParametersHNSW(efSearch=value)) for value in (16, 32, 64, 128, 256)]
+        elif index_type.startswith("ivf"):
+            nlist = faiss.extract_index_ivf(index).nlist
+            sweep = [("nprobe", value, faiss.SearchParametersIVF(nprobe=value))
+                     for value in (1, 4, 16, 64, 256) if value <= nlist]
+        else:
+            sweep = [("exact", "", None)]
+
+        for name, value, params in sweep:
+            report = evaluate_index(index, vectors, queries, args.k, params=params)
+            print(f"{index_type:>10} {f'{name}={value}' if value != '' else name:>14} {build:>8.1f}s "
+                  f"{report[f'recall_at_{args.k}']:>8.3f} {report['latency_ms']:>9.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Chunk metadata load benchmark
+
+Writes the same chunks as the legacy indented ``chunks.json`` and as a
+ChunkStore, then reports, for each format, the time and resident memory
+needed to load it and to fetch the top-k hits of a search.
+
+Run from the backend directory:
+    python benchmarks/bench_chunk_store_load.py [--chunks 200000] [--text-length 800]
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import psutil
+
+sys.path.append('.')
+
+from app.services.chunk_store import ChunkStore  # noqa: E402
+
+
+def make_chunks(count: int, text_length: int, chunks_per_document: int = 500):
+    words = ["revenue", "policy", "contract", "section", "quarter", "annual", "report", "clause"]
+    for i in range(count):
+        document_id = f"doc_{i // chunks_per_document}"
+        text = " ".join(random.choice(words) for _ in range(text_length // 7))[:text_length]
+        yield {
+            'text': text,
+            'chunk_id': f"{document_id}_chunk_{i % chunks_per_document}",
+            'document_id': document_id,
+            'chunk_index': i % chunks_per_document,
+            'chunk_size': len(text),
+            'metadata': {
+                'filename': f"{document_id}.pdf",
+                'file_type': 'pdf',
+                'page_count': 120,
+                'char_count': chunks_per_document * text_length,
+                'extraction_method': 'pypdf2',
+            },
+            'vector_index': i,
+        }
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+def measure(label: str, load, hits):
+    gc.collect()
+    before = rss_mb()
+    start = time.perf_counter()
+    store = load()
+    load_s = time.perf_counter() - start
+    resident = rss_mb() - before
+
+    start = time.perf_counter()
+    fetched = [hit(store) for hit in hits]
+    fetch_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{label:>12} {load_s:>10.2f}s {resident:>10.0f}MB {fetch_ms:>12.3f}ms")
+    del store, fetched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--text-length", type=int, default=800)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        json_path = tmp / "chunks.json"
+        chunks = list(make_chunks(args.chunks, args.text_length))
+        with open(json_path, 'w') as f:
+            json.dump(chunks, f, indent=2)
+
+        store = ChunkStore(tmp / "chunks")
+        for start in range(0, len(chunks), 10000):
+            store.append(chunks[start:start + 10000])
+        store.close()
+        del chunks, store
+
+        on_disk = {
+            "chunks.json": json_path.stat().st_size,
+            "ChunkStore": sum(p.stat().st_size for p in (tmp / "chunks").iterdir()),
+        }
+        rows = random.sample(range(args.chunks), args.top_k)
+
+        print(f"\n📊 Loading {args.chunks} chunks, then fetching {args.top_k} hits")
+        print(f"{'format':>12} {'load':>11} {'resident':>12} {'top-k fetch':>14} {'on disk':>10}")
+        measure("chunks.json", lambda: json.load(open(json_path)),
+                [lambda c, r=r: dict(c[r]) for r in rows])
+        measure("ChunkStore", lambda: ChunkStore(tmp / "chunks"),
+                [lambda s, r=r: s.get(r) for r in rows])
+        for name, size in on_disk.items():
+            print(f"   {name} on disk: {size / 1024 / 1024:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Event loop lag benchmark
+
+Drives the API in-process with a mixed load - semantic searches (a fake
+RAG service that holds its thread for --search-ms, like a model encode)
+and document content reads (a --content-mb text file) - while sampling
+event loop lag and timing a cheap probe endpoint. Runs twice: with the
+blocking work on the executors, and with it called inline on the event
+loop as the routers used to, so the difference in lag p99 is visible.
+
+Run from the backend directory:
+    python benchmarks/bench_event_loop_lag.py [--clients 16] [--requests 10]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append('.')
+os.environ.setdefault("INGEST_MODE", "inline")
+os.environ.setdefault("INGEST_WORKER_PROCESSES", "0")
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.config import API_PREFIX
+from app.database import Base, get_db
+from app.main import app
+from app.models.document import DocumentDB
+from app.routers import document, query
+from app.utils.executors import EventLoopLagMonitor, _percentiles, shutdown_executors
+from app.utils.service_manager import get_rag_service
+
+
+class FakeRAGService:
+    def __init__(self, search_seconds: float):
+        self.search_seconds = search_seconds
+
+    def search_documents(self, query, top_k=5, score_threshold=0.3, document_ids=None):
+        time.sleep(self.search_seconds)
+        return {'success': True, 'results': [{'text': query, 'document_id': "doc", 'similarity_score': 0.9}]}
+
+
+async def run_inline(name, fn, *args, **kwargs):
+    """Stand-in for run_in_executor that blocks the loop like the old code."""
+    return fn(*args, **kwargs)
+
+
+async def mixed_load(clients: int, requests: int, document_id: str):
+    monitor = EventLoopLagMonitor(interval=0.005)
+    probe_latencies = []
+    lag_task = asyncio.create_task(monitor.run())
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+        async def client(index: int):
+            for i in range(requests):
+                if (index + i) % 2:
+                    await http.post(f"{API_PREFIX}/query/search", json={"query": f"question {index} {i}"})
+                else:
+                    await http.get(f"{API_PREFIX}/documents/{document_id}/content")
+
+        async def probe(stop: asyncio.Event):
+            while not stop.is_set():
+                start = time.perf_counter()
+                await http.get("/")
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*[client(index) for index in range(clients)])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+
+    lag_task.cancel()
+    return elapsed, monitor.get_stats(), _percentiles(probe_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--search-ms", type=float, default=50, help="Time each search holds its thread")
+    parser.add_argument("--content-mb", type=float, default=4, help="Size of the document read by content requests")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        processed = tmp_path / "document.txt"
+        processed.write_text("lorem ipsum " * int(args.content_mb * 1024**2 / 12), encoding="utf-8")
+        db = Session()
+        db.add(DocumentDB(id="bench", filename="document.txt", file_path=str(processed), file_type=".txt",
+                          status="processed", document_id="bench_document.txt", processed_path=str(processed)))
+        db.commit()
+        db.close()
+
+        def bench_db():
+            session = Session()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app.dependency_overrides[get_db] = bench_db
+        app.dependency_overrides[get_rag_service] = lambda: FakeRAGService(args.search_ms / 1000)
+
+        print(f"📊 Event loop lag under mixed load ({args.clients} clients x {args.requests} requests, "
+              f"{args.search_ms:.0f}ms searches, {args.content_mb:.0f}MB content reads)")
+        print(f"  {'Mode':<12} {'Total':>8} {'Lag p50':>9} {'Lag p99':>9} {'Lag max':>9} {'Probe p99':>10}")
+        for mode in ("executors", "inline"):
+            patched = []
+            if mode == "inline":
+                for module in (query, document):
+                    patched.append((module, module.run_in_executor))
+                    module.run_in_executor = run_inline
+            try:
+                elapsed, lag, probe = asyncio.run(mixed_load(args.clients, args.requests, "bench"))
+            finally:
+                for module, original in patched:
+                    module.run_in_executor = original
+            print(f"  {mode:<12} {elapsed:>7.2f}s {lag['recent']['p50_ms']:>7.1f}ms {lag['recent']['p99_ms']:>7.1f}ms "
+                  f"{lag['max_lag_ms']:>7.1f}ms {probe['p99_ms']:>8.1f}ms")
+
+        app.dependency_overrides.clear()
+        shutdown_executors()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Filtered search benchmark
+
+Fills a vector store with random vectors spread over many documents and
+compares the latency of unfiltered searches, searches filtered to a few
+documents through IDSelector, and the old approach of reconstructing the
+selected vectors into a temporary IndexFlatIP on every query.
+
+Run from the backend directory:
+    python benchmarks/bench_filtered_search.py [--chunks 100000] [--documents 200]
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append('.')
+
+from app.services.vector_store import VectorStore  # noqa: E402
+from benchmarks.bench_vector_store_ingest import RandomEmbeddingService  # noqa: E402
+
+
+def temp_index_search(store: VectorStore, query: np.ndarray, top_k: int, document_ids):
+    """Old behaviour: rebuild a subset index for the selected documents."""
+    rows = store.chunk_store.rows_for_documents(document_ids)
+    subset = np.zeros((len(rows), store.embedding_dim), dtype=np.float32)
+    for i, row in enumerate(rows):
+        store.index.reconstruct(int(row), subset[i])
+    subset_index = faiss.IndexFlatIP(store.embedding_dim)
+    subset_index.add(subset)
+    return subset_index.search(query, min(top_k, len(rows)))
+
+
+def timed(fn, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        embeddings = RandomEmbeddingService(args.dim)
+        store = VectorStore(embeddings, store_dir=store_dir)
+        per_document = args.chunks // args.documents
+        for document in range(args.documents):
+            store.add_chunks([
+                {'text': "x", 'document_id': f"doc_{document}", 'chunk_index': i, 'chunk_size': 1, 'metadata': {}}
+                for i in range(per_document)
+            ])
+
+        queries = embeddings.generate_embeddings(["q"] * args.queries)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = [q.reshape(1, -1) for q in queries]
+
+        print(f"\n📊 Search latency over {store.index.ntotal} vectors (top_k={args.top_k})")
+        print(f"{'selected docs':>14} {'unfiltered':>12} {'IDSelector':>12} {'temp index':>12}")
+        for selected in (1, 5, 20):
+            document_ids = [f"doc_{d}" for d in range(0, args.documents, args.documents // selected)][:selected]
+            with store._lock:
+                unfiltered = timed(lambda q: store._search_index(q, args.top_k, 0.0), queries)
+                selector = timed(lambda q: store._search_index(q, args.top_k, 0.0, document_ids), queries)
+                temp = timed(lambda q: temp_index_search(store, q, args.top_k, document_ids), queries)
+            print(f"{selected:>14} {unfiltered:>10.2f}ms {selector:>10.2f}ms {temp:>10.2f}ms")
+
+        store.persistence.close()
+
+
+if __name__ == "__main__":
+    main()
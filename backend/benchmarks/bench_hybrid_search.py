@@ -0,0 +1,108 @@
+"""
+Hybrid retrieval benchmark
+
+Indexes --chunks synthetic maintenance notes, each naming one part number
+(e.g. "PN-40213-K"), into a temporary vector store, then measures recall@k
+and search latency for each retrieval mode:
+    dense             embedding similarity only
+    lexical           BM25 over the inverted index only
+    hybrid-rrf        both, fused by reciprocal rank
+    hybrid-weighted   both, fused by weighted normalized scores
+
+Two query sets, each with one relevant chunk per query:
+    identifier  "what is the torque spec for PN-40213-K?"
+    keywords    a few words taken from the relevant chunk
+
+Run from the backend directory:
+    python benchmarks/bench_hybrid_search.py [--chunks 5000] [--queries 200] [--top-k 5]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append('.')
+
+from app.services.embedding import EmbeddingService  # noqa: E402
+from app.services.vector_store import VectorStore  # noqa: E402
+
+WORDS = (
+    "pump valve gasket housing bearing seal impeller shaft coupling flange bolt torque pressure "
+    "coolant filter hose clamp bracket sensor relay fuse harness connector motor gearbox belt "
+    "pulley tensioner actuator solenoid manifold nozzle injector regulator thermostat radiator "
+    "compressor condenser evaporator damper spring bushing washer nut rivet hinge latch panel "
+    "inspect replace tighten lubricate calibrate drain flush align clean test adjust install remove "
+    "weekly monthly annual leak noise vibration wear crack corrosion overheating failure warning"
+).split()
+
+MODES = [
+    ("dense", {'mode': "dense"}),
+    ("lexical", {'mode': "lexical"}),
+    ("hybrid-rrf", {'mode': "hybrid", 'fusion': "rrf"}),
+    ("hybrid-weighted", {'mode': "hybrid", 'fusion': "weighted"}),
+]
+
+
+def build_corpus(count: int, rng: random.Random):
+    part_numbers = [f"PN-{40000 + i}-{chr(65 + rng.randrange(26))}" for i in range(count)]
+    texts = [
+        f"Part {part} {' '.join(rng.choices(WORDS, k=40))}."
+        for part in part_numbers
+    ]
+    return part_numbers, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000, help="Chunks to index")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per query set")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per query")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    part_numbers, texts = build_corpus(args.chunks, rng)
+    chunks = [
+        {'text': text, 'chunk_id': f"manual_chunk_{i}", 'document_id': "manual", 'chunk_index': i,
+         'chunk_size': len(text), 'metadata': {'filename': "manual.txt"}}
+        for i, text in enumerate(texts)
+    ]
+    targets = rng.sample(range(args.chunks), min(args.queries, args.chunks))
+    query_sets = {
+        'identifier': [(f"what is the torque spec for {part_numbers[i]}?", i) for i in targets],
+        'keywords': [(" ".join(rng.sample(texts[i].split()[2:], 4)), i) for i in targets],
+    }
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        embedding_service = EmbeddingService()
+        store = VectorStore(embedding_service, store_dir=store_dir)
+        start = time.perf_counter()
+        store.add_chunks(chunks)
+        print(f"Indexed {args.chunks} chunks in {time.perf_counter() - start:.1f}s")
+
+        # Warm the query embedding cache so latency compares retrieval, not the model
+        for queries in query_sets.values():
+            embedding_service.embed_queries([query for query, _ in queries])
+
+        results = []
+        for set_name, queries in query_sets.items():
+            for mode_name, options in MODES:
+                hits, latencies = 0, []
+                for query, target in queries:
+                    start = time.perf_counter()
+                    found = store.search(query, top_k=args.top_k, score_threshold=0.0, **options)
+                    latencies.append(time.perf_counter() - start)
+                    hits += any(chunk['chunk_index'] == target for chunk in found)
+                results.append((set_name, mode_name, hits / len(queries), np.array(latencies) * 1000))
+
+    print(f"\n📊 Hybrid retrieval ({args.chunks} chunks, {len(targets)} queries per set, top_k={args.top_k})")
+    print(f"  {'Queries':<11} {'Mode':<16} {f'Recall@{args.top_k}':>9} {'p50':>9} {'p99':>9}")
+    for set_name, mode_name, recall, latencies in results:
+        print(f"  {set_name:<11} {mode_name:<16} {recall:>9.1%} "
+              f"{np.percentile(latencies, 50):>7.2f}ms {np.percentile(latencies, 99):>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
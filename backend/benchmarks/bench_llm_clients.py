@@ -0,0 +1,166 @@
+"""
+LLM client concurrency benchmark
+
+Starts a local OpenAI-compatible stub server that answers every chat
+completion after --latency-ms, and charges --handshake-ms once per new
+connection to stand in for the TCP and TLS setup of a real API. Then asks
+--questions concurrent questions through a GroqLLM pointed at the stub in
+three ways:
+    requests-2-threads   requests.post per call on 2 threads (the old path)
+    pooled-llm-threads   pooled sync client on LLM_EXECUTOR_WORKERS threads
+    async-pooled         agenerate_response on the pooled async client,
+                         at most LLM_MAX_CONCURRENCY in flight
+
+and reports throughput, latency percentiles (from when all questions were
+asked, so queueing counts) and connections opened.
+
+Run from the backend directory:
+    python benchmarks/bench_llm_clients.py [--questions 64] [--latency-ms 200] [--handshake-ms 50]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+sys.path.append('.')
+
+from app.config import LLM_EXECUTOR_WORKERS, LLM_MAX_CONCURRENCY  # noqa: E402
+from app.services.llm import GroqLLM  # noqa: E402
+
+
+class StubServer:
+    """Minimal HTTP/1.1 keep-alive server answering POST /chat/completions."""
+
+    def __init__(self, latency: float, handshake: float):
+        self.latency = latency
+        self.handshake = handshake
+        self.connections = 0
+        self.requests = 0
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = None
+
+    def start(self):
+        threading.Thread(target=self._run, name="llm-stub", daemon=True).start()
+        self._ready.wait()
+        return f"http://127.0.0.1:{self.port}"
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = dict(
+                    line.split(":", 1) for line in head.decode("latin-1").split("\r\n")[1:] if ":" in line
+                )
+                headers = {key.strip().lower(): value.strip() for key, value in headers.items()}
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+
+                answer = f"Stub answer to: {body['messages'][-1]['content'][:40]}"
+                payload = json.dumps({"choices": [{"message": {"role": "assistant", "content": answer}}]}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        writer.close()
+
+    def reset_counts(self):
+        self.connections = 0
+        self.requests = 0
+
+
+def ask_with_requests(groq: GroqLLM, prompt: str) -> str:
+    """The old GroqLLM.generate_response: a new requests session per call."""
+    response = requests.post(groq.endpoint, headers=groq.headers, json=groq._build_payload(prompt, 64, 0.3), timeout=60)
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def run_threads(fn, prompts, workers: int):
+    latencies = []
+
+    def timed(prompt):
+        fn(prompt)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(timed, prompts))
+    return time.perf_counter() - start, latencies
+
+
+def run_async(groq: GroqLLM, prompts):
+    async def run():
+        latencies = []
+
+        async def timed(prompt):
+            await groq.agenerate_response(prompt, max_tokens=64, temperature=0.3)
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[timed(prompt) for prompt in prompts])
+        elapsed = time.perf_counter() - start
+        await groq.aclose()
+        return elapsed, latencies
+
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=64, help="Concurrent questions")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Stub generation time per request")
+    parser.add_argument("--handshake-ms", type=float, default=50, help="Stub setup cost per new connection")
+    args = parser.parse_args()
+
+    stub = StubServer(args.latency_ms / 1000, args.handshake_ms / 1000)
+    base_url = stub.start()
+    groq = GroqLLM(api_key="bench", base_url=base_url)
+    prompts = [f"Question {i}: what changed in section {i}?" for i in range(args.questions)]
+
+    modes = [
+        ("requests-2-threads", lambda: run_threads(lambda p: ask_with_requests(groq, p), prompts, 2)),
+        ("pooled-llm-threads", lambda: run_threads(
+            lambda p: groq.generate_response(p, max_tokens=64, temperature=0.3), prompts, LLM_EXECUTOR_WORKERS
+        )),
+        ("async-pooled", lambda: run_async(groq, prompts)),
+    ]
+
+    results = []
+    for name, run in modes:
+        stub.reset_counts()
+        elapsed, latencies = run()
+        latencies = np.array(latencies) * 1000
+        results.append((name, elapsed, latencies, stub.connections))
+
+    print(f"\n📊 LLM client throughput ({args.questions} concurrent questions, {args.latency_ms:.0f}ms generation, "
+          f"{args.handshake_ms:.0f}ms per new connection, LLM_MAX_CONCURRENCY={LLM_MAX_CONCURRENCY})")
+    print(f"  {'Mode':<20} {'Total':>8} {'Questions/s':>12} {'p50':>10} {'p99':>10} {'Connections':>12}")
+    for name, elapsed, latencies, connections in results:
+        print(f"  {name:<20} {elapsed:>7.2f}s {len(latencies) / elapsed:>12.1f} "
+              f"{np.percentile(latencies, 50):>8.0f}ms {np.percentile(latencies, 99):>8.0f}ms {connections:>12}")
+
+
+if __name__ == "__main__":
+    main()
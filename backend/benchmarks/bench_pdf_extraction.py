@@ -0,0 +1,112 @@
+"""
+PDF extraction benchmark
+
+Writes a synthetic text PDF and extracts it with DocumentProcessor using an
+increasing number of worker processes, reporting wall time, speedup and the
+per-page timing distribution. The first run with each worker count warms the
+pool, so process startup is reported separately.
+
+Run from the backend directory:
+    python benchmarks/bench_pdf_extraction.py [--pages 500] [--lines 45] [--workers 1 2 4]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.append('.')
+
+from app.services.document_processor import DocumentProcessor, shutdown_pdf_pool  # noqa: E402
+
+
+def write_text_pdf(path: Path, pages: List[List[str]]):
+    """Write a minimal PDF with one Helvetica text line per entry of each page."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # Page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*"
+            for line in lines
+        ) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_refs.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(page_refs), len(pages))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def make_pages(count: int, lines_per_page: int) -> List[List[str]]:
+    words = ["revenue", "policy", "contract", "section", "quarter", "annual", "report", "clause"]
+    return [
+        [f"{page + 1}.{line + 1} " + " ".join(random.choice(words) for _ in range(12))
+         for line in range(lines_per_page)]
+        for page in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=45)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "synthetic.pdf"
+        write_text_pdf(pdf_path, make_pages(args.pages, args.lines))
+        print(f"\n📊 Extracting a {args.pages}-page PDF ({pdf_path.stat().st_size / 1024 / 1024:.1f}MB)")
+        print(f"{'workers':>8} {'first run':>10} {'warm run':>10} {'speedup':>8} "
+              f"{'page p50':>9} {'page p95':>9} {'page max':>9}")
+
+        baseline = None
+        expected = None
+        for workers in args.workers:
+            shutdown_pdf_pool()
+            start = time.perf_counter()
+            DocumentProcessor.extract_pdf_pages(pdf_path, workers=workers)
+            first_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            pages = DocumentProcessor.extract_pdf_pages(pdf_path, workers=workers)
+            warm_s = time.perf_counter() - start
+
+            texts = [page['text'] for page in pages]
+            if expected is None:
+                expected = texts
+            elif texts != expected:
+                print(f"❌ Output with {workers} workers differs from {args.workers[0]} worker(s)")
+            baseline = baseline or warm_s
+
+            seconds = np.array([page['seconds'] for page in pages]) * 1000
+            print(f"{workers:>8} {first_s:>9.2f}s {warm_s:>9.2f}s {baseline / warm_s:>7.2f}x "
+                  f"{np.percentile(seconds, 50):>7.1f}ms {np.percentile(seconds, 95):>7.1f}ms "
+                  f"{seconds.max():>7.1f}ms")
+        shutdown_pdf_pool()
+
+
+if __name__ == "__main__":
+    main()
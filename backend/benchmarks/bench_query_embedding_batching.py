@@ -0,0 +1,83 @@
+"""
+Query embedding micro-batching benchmark
+
+Embeds unique queries from 1, 8 and 64 concurrent clients, each issuing
+--queries queries back to back, and reports throughput and per-query
+latency for:
+    unbatched  every query is its own batch-size-1 model call
+    batched    queries go through the EmbeddingBatcher, which coalesces
+               concurrent queries into one model call
+
+Run from the backend directory:
+    python benchmarks/bench_query_embedding_batching.py [--queries 20] [--max-wait-ms 5]
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append('.')
+
+from app.services.embedding import EmbeddingService  # noqa: E402
+from app.services.embedding_batcher import EmbeddingBatcher  # noqa: E402
+
+
+def run_clients(embed, clients: int, queries: int, offset: int):
+    """Run ``clients`` concurrent clients; returns (elapsed, per-query latencies)."""
+    def client(index: int):
+        latencies = []
+        for i in range(queries):
+            start = time.perf_counter()
+            embed(f"query: what happened to metric {offset + index * queries + i} last quarter?")
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = [latency for result in pool.map(client, range(clients)) for latency in result]
+    return time.perf_counter() - start, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20, help="Queries per client")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64], help="Concurrency levels")
+    parser.add_argument("--max-batch", type=int, default=32, help="Batcher max batch size")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="Batcher max wait")
+    args = parser.parse_args()
+
+    service = EmbeddingService()
+    service.generate_embeddings(["warm up"])
+
+    print(f"📊 Query embedding batching ({args.queries} queries per client, "
+          f"max batch {args.max_batch}, max wait {args.max_wait_ms}ms, device {service.device})")
+    print(f"  {'Clients':>7} {'Mode':<10} {'Queries/s':>10} {'p50':>9} {'p99':>9} {'Avg batch':>10}")
+
+    offset = 0
+    for clients in args.clients:
+        for mode in ("unbatched", "batched"):
+            offset += clients * args.queries  # Fresh texts every run
+            if mode == "batched":
+                batcher = EmbeddingBatcher(
+                    lambda texts: service.generate_embeddings(texts, batch_size=len(texts)),
+                    max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms
+                )
+                embed = batcher.embed
+            else:
+                batcher = None
+                embed = lambda text: service.generate_embeddings([text])
+
+            elapsed, latencies = run_clients(embed, clients, args.queries, offset)
+            avg_batch = batcher.get_stats()['avg_batch_size'] if batcher else 1.0
+            if batcher:
+                batcher.shutdown()
+
+            print(f"  {clients:>7} {mode:<10} {len(latencies) / elapsed:>10.1f} "
+                  f"{np.percentile(latencies, 50) * 1000:>7.1f}ms {np.percentile(latencies, 99) * 1000:>7.1f}ms "
+                  f"{avg_batch:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
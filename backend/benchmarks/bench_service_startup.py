@@ -0,0 +1,72 @@
+"""
+Service startup benchmark
+
+Imports the FastAPI app, resolves the RAG service through every entry point
+(both routers, the websocket handler and the ServiceManager) and reports how
+many times the SentenceTransformer model was loaded, along with startup time
+and resident memory.
+
+Run from the backend directory:
+    python benchmarks/bench_service_startup.py
+"""
+import sys
+import time
+
+import psutil
+
+sys.path.append('.')
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1024**2
+
+
+def main():
+    import app.services.embedding as embedding_module
+
+    model_loads = []
+    original_model = embedding_module.SentenceTransformer
+
+    class CountingSentenceTransformer(original_model):
+        def __init__(self, *args, **kwargs):
+            model_loads.append(time.time())
+            super().__init__(*args, **kwargs)
+
+    embedding_module.SentenceTransformer = CountingSentenceTransformer
+
+    baseline_rss = rss_mb()
+
+    start = time.time()
+    from app.main import app  # noqa: F401 - importing wires up every router
+    import_time = time.time() - start
+    import_rss = rss_mb()
+
+    from app.utils.service_manager import get_rag_service, service_manager
+
+    start = time.time()
+    services = [
+        get_rag_service(),                  # /documents and /query dependencies
+        service_manager.get_rag_service(),  # background tasks and websocket
+        service_manager.get_rag_service(),
+    ]
+    first_use_time = time.time() - start
+    loaded_rss = rss_mb()
+
+    print("📊 Service startup benchmark")
+    print(f"  App import time:        {import_time:.2f}s")
+    print(f"  First service use:      {first_use_time:.2f}s")
+    print(f"  RSS baseline:           {baseline_rss:.1f} MB")
+    print(f"  RSS after import:       {import_rss:.1f} MB")
+    print(f"  RSS after service load: {loaded_rss:.1f} MB")
+    print(f"  SentenceTransformer loads: {len(model_loads)}")
+    print(f"  RAG service loads:         {service_manager.load_counts['rag']}")
+    print(f"  Shared instance:           {all(s is services[0] for s in services)}")
+
+    if len(model_loads) != 1:
+        print("❌ Expected exactly one model load per process")
+        sys.exit(1)
+    print("✅ One model load per process")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Vector store ingest benchmark
+
+Ingests documents in batches of 10 chunks (the batch size used by
+process_and_store_document_with_progress) and reports the average cost of an
+add as the store grows, for the append-only segment persistence and for the
+old behaviour of rewriting the full index on every add.
+
+Run from the backend directory:
+    python benchmarks/bench_vector_store_ingest.py [--dim 384] [--max-chunks 20000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append('.')
+
+from app.services.vector_store import VectorStore  # noqa: E402
+
+
+class RandomEmbeddingService:
+    """Random unit vectors: isolates persistence cost from model inference."""
+
+    model_name = "random"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.rng = np.random.default_rng(0)
+
+    def get_embedding_dim(self) -> int:
+        return self.dim
+
+    def generate_embeddings(self, texts, batch_size: int = 32):
+        return self.rng.standard_normal((len(texts), self.dim)).astype(np.float32)
+
+    def embed_chunks(self, texts, batch_size: int = 32):
+        return self.generate_embeddings(texts, batch_size)
+
+    def embed_query(self, query: str):
+        return self.generate_embeddings([f"query: {query}"])
+
+
+def make_batch(start: int, size: int, text_length: int = 800):
+    text = "x" * text_length
+    return [
+        {
+            'text': text,
+            'chunk_id': f"bench_chunk_{start + i}",
+            'document_id': f"bench_doc_{(start + i) // 2000}",
+            'chunk_index': start + i,
+            'chunk_size': text_length,
+            'metadata': {'filename': 'bench.txt', 'char_count': 2000 * text_length},
+        }
+        for i in range(size)
+    ]
+
+
+def run(mode: str, dim: int, max_chunks: int, checkpoints, batch_size: int = 10):
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = VectorStore(RandomEmbeddingService(dim), store_dir=store_dir)
+        timings = {}
+        window = []
+        added = 0
+
+        while added < max_chunks:
+            batch = make_batch(added, batch_size)
+            start = time.perf_counter()
+            store.add_chunks(batch)
+            if mode == "rewrite":
+                # Old behaviour: full index rewrite on every add
+                store.persistence.compact(store.index, background=False)
+            window.append(time.perf_counter() - start)
+            added += batch_size
+
+            if added in checkpoints:
+                timings[added] = sum(window) / len(window)
+                window = []
+
+        store.persistence.close()
+        return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--max-chunks", type=int, default=20000)
+    args = parser.parse_args()
+
+    checkpoints = [n for n in (1000, 2000, 5000, 10000, 20000, 50000) if n <= args.max_chunks]
+
+    results = {mode: run(mode, args.dim, args.max_chunks, set(checkpoints)) for mode in ("append", "rewrite")}
+
+    print("\n📊 Average add_chunks(10) latency vs. store size")
+    print(f"{'store size':>12} {'append-only':>14} {'full rewrite':>14} {'speedup':>9}")
+    for size in checkpoints:
+        append_ms = results["append"][size] * 1000
+        rewrite_ms = results["rewrite"][size] * 1000
+        print(f"{size:>12} {append_ms:>12.2f}ms {rewrite_ms:>12.2f}ms {rewrite_ms / append_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
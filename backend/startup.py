@@ -136,16 +136,15 @@ def test_system():
     logger.info("🧪 Running system tests...")
     
     try:
-        from app.services.rag_service import RAGService
-        from app.services.llm import LLMService
+        from app.utils.service_manager import service_manager
         
-        # Test RAG service
-        rag_service = RAGService()
+        # Test RAG service (reuses the instance loaded during initialization)
+        rag_service = service_manager.get_rag_service()
         rag_stats = rag_service.get_stats()
         logger.info(f"✅ RAG Service test passed: {rag_stats}")
         
         # Test LLM service
-        llm_service = LLMService()
+        llm_service = service_manager.get_llm_service()
         llm_status = llm_service.get_service_status()
         logger.info(f"✅ LLM Service test passed: Primary LLM available = {llm_status.get('primary_llm') is not None}")
         
@@ -1,11 +1,23 @@
 import os
 import pytest
+
+# Process uploads in-process; tests/test_job_queue.py drives the queue itself
+os.environ.setdefault("INGEST_MODE", "inline")
+os.environ.setdefault("INGEST_WORKER_PROCESSES", "0")
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
 from app.database import Base, get_db
+import app.services.document_processor as document_processor
+import app.utils.file_utils as file_utils
+from app.services.chunking import ChunkingService
+from app.services.document_processor import DocumentProcessor
+from app.services.rag_service import RAGService
+from app.services.rebuild import VectorStoreRebuild
+from app.services.vector_store import VectorStore
+from tests.test_vector_store import FakeEmbeddingService
 
 # Use in-memory SQLite for testing
 TEST_DATABASE_URL = "sqlite:///./test.db"
@@ -40,4 +52,28 @@ def client(db_session):
     app.dependency_overrides[get_db] = _get_test_db
     with TestClient(app) as client:
         yield client
-    app.dependency_overrides = {}
\ No newline at end of file
+    app.dependency_overrides = {}
+
+@pytest.fixture
+def extractor_calls(tmp_path, monkeypatch):
+    """Count text extractions, keeping uploads and processed text in tmp_path."""
+    calls = []
+    extract = DocumentProcessor.extract_text_from_txt
+
+    def counting_extract(file_path):
+        calls.append(file_path)
+        return extract(file_path)
+
+    monkeypatch.setattr(DocumentProcessor, "extract_text_from_txt", staticmethod(counting_extract))
+    monkeypatch.setattr(document_processor, "PROCESSED_DIR", tmp_path / "processed")
+    monkeypatch.setattr(file_utils, "DOCUMENT_DIR", tmp_path)
+    return calls
+
+@pytest.fixture
+def rag_service(tmp_path):
+    service = RAGService.__new__(RAGService)
+    service.embedding_service = FakeEmbeddingService()
+    service.chunking_service = ChunkingService(chunk_size=1000, chunk_overlap=200)
+    service.vector_store = VectorStore(service.embedding_service, store_dir=tmp_path / "vector_store")
+    service.rebuild = VectorStoreRebuild(service)
+    return service
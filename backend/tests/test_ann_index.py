@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from app.services.ann_index import (
+    create_index, evaluate_index, index_type_of, sample_queries, train_index,
+)
+from app.services.vector_store import VectorStore
+from tests.test_vector_store import FakeEmbeddingService, make_chunks
+
+
+def _documents(count: int):
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+    return [" ".join(words[(i * 7 + j) % len(words)] + str((i + j) % 13) for j in range(6)) for i in range(count)]
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat", "ivf_pq"])
+def test_index_factory_round_trip(index_type):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    index = create_index(index_type, 64, len(vectors))
+    train_index(index, vectors)
+    index.add(vectors)
+
+    assert index_type_of(index) == index_type
+    report = evaluate_index(index, vectors, sample_queries(vectors, 20), k=5)
+    assert 0.0 < report['recall_at_5'] <= 1.0
+    assert report['latency_ms'] > 0
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+def test_store_migrates_from_flat_once_threshold_is_crossed(tmp_path, index_type):
+    store = VectorStore(FakeEmbeddingService(), store_dir=tmp_path, index_type=index_type, train_threshold=400)
+    texts = _documents(500)
+
+    store.add_chunks(make_chunks("doc-a", texts[:300]))
+    assert index_type_of(store.index) == "flat"
+
+    store.add_chunks(make_chunks("doc-b", texts[300:]))
+    store.wait_for_migration()
+    store.persistence.wait_for_compaction()
+
+    assert index_type_of(store.index) == index_type
+    assert store.index.ntotal == 500
+    assert store.get_stats()['index']['report']['recall_at_10'] > 0
+
+    results = store.search(texts[420], top_k=3, score_threshold=0.0, document_ids=["doc-b"])
+    assert results and {r['document_id'] for r in results} == {"doc-b"}
+
+    # Adds after the switch go into the trained index and survive a reload
+    store.add_chunks(make_chunks("doc-c", ["omega omega omega"]))
+    reloaded = VectorStore(FakeEmbeddingService(), store_dir=tmp_path, index_type=index_type, train_threshold=400)
+    assert index_type_of(reloaded.index) == index_type
+    assert reloaded.index.ntotal == 501
+    assert reloaded.search("omega omega omega", top_k=1, score_threshold=0.0)[0]['document_id'] == "doc-c"
+
+
+def test_flat_store_never_migrates(tmp_path):
+    store = VectorStore(FakeEmbeddingService(), store_dir=tmp_path, index_type="flat", train_threshold=10)
+    store.add_chunks(make_chunks("doc-a", _documents(50)))
+    store.wait_for_migration()
+    assert index_type_of(store.index) == "flat"
@@ -0,0 +1,93 @@
+import time
+
+from app.config import API_PREFIX
+from app.main import app
+from app.services.answer_cache import AnswerCache, context_fingerprint
+from app.utils.service_manager import get_llm_service, get_rag_service
+from tests.test_vector_store import FakeEmbeddingService
+
+CHUNKS = [
+    {'chunk_id': "report_chunk_0", 'document_id': "report", 'text': "Quarterly revenue grew 12%.", 'similarity_score': 0.8},
+    {'chunk_id': "report_chunk_1", 'document_id': "report", 'text': "Costs were flat.", 'similarity_score': 0.6},
+]
+
+
+def make_cache(**options):
+    return AnswerCache(FakeEmbeddingService(), **{'similarity_threshold': 0.8, **options})
+
+
+def test_similar_question_with_the_same_context_hits():
+    cache = make_cache()
+    fingerprint = context_fingerprint(CHUNKS, max_tokens=512)
+    cache.put("how much did quarterly revenue grow last year", fingerprint, {'answer': "12%"}, generation_time=2.0)
+
+    hit = cache.get("how much did quarterly revenue grow this year", fingerprint)
+
+    assert hit['response'] == {'answer': "12%"}
+    assert 0.8 <= hit['similarity'] < 1.0
+    assert cache.get("what colour is the office carpet", fingerprint) is None
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert stats['time_saved_seconds'] == 2.0
+
+
+def test_changed_context_or_settings_invalidate_the_answer():
+    cache = make_cache()
+    fingerprint = context_fingerprint(CHUNKS, max_tokens=512)
+    cache.put("how much did quarterly revenue grow", fingerprint, {'answer': "12%"}, generation_time=1.0)
+
+    edited = [dict(CHUNKS[0], text="Quarterly revenue grew 15%."), CHUNKS[1]]
+    assert context_fingerprint(CHUNKS[:1], max_tokens=512) != fingerprint
+    assert context_fingerprint(CHUNKS, max_tokens=256) != fingerprint
+    assert cache.get("how much did quarterly revenue grow", context_fingerprint(edited, max_tokens=512)) is None
+    assert cache.get_stats()['stale_misses'] == 1
+
+
+def test_entries_are_evicted_by_size_and_age():
+    cache = make_cache(max_entries=2, ttl_seconds=0.05)
+    for question in ["revenue growth", "office location", "holiday policy"]:
+        cache.put(question, "f", {'answer': question}, generation_time=1.0)
+
+    assert cache.get("revenue growth", "f") is None
+    assert cache.get("holiday policy", "f")['response'] == {'answer': "holiday policy"}
+    time.sleep(0.06)
+    assert cache.get("holiday policy", "f") is None
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1 and stats['expirations'] == 1 and stats['entries'] == 1
+
+
+class FakeRAGService:
+    def __init__(self):
+        self.answer_cache = make_cache()
+
+    def search_documents(self, query, top_k=5, score_threshold=0.3, document_ids=None):
+        return {'success': True, 'results': [dict(chunk) for chunk in CHUNKS]}
+
+
+class FakeLLMService:
+    def __init__(self):
+        self.questions = []
+
+    async def agenerate_answer(self, context_chunks, question, max_tokens=512, temperature=0.3):
+        self.questions.append(question)
+        return {'success': True, 'answer': "Revenue grew 12%.", 'llm_used': "fake"}
+
+
+def test_ask_serves_similar_questions_from_the_cache(client):
+    rag_service, llm_service = FakeRAGService(), FakeLLMService()
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+    app.dependency_overrides[get_llm_service] = lambda: llm_service
+
+    ask = lambda question, **options: client.post(
+        f"{API_PREFIX}/query/ask", json={"question": question, **options}
+    ).json()
+    first = ask("how much did quarterly revenue grow last year")
+    second = ask("how much did quarterly revenue grow this year")
+    uncached = ask("how much did quarterly revenue grow this year", use_cache=False)
+
+    assert [first['cached'], second['cached'], uncached['cached']] == [False, True, None]
+    assert second['answer'] == first['answer'] and second['llm_used'] == "fake"
+    assert len(second['sources']) == 1
+    assert llm_service.questions == [
+        "how much did quarterly revenue grow last year", "how much did quarterly revenue grow this year"
+    ]
@@ -159,3 +159,66 @@ def test_process_large_document():
         assert char_count > 10000
     finally:
         tmp_path.unlink()
+
+# Parallel PDF extraction tests
+def test_parallel_pdf_extraction_keeps_page_order(tmp_path, monkeypatch):
+    """Test that page ranges extracted by worker processes are joined in order."""
+    from app.services import document_processor
+    from benchmarks.bench_pdf_extraction import write_text_pdf
+
+    pdf_path = tmp_path / "report.pdf"
+    write_text_pdf(pdf_path, [[f"Page {i} revenue line"] for i in range(1, 8)] + [[]])
+    monkeypatch.setattr(document_processor, "PDF_PARALLEL_MIN_PAGES", 2)
+    monkeypatch.setattr(document_processor, "_MIN_PAGES_PER_TASK", 2)
+
+    try:
+        sequential = DocumentProcessor.extract_pdf_pages(pdf_path, workers=1)
+        parallel = DocumentProcessor.extract_pdf_pages(pdf_path, workers=2)
+    finally:
+        document_processor.shutdown_pdf_pool()
+
+    assert [page['page'] for page in parallel] == list(range(1, 9))
+    assert [page['text'] for page in parallel] == [page['text'] for page in sequential]
+    assert parallel[6]['text'] == "Page 7 revenue line"
+    assert all(page['seconds'] >= 0 for page in parallel)
+
+    monkeypatch.setattr(document_processor, "PDF_EXTRACT_WORKERS", 1)
+    text = DocumentProcessor.extract_text_from_pdf(pdf_path)
+    assert text.index("Page 2 revenue") < text.index("Page 7 revenue")
+    assert "--- Page 8 ---" not in text
+
+# OCR pipeline tests
+def test_ocr_only_runs_on_empty_pages_and_is_cached(tmp_path, monkeypatch):
+    """Test that OCR rasterizes only text-less pages, in batches, and caches results."""
+    from types import SimpleNamespace
+    from app.services import document_processor, ocr_cache
+    from benchmarks.bench_pdf_extraction import write_text_pdf
+
+    pdf_path = tmp_path / "scan.pdf"
+    write_text_pdf(pdf_path, [["Typed cover page"], [], [], [], ["Typed appendix"], []])
+    rasterized = []
+
+    def fake_convert_from_path(path, dpi, first_page, last_page, **kwargs):
+        rasterized.append((first_page, last_page))
+        return [f"image {page}" for page in range(first_page, last_page + 1)]
+
+    def fake_image_to_string(image, lang):
+        return "" if image == "image 6" else f"scanned text of {image}"
+
+    monkeypatch.setattr(document_processor, "OCR_AVAILABLE", True)
+    monkeypatch.setattr(document_processor, "OCR_BATCH_PAGES", 2)
+    monkeypatch.setattr(document_processor, "convert_from_path", fake_convert_from_path, raising=False)
+    monkeypatch.setattr(document_processor, "pytesseract",
+                        SimpleNamespace(image_to_string=fake_image_to_string), raising=False)
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_DIR", tmp_path / "ocr_cache")
+
+    text = DocumentProcessor.extract_text_from_pdf(pdf_path)
+
+    assert rasterized == [(2, 3), (4, 4), (6, 6)]
+    assert "Typed cover page" in text and "Typed appendix" in text
+    assert text.index("scanned text of image 3") < text.index("Typed appendix")
+    assert "--- Page 6" not in text
+
+    # Re-indexing the same file reuses the cached OCR, blank pages included
+    assert DocumentProcessor.extract_text_from_pdf(pdf_path) == text
+    assert len(rasterized) == 3
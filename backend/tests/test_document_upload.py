@@ -0,0 +1,29 @@
+from app.config import API_PREFIX
+from app.main import app
+from app.utils.service_manager import get_rag_service
+
+
+def test_upload_extracts_text_once(client, rag_service, extractor_calls):
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+
+    response = client.post(
+        f"{API_PREFIX}/documents/upload",
+        files={"file": ("report.txt", b"Quarterly revenue grew by twelve percent.", "text/plain")},
+    )
+
+    assert response.status_code == 200
+    assert len(extractor_calls) == 1
+
+    document = response.json()
+    content = client.get(f"{API_PREFIX}/documents/{document['id']}/content").json()
+    assert content["content"] == "Quarterly revenue grew by twelve percent."
+    assert len(extractor_calls) == 1
+
+    # Rebuilding the index reuses the saved text too
+    response = client.post(f"{API_PREFIX}/documents/reset-vector-store")
+    assert response.json()["rebuild"]["state"] == "running"
+    assert rag_service.rebuild.wait(10)["state"] == "completed"
+    status = client.get(f"{API_PREFIX}/documents/reset-vector-store/status").json()
+    assert status["documents_done"] == 1 and status["documents_failed"] == 0
+    assert len(extractor_calls) == 1
+    assert rag_service.vector_store.index.ntotal == 1
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from app.services.embedding_batcher import EmbeddingBatcher
+
+
+class RecordingEncoder:
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self.delay = delay
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_requests_share_one_model_call():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=32, max_wait_ms=50)
+
+    futures = [batcher.submit(f"query {'x' * i}") for i in range(8)]
+    results = [future.result(timeout=5) for future in futures]
+
+    assert encoder.batches == [[f"query {'x' * i}" for i in range(8)]]
+    assert [result[0, 0] for result in results] == [len(f"query {'x' * i}") for i in range(8)]
+    assert all(result.shape == (1, 2) for result in results)
+    batcher.shutdown()
+
+
+def test_batches_are_bounded_and_duplicates_encoded_once():
+    encoder = RecordingEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=4, max_wait_ms=50)
+
+    futures = [batcher.submit(text) for text in ["a", "b", "a", "c", "d", "e"]]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert encoder.batches[0] == ["a", "b", "c"]  # First 4 requests, "a" twice
+    assert encoder.batches[1] == ["d", "e"]
+    stats = batcher.get_stats()
+    assert (stats['batches'], stats['requests'], stats['largest_batch']) == (2, 6, 4)
+    batcher.shutdown()
+
+
+def test_encode_errors_reach_every_caller():
+    def failing_encode(texts):
+        raise RuntimeError("model unavailable")
+
+    batcher = EmbeddingBatcher(failing_encode, max_batch_size=8, max_wait_ms=20)
+    futures = [batcher.submit(text) for text in ["a", "b"]]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model unavailable"):
+            future.result(timeout=5)
+    batcher.shutdown()
+
+
+def test_async_callers_are_batched_while_the_model_is_busy():
+    encoder = RecordingEncoder(delay=0.05)
+    batcher = EmbeddingBatcher(encoder, max_batch_size=64, max_wait_ms=2)
+
+    async def scenario():
+        return await asyncio.gather(*[batcher.embed_async(f"question {i}") for i in range(32)])
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 32
+    assert sum(len(batch) for batch in encoder.batches) == 32
+    assert len(encoder.batches) < 32
+    batcher.shutdown()
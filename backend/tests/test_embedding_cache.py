@@ -0,0 +1,147 @@
+import numpy as np
+
+from app.services import embedding_cache as embedding_cache_module
+from app.services.embedding import EmbeddingService
+from app.services.embedding_cache import ChunkEmbeddingCache, QueryEmbeddingCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=60)
+    cache.put("model", "first", np.ones((1, 4)))
+    cache.put("model", "second", np.ones((1, 4)))
+    assert cache.get("model", "first") is not None  # first is now most recent
+    cache.put("model", "third", np.ones((1, 4)))
+
+    assert cache.get("model", "second") is None
+    assert cache.get("model", "first") is not None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache_module.time, "monotonic", lambda: now[0])
+    cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=30)
+    cache.put("model", "question", np.ones((1, 4)))
+
+    now[0] += 29
+    assert cache.get("model", "question") is not None
+    now[0] += 2
+    assert cache.get("model", "question") is None
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_keys_are_normalized_and_scoped_by_model():
+    cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+    cache.put("model-a", "  What is   the revenue?\n", np.ones((1, 4)))
+
+    assert cache.get("model-a", "What is the revenue?") is not None
+    assert cache.get("model-b", "What is the revenue?") is None
+
+
+def _fake_embedding_service(tmp_path, calls):
+    """EmbeddingService with the model replaced by a call-recording stub."""
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.model_name = "fake-model"
+    service.query_cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+    service.chunk_cache = ChunkEmbeddingCache(tmp_path, service.model_name)
+
+    def generate_embeddings(texts, batch_size=32):
+        calls.append(list(texts))
+        return np.array([[len(text), 1.0, 0.0, 0.5] for text in texts], dtype=np.float32)
+
+    service.generate_embeddings = generate_embeddings
+    return service
+
+
+def test_embed_query_skips_the_model_on_repeat_questions(tmp_path):
+    calls = []
+    service = _fake_embedding_service(tmp_path, calls)
+
+    first = service.embed_query("What is the revenue?")
+    second = service.embed_query("what is the revenue?")
+    third = service.embed_query("What is  the revenue? ")
+
+    assert calls == [["query: What is the revenue?"], ["query: what is the revenue?"]]
+    assert third is first
+    assert not first.flags.writeable
+    assert second.shape == (1, 4)
+    stats = service.query_cache.get_stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+
+
+def test_embed_queries_runs_the_model_once_for_uncached_queries(tmp_path):
+    calls = []
+    service = _fake_embedding_service(tmp_path, calls)
+    cached = service.embed_query("What is the revenue?")
+
+    embeddings = service.embed_queries(["What is the profit?", "What is the revenue?", "What is  the profit? "])
+
+    assert calls[1:] == [["query: What is the profit?"]]
+    assert embeddings.shape == (3, 4)
+    assert np.array_equal(embeddings[1], cached[0])
+    assert np.array_equal(embeddings[0], embeddings[2])
+
+
+def test_embed_chunks_only_embeds_new_text(tmp_path):
+    calls = []
+    service = _fake_embedding_service(tmp_path, calls)
+
+    first = service.embed_chunks(["alpha", "beta", "alpha"])
+    second = service.embed_chunks(["beta", "gamma"])
+
+    assert calls == [["alpha", "beta"], ["gamma"]]
+    assert np.array_equal(first[0], first[2])
+    assert np.array_equal(first[1], second[0])
+    assert second[1][0] == len("gamma")
+
+    # The cache persists across processes (new instance over the same dir)
+    calls.clear()
+    restarted = _fake_embedding_service(tmp_path, calls)
+    assert np.array_equal(restarted.embed_chunks(["gamma", "alpha"]), np.vstack([second[1], first[0]]))
+    assert calls == []
+
+
+def test_chunk_cache_is_scoped_by_model_and_survives_torn_writes(tmp_path):
+    cache = ChunkEmbeddingCache(tmp_path, "model-a")
+    cache.put_many(["one", "two"], np.ones((2, 4), dtype=np.float32))
+
+    # Vector written but its key never made it
+    with open(cache.vectors_path, 'ab') as f:
+        f.write(np.zeros(4, dtype=np.float32).tobytes())
+
+    reopened = ChunkEmbeddingCache(tmp_path, "model-a")
+    assert len(reopened) == 2
+    assert reopened.lookup(["one", "three"]) == [0, None]
+    reopened.put_many(["three"], np.full((1, 4), 3.0, dtype=np.float32))
+    assert reopened.vectors([2])[0][0] == 3.0
+
+    assert ChunkEmbeddingCache(tmp_path, "model-b").lookup(["one"]) == [None]
+
+
+def test_chunk_cache_sees_rows_written_by_other_processes(tmp_path):
+    # Two instances on one directory behave like the API and a worker process
+    api = ChunkEmbeddingCache(tmp_path, "model-a")
+    worker = ChunkEmbeddingCache(tmp_path, "model-a")
+
+    worker.put_many(["one", "two"], np.array([[1.0] * 4, [2.0] * 4], dtype=np.float32))
+    assert api.lookup(["two", "three"]) == [1, None]
+
+    api.put_many(["two", "three"], np.array([[9.0] * 4, [3.0] * 4], dtype=np.float32))
+    assert api.vectors([1, 2])[:, 0].tolist() == [2.0, 3.0]
+    assert worker.lookup(["three"]) == [2]
+    assert len(ChunkEmbeddingCache(tmp_path, "model-a")) == 3
+
+
+def test_rows_line_up_after_a_writer_died_mid_write(tmp_path):
+    api = ChunkEmbeddingCache(tmp_path, "model-a")
+    api.put_many(["x"], np.ones((1, 4), dtype=np.float32))
+
+    # A worker process wrote its vector, then was killed before writing the key
+    with open(api.vectors_path, 'ab') as f:
+        f.write(np.full(4, 9.0, dtype=np.float32).tobytes())
+
+    assert api.put_many(["y"], np.full((1, 4), 2.0, dtype=np.float32)) == [1]
+    assert api.vectors([1])[0].tolist() == [2.0] * 4
+    reloaded = ChunkEmbeddingCache(tmp_path, "model-a")
+    assert reloaded.lookup(["y"]) == [1]
+    assert reloaded.vectors([0, 1])[:, 0].tolist() == [1.0, 2.0]
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import httpx
+
+from app.config import API_PREFIX
+from app.main import app
+from app.utils.executors import EMBEDDING_POOL, EventLoopLagMonitor, executor_stats
+from app.utils.service_manager import get_rag_service
+
+
+class BlockingRAGService:
+    """Search that holds its thread like a model encode would."""
+
+    def search_documents(self, query, top_k=5, score_threshold=0.3, document_ids=None, **options):
+        time.sleep(0.3)
+        return {'success': True, 'results': [{'text': query, 'document_id': "doc", 'similarity_score': 0.9}]}
+
+
+def test_lag_monitor_measures_blocked_loop():
+    monitor = EventLoopLagMonitor(interval=0.01)
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Blocks the loop
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+    stats = monitor.get_stats()
+    assert stats['samples'] > 0
+    assert stats['max_lag_ms'] >= 150
+
+
+def test_search_requests_do_not_block_event_loop(client):
+    app.dependency_overrides[get_rag_service] = BlockingRAGService
+    monitor = EventLoopLagMonitor(interval=0.01)
+    completed_before = executor_stats().get(EMBEDDING_POOL, {}).get('completed', 0)
+
+    async def scenario():
+        task = asyncio.create_task(monitor.run())
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*[
+                http.post(f"{API_PREFIX}/query/search", json={"query": f"question {i}"}) for i in range(3)
+            ])
+        task.cancel()
+        return responses
+
+    responses = asyncio.run(scenario())
+
+    assert all(response.json()['success'] for response in responses)
+    # Three 300ms searches ran on the embedding pool, not on the loop
+    assert monitor.get_stats()['max_lag_ms'] < 150
+    assert executor_stats()[EMBEDDING_POOL]['completed'] - completed_before == 3
+
+
+def test_event_loop_stats_endpoint(client):
+    response = client.get(f"{API_PREFIX}/system/event-loop")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body['event_loop_lag']['recent']) == {'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}
+    assert isinstance(body['executors'], dict)
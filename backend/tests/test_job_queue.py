@@ -0,0 +1,134 @@
+import asyncio
+
+from app.config import API_PREFIX
+from app.main import app
+from app.models.document import DocumentDB
+from app.routers import document as document_router
+from app.services.ingestion import INGEST_JOB, IngestWorker
+from app.services.job_queue import JOB_COMPLETED, JOB_FAILED, JOB_QUEUED, JOB_READY, JobQueue
+from app.utils.job_monitor import IngestJobMonitor
+from app.utils.service_manager import get_job_queue, get_rag_service
+from tests.test_vector_store import FakeEmbeddingService
+
+
+def test_claim_hands_each_job_to_one_worker(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    first = queue.enqueue(INGEST_JOB, {'n': 1}, ref="doc-1")
+    second = queue.enqueue(INGEST_JOB, {'n': 2}, ref="doc-2")
+
+    claimed = [queue.claim("worker-a"), queue.claim("worker-b")]
+
+    assert [job['id'] for job in claimed] == [first, second]
+    assert claimed[0]['payload'] == {'n': 1}
+    assert queue.claim("worker-a") is None
+
+    queue.update_progress(first, "worker-a", "embedding", 70, "Embedded 7/10 chunks")
+    queue.update_progress(first, "worker-b", "embedding", 10)  # Not its job: ignored
+    assert queue.latest_for_ref("doc-1")['progress'] == 70
+    assert queue.get_stats()['running'] == 2
+
+
+def test_stale_jobs_are_retried_then_failed(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.enqueue(INGEST_JOB, {})
+
+    queue.claim("crashed-worker")
+    assert queue.requeue_stale(stale_seconds=-1, max_attempts=2) == 1
+    assert queue.get(job_id)['status'] == JOB_QUEUED
+
+    queue.claim("worker-b")
+    # The first worker's late result must not overwrite the retry
+    assert not queue.mark_ready(job_id, "crashed-worker", {'success': True})
+
+    queue.requeue_stale(stale_seconds=-1, max_attempts=2)
+    job = queue.get(job_id)
+    assert job['status'] == JOB_READY
+    assert job['attempts'] == 2
+    assert job['result']['success'] is False
+
+
+def test_queued_upload_is_processed_by_worker_and_indexed(client, db_session, rag_service,
+                                                          extractor_calls, tmp_path, monkeypatch):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(document_router, "INGEST_MODE", "queue")
+    app.dependency_overrides[get_job_queue] = lambda: queue
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+
+    response = client.post(
+        f"{API_PREFIX}/documents/upload",
+        files={"file": ("report.txt", b"Quarterly revenue grew by twelve percent.", "text/plain")},
+    )
+    assert response.status_code == 200
+    document = response.json()
+    assert document["status"] == "queued"
+    assert extractor_calls == []
+
+    job = client.get(f"{API_PREFIX}/documents/{document['id']}/job").json()
+    assert job["status"] == JOB_QUEUED
+
+    worker = IngestWorker(queue, embedding_service=FakeEmbeddingService(), artifact_dir=tmp_path / "artifacts")
+    assert worker.run_once()
+    assert not worker.run_once()
+    assert queue.get(job["job_id"])['status'] == JOB_READY
+    assert rag_service.vector_store.index.ntotal == 0  # Only the API process indexes
+
+    monitor = IngestJobMonitor(queue, lambda: rag_service, session_factory=lambda: db_session)
+    asyncio.run(monitor.poll())
+
+    job = client.get(f"{API_PREFIX}/documents/jobs/{job['job_id']}").json()
+    assert job["status"] == JOB_COMPLETED
+    assert job["result"]["chunks_added"] == 1
+    assert rag_service.vector_store.index.ntotal == 1
+    assert list((tmp_path / "artifacts").iterdir()) == []
+
+    row = db_session.query(DocumentDB).filter(DocumentDB.id == document["id"]).first()
+    assert row.status == "processed"
+    assert row.char_count == len("Quarterly revenue grew by twelve percent.")
+    assert len(extractor_calls) == 1
+
+
+def _ready_upload(client, queue, tmp_path, monkeypatch, rag_service):
+    monkeypatch.setattr(document_router, "INGEST_MODE", "queue")
+    app.dependency_overrides[get_job_queue] = lambda: queue
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+    document = client.post(
+        f"{API_PREFIX}/documents/upload",
+        files={"file": ("report.txt", b"Quarterly revenue grew by twelve percent.", "text/plain")},
+    ).json()
+    worker = IngestWorker(queue, embedding_service=FakeEmbeddingService(), artifact_dir=tmp_path / "artifacts")
+    assert worker.run_once()
+    return document, queue.latest_for_ref(document["id"])
+
+
+def test_deleting_a_document_cancels_its_pending_job(client, db_session, rag_service,
+                                                      extractor_calls, tmp_path, monkeypatch):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    document, job = _ready_upload(client, queue, tmp_path, monkeypatch, rag_service)
+    assert job['status'] == JOB_READY
+
+    assert client.delete(f"{API_PREFIX}/documents/{document['id']}").status_code == 200
+    assert queue.get(job['id'])['status'] == JOB_FAILED
+    assert list((tmp_path / "artifacts").iterdir()) == []
+
+    monitor = IngestJobMonitor(queue, lambda: rag_service, session_factory=lambda: db_session)
+    asyncio.run(monitor.poll())
+    assert rag_service.vector_store.index.ntotal == 0
+
+
+def test_job_of_a_deleted_document_is_not_indexed(client, db_session, rag_service,
+                                                   extractor_calls, tmp_path, monkeypatch):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    document, job = _ready_upload(client, queue, tmp_path, monkeypatch, rag_service)
+    monitor = IngestJobMonitor(queue, lambda: rag_service, session_factory=lambda: db_session)
+
+    # The row disappears without the job being cancelled
+    db_session.query(DocumentDB).filter(DocumentDB.id == document["id"]).delete()
+    result = monitor.commit_job(job)
+    assert result['success'] is False
+    assert rag_service.vector_store.index.ntotal == 0
+
+    # Cancelled by a delete while the monitor was indexing it
+    document, job = _ready_upload(client, queue, tmp_path, monkeypatch, rag_service)
+    queue.cancel_for_ref(document["id"], "Document was deleted")
+    assert monitor.commit_job(job)['success'] is False
+    assert rag_service.vector_store.get_stats()['total_chunks'] == 0
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+
+from app.services.llm import GroqLLM, LocalLLM
+from app.utils.http_clients import AsyncClientPool
+from tests.test_llm_streaming import ScriptedLLM, _service
+
+CHUNKS = [{'text': "Revenue grew 12% in 2023.", 'source': "report.pdf", 'similarity_score': 0.9}]
+
+
+class FailingLLM(ScriptedLLM):
+    def generate_response(self, prompt, max_tokens=512, temperature=0.7):
+        raise RuntimeError("backend down")
+
+
+def make_groq(handler, max_concurrency):
+    groq = GroqLLM.__new__(GroqLLM)
+    groq.model = "llama3-8b-8192"
+    groq.endpoint = "https://example.invalid/chat/completions"
+    groq._available = True
+    groq._async = AsyncClientPool(
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)), max_concurrency=max_concurrency
+    )
+    return groq
+
+
+def test_async_groq_requests_run_concurrently_up_to_the_limit():
+    active = {'now': 0, 'max': 0}
+
+    async def handler(request):
+        active['now'] += 1
+        active['max'] = max(active['max'], active['now'])
+        await asyncio.sleep(0.05)
+        active['now'] -= 1
+        question = json.loads(request.content)['messages'][-1]['content']
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"Answer to {question}"}}]})
+
+    groq = make_groq(handler, max_concurrency=5)
+
+    async def run():
+        start = time.perf_counter()
+        answers = await asyncio.gather(*[groq.agenerate_response(f"q{i}") for i in range(20)])
+        return answers, time.perf_counter() - start
+
+    answers, elapsed = asyncio.run(run())
+
+    assert answers == [f"Answer to q{i}" for i in range(20)]
+    assert active['max'] == 5
+    # 20 requests of 50ms, 5 at a time
+    assert 0.2 <= elapsed < 0.6
+    assert groq._async.get_stats()['requests'] == 20
+
+
+def test_async_groq_timeout_returns_the_timeout_message():
+    async def handler(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    groq = make_groq(handler, max_concurrency=1)
+
+    assert asyncio.run(groq.agenerate_response("q")) == "The request timed out. Please try again."
+
+
+def test_agenerate_answer_falls_back_when_the_primary_fails():
+    service = _service(FailingLLM([]), ScriptedLLM(["From", " fallback"]))
+
+    result = asyncio.run(service.agenerate_answer(CHUNKS, "How much did revenue grow?"))
+
+    assert result['success'] is True
+    assert result['answer'] == "From fallback"
+    assert result['sources'][0]['source'] == "report.pdf"
+
+
+def test_backends_are_created_without_loading_or_calling_anything(monkeypatch):
+    loads = []
+
+    def load(self):
+        loads.append(threading.current_thread().name)
+        time.sleep(0.05)
+        self._available = True
+
+    monkeypatch.setattr(LocalLLM, "_initialize_model", load)
+    local = LocalLLM(lazy=True)
+    groq = GroqLLM(api_key="test", base_url="http://127.0.0.1:9")  # Nothing listens there
+
+    assert local.is_available() and groq.is_available()
+    assert loads == []
+
+    threads = [threading.Thread(target=local.ensure_loaded) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1 and local.is_available()
+
+
+def test_warm_up_checks_routed_api_backends_and_records_failures():
+    groq = GroqLLM(api_key="test", base_url="http://127.0.0.1:9")
+    service = _service(groq)
+    service.local_llm = None
+
+    result = service.warm_up()
+
+    assert result['ready'] is True
+    assert result['backends']['groq']['available'] is False
+    assert service.breakers['groq'].get_stats()['failure_rate'] == 1.0
+
+
+def test_cleanup_waits_for_a_warm_up_in_progress(monkeypatch):
+    loading = threading.Event()
+
+    def load(self):
+        loading.set()
+        time.sleep(0.1)
+        self.model = object()
+        self._available = True
+
+    monkeypatch.setattr(LocalLLM, "_initialize_model", load)
+    local = LocalLLM(lazy=True)
+    service = _service(None)
+    service.local_llm, service.openai_llm, service.groq_llm = local, None, None
+    service.prefer_local = True
+
+    results = []
+    warm_up = threading.Thread(target=lambda: results.append(service.warm_up()))
+    warm_up.start()
+    loading.wait()
+    service.cleanup()
+    warm_up.join()
+
+    # The model loaded during warm-up was freed rather than orphaned
+    assert local.model is None and not local.ensure_loaded()
+    assert results[0]['backends']['local']['model'] == local.model_name
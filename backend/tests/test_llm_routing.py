@@ -0,0 +1,197 @@
+import asyncio
+import time
+
+from app.services.llm import BaseLLM, LLMService
+from app.services.llm_routing import CircuitBreaker, LatencyHistogram
+from tests.test_llm_streaming import _service
+
+CHUNKS = [{'text': "Revenue grew 12% in 2023.", 'source': "report.pdf", 'similarity_score': 0.9}]
+
+
+class AsyncBackend(BaseLLM):
+    """Answers after ``delay`` seconds; records whether its request was cancelled."""
+
+    def __init__(self, name, delay, answer=None):
+        self.name = name
+        self.delay = delay
+        self.answer = answer if answer is not None else f"Answer from {name}"
+        self.calls = 0
+        self.cancelled = 0
+
+    def generate_response(self, prompt, max_tokens=512, temperature=0.7):
+        raise NotImplementedError
+
+    async def agenerate_response(self, prompt, max_tokens=512, temperature=0.7):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.answer
+
+    def is_available(self):
+        return True
+
+
+def dispatch_service(primary, fallback, mode):
+    service = _service(primary, fallback)
+    service._init_dispatch(mode)
+    service._get_llm_type = lambda llm: llm.name
+    return service
+
+
+def answer(service):
+    async def run():
+        start = time.perf_counter()
+        result = await service.agenerate_answer(CHUNKS, "How much did revenue grow?")
+        await asyncio.sleep(0)  # Let cancellations land
+        return result, time.perf_counter() - start
+    return asyncio.run(run())
+
+
+def test_histogram_percentiles_follow_the_recent_window():
+    histogram = LatencyHistogram(window=100)
+    for _ in range(200):
+        histogram.record(5.0)
+    for i in range(100):
+        histogram.record(0.1 if i < 90 else 1.0)
+
+    assert 0.1 <= histogram.percentile(0.5) < 0.12
+    assert 1.0 <= histogram.percentile(0.95) < 1.2
+    stats = histogram.get_stats()
+    assert stats['samples'] == 100 and stats['total'] == 300
+    assert sum(stats['buckets'].values()) == 100
+
+
+def test_slow_primary_is_hedged_after_its_p95_and_the_loser_cancelled():
+    primary, fallback = AsyncBackend("primary", delay=2.0), AsyncBackend("fallback", delay=0.05)
+    service = dispatch_service(primary, fallback, "hedged")
+    for _ in range(50):
+        service.latency["primary"].record(0.1)
+
+    result, elapsed = answer(service)
+
+    assert result['answer'] == "Answer from fallback" and result['llm_used'] == "fallback"
+    assert 0.1 <= elapsed < 1.0
+    assert primary.cancelled == 1
+    assert service.hedge_stats == {'requests': 1, 'hedged': 1, 'won_by_fallback': 1, 'cancelled': 1}
+    assert service.latency["fallback"].get_stats()['samples'] == 1
+
+
+def test_fast_primary_is_not_hedged():
+    primary, fallback = AsyncBackend("primary", delay=0.01), AsyncBackend("fallback", delay=0.01)
+    service = dispatch_service(primary, fallback, "hedged")
+
+    result, _ = answer(service)
+
+    assert result['llm_used'] == "primary"
+    assert fallback.calls == 0
+    assert service.hedge_stats['hedged'] == 0
+
+
+def test_hedged_mode_falls_back_at_once_when_the_primary_fails():
+    primary = AsyncBackend("primary", delay=0.0, answer="I encountered an error while generating a response.")
+    fallback = AsyncBackend("fallback", delay=0.01)
+    service = dispatch_service(primary, fallback, "hedged")
+
+    result, elapsed = answer(service)
+
+    assert result['llm_used'] == "fallback"
+    assert elapsed < LLMService.hedge_delay(service, primary)
+    assert service.hedge_stats['hedged'] == 0
+
+
+def test_race_mode_asks_both_backends_at_once():
+    primary, fallback = AsyncBackend("primary", delay=0.3), AsyncBackend("fallback", delay=0.05)
+    service = dispatch_service(primary, fallback, "race")
+
+    result, elapsed = answer(service)
+
+    assert result['llm_used'] == "fallback"
+    assert elapsed < 0.25
+    assert primary.calls == fallback.calls == 1 and primary.cancelled == 1
+
+
+def test_breaker_opens_on_errors_and_closes_after_a_successful_probe():
+    breaker = CircuitBreaker(window=10, min_calls=4, error_rate=0.5, cooldown_seconds=0.05, half_open_probes=1)
+    for succeeded in [True, False, True, False]:
+        assert breaker.allow_request()
+        breaker.record_success(0.1) if succeeded else breaker.record_failure(0.1)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request() and breaker.health_score() == 0.0
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() and not breaker.allow_request()  # One probe at a time
+    breaker.record_failure(0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow_request()
+    breaker.record_success(0.1)
+    stats = breaker.get_stats()
+    assert stats['state'] == CircuitBreaker.CLOSED and stats['calls'] == 1
+    assert stats['times_opened'] == 2 and stats['rejected'] == 2
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker(window=10, min_calls=3, slow_call_seconds=1.0, slow_rate=0.6)
+    breaker.record_success(0.2)
+    breaker.record_success(2.0)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.health_score() == 0.5
+    breaker.record_success(3.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_skips_the_primary_until_a_probe_succeeds():
+    primary = AsyncBackend("primary", delay=0.0, answer="I encountered an error while generating a response.")
+    fallback = AsyncBackend("fallback", delay=0.0)
+    service = dispatch_service(primary, fallback, "fallback")
+    service.routing = "static"
+    service.breakers["primary"] = CircuitBreaker(min_calls=3, cooldown_seconds=0.1)
+
+    for _ in range(5):
+        result, _ = answer(service)
+        assert result['llm_used'] == "fallback"
+
+    assert primary.calls == 3  # Not called once its breaker opened
+    assert service.breakers["primary"].get_stats()['rejected'] == 2
+
+    primary.answer = "Answer from primary"
+    time.sleep(0.11)
+    service.routing = "health"
+    assert [llm.name for llm in service._route()] == ["primary", "fallback"]  # Half-open: probe first
+    result, _ = answer(service)
+    assert result['llm_used'] == "primary"
+    assert service.breakers["primary"].state == CircuitBreaker.CLOSED
+
+
+def test_health_routing_demotes_a_failing_primary_until_its_failures_age_out():
+    primary = AsyncBackend("primary", delay=0.0, answer="I encountered an error while generating a response.")
+    fallback = AsyncBackend("fallback", delay=0.0)
+    service = dispatch_service(primary, fallback, "fallback")
+    service.breakers["primary"] = CircuitBreaker(window_seconds=0.1)
+
+    for _ in range(3):
+        result, _ = answer(service)
+        assert result['llm_used'] == "fallback"
+
+    assert primary.calls == 1
+    assert [llm.name for llm in service._route()] == ["fallback", "primary"]
+
+    primary.answer = "Answer from primary"
+    time.sleep(0.11)
+    assert [llm.name for llm in service._route()] == ["primary", "fallback"]
+    assert answer(service)[0]['llm_used'] == "primary"
+
+
+def test_static_routing_keeps_the_startup_order():
+    primary, fallback = AsyncBackend("primary", delay=0.0), AsyncBackend("fallback", delay=0.0)
+    service = dispatch_service(primary, fallback, "fallback")
+    service.routing = "static"
+    for _ in range(3):
+        service.breakers["primary"].record_failure()
+
+    assert [llm.name for llm in service._route()] == ["primary", "fallback"]
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.services.llm import BaseLLM, GroqLLM, LLMService
+
+
+class ScriptedLLM(BaseLLM):
+    """Streams fixed tokens with a delay, optionally failing part-way."""
+
+    def __init__(self, tokens, delay=0.0, fail_after=None):
+        self.tokens = tokens
+        self.delay = delay
+        self.fail_after = fail_after
+
+    def generate_response(self, prompt, max_tokens=512, temperature=0.7):
+        return "".join(self.tokens)
+
+    def stream_response(self, prompt, max_tokens=512, temperature=0.7):
+        for i, token in enumerate(self.tokens):
+            if self.fail_after is not None and i >= self.fail_after:
+                raise RuntimeError("backend dropped the stream")
+            time.sleep(self.delay)
+            yield token
+
+    def is_available(self):
+        return True
+
+
+def _service(primary, fallback=None):
+    service = LLMService.__new__(LLMService)
+    service._init_dispatch()
+    service.primary_llm = primary
+    service.fallback_llm = fallback
+    return service
+
+
+def _collect(service, **kwargs):
+    async def run():
+        events = []
+        chunks = [{'text': "Revenue grew 12% in 2023.", 'source': "report.pdf", 'similarity_score': 0.9}]
+        async for event in service.stream_answer(chunks, "How much did revenue grow?", **kwargs):
+            events.append((time.perf_counter(), event))
+        return events
+    return asyncio.run(run())
+
+
+def test_tokens_arrive_before_generation_finishes():
+    service = _service(ScriptedLLM([" Revenue", " grew", " 12%."], delay=0.05))
+
+    events = _collect(service)
+    tokens = [event for _, event in events if event['type'] == "token"]
+    done = events[-1][1]
+
+    assert [t['content'] for t in tokens] == ["Revenue", " grew", " 12%."]
+    # The first delta is delivered well before the last one is generated
+    assert events[-1][0] - events[0][0] >= 0.08
+    assert done['type'] == "done" and done['success'] is True
+    assert done['answer'] == "Revenue grew 12%."
+    assert 0 < done['time_to_first_token'] < done['response_time']
+    assert done['sources'][0]['source'] == "report.pdf"
+
+
+def test_fallback_is_used_when_primary_fails_before_first_token():
+    service = _service(ScriptedLLM(["never"], fail_after=0), ScriptedLLM(["From", " fallback"]))
+
+    events = [event for _, event in _collect(service)]
+
+    assert [e['content'] for e in events if e['type'] == "token"] == ["From", " fallback"]
+    assert events[-1]['answer'] == "From fallback"
+
+
+def test_failure_mid_stream_ends_with_error():
+    service = _service(ScriptedLLM(["Partial", " answer", " lost"], fail_after=2), ScriptedLLM(["unused"]))
+
+    events = [event for _, event in _collect(service)]
+
+    assert events[-1]['type'] == "error"
+    assert events[-1]['partial_answer'] == "Partial answer"
+    assert all(e.get('content') != "unused" for e in events)
+
+
+def test_groq_stream_parses_sse_deltas():
+    lines = [
+        'data: ' + json.dumps({"choices": [{"delta": {"role": "assistant"}}]}),
+        '',
+        'data: ' + json.dumps({"choices": [{"delta": {"content": "Hel"}}]}),
+        'data: ' + json.dumps({"choices": [{"delta": {"content": "lo"}}]}),
+        'data: [DONE]',
+    ]
+    captured = {}
+
+    def handler(request):
+        captured.update(json=json.loads(request.content))
+        return httpx.Response(200, text="\n".join(lines) + "\n", headers={"content-type": "text/event-stream"})
+
+    groq = GroqLLM.__new__(GroqLLM)
+    groq.model = "llama3-8b-8192"
+    groq.endpoint = "https://example.invalid"
+    groq.client = httpx.Client(transport=httpx.MockTransport(handler))
+    groq._available = True
+
+    assert list(groq.stream_response("prompt")) == ["Hel", "lo"]
+    assert captured['json']['stream'] is True
+
+
+def test_websocket_reports_a_stream_that_ends_without_an_answer(monkeypatch):
+    from app.routers import websocket
+
+    class TruncatedService:
+        async def stream_answer(self, context_chunks, question, max_tokens=512, temperature=0.3):
+            yield {"type": "token", "content": "Revenue"}
+
+    sent = []
+
+    async def send_json(client_id, data):
+        sent.append(data)
+
+    monkeypatch.setattr(websocket.manager, "send_json", send_json)
+    monkeypatch.setattr(websocket.service_manager, "get_llm_service", TruncatedService)
+
+    asyncio.run(websocket.stream_answer_generation("client", "How much did revenue grow?", [], []))
+
+    assert [message['type'] for message in sent] == ["answer_stream_start", "answer_stream_chunk", "answer_stream_error"]
+    assert sent[-1]['error'] == "LLM stream ended without a final answer"
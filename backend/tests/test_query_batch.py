@@ -0,0 +1,76 @@
+import asyncio
+
+from app.config import API_PREFIX
+from app.main import app
+from app.models.query import QueryHistoryDB
+from app.utils.service_manager import get_llm_service, get_rag_service
+
+
+class FakeRAGService:
+    def __init__(self):
+        self.batches = []
+
+    def search_batch(self, queries, top_k=5, score_threshold=0.3, document_ids=None):
+        self.batches.append(list(queries))
+        shared = {'text': "Revenue grew 12% in 2023.", 'chunk_id': "c1", 'document_id': "doc", 'similarity_score': 0.8}
+        return {
+            'success': True,
+            'results': [
+                {'query': query, 'results_count': 0 if "unknown" in query else 1,
+                 'results': [] if "unknown" in query else [dict(shared)]}
+                for query in queries
+            ],
+            'unique_chunks': 1,
+        }
+
+
+class FakeLLMService:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def agenerate_answer(self, context_chunks, question, max_tokens=512, temperature=0.3):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        if "fail" in question:
+            # The real service reports failures in the result instead of raising
+            return {'success': False, 'answer': "I encountered an error while processing your question.",
+                    'error': "LLM unavailable", 'llm_used': "Error"}
+        return {'success': True, 'answer': f"Answer to: {question}", 'llm_used': "fake"}
+
+
+def test_ask_batch_answers_in_order_with_bounded_concurrency(client, db_session):
+    rag_service, llm_service = FakeRAGService(), FakeLLMService()
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+    app.dependency_overrides[get_llm_service] = lambda: llm_service
+    questions = [f"What was revenue in year {i}?" for i in range(6)] + ["unknown topic?", "please fail now"]
+
+    response = client.post(f"{API_PREFIX}/query/ask-batch", json={"questions": questions, "max_concurrency": 2})
+
+    assert response.status_code == 200
+    body = response.json()
+    # One search for the whole batch
+    assert rag_service.batches == [questions]
+    assert llm_service.max_active <= 2
+
+    results = body['results']
+    assert [result['question'] for result in results] == questions
+    assert results[0]['success'] and results[0]['answer'] == f"Answer to: {questions[0]}"
+    assert results[0]['sources'][0]['document_name'] == "Document doc"
+    assert results[6]['success'] is False and results[6]['error'] == "No relevant documents found"
+    assert results[7]['success'] is False and results[7]['error'] == "LLM unavailable"
+
+    stats = body['stats']
+    assert (stats['questions'], stats['succeeded'], stats['failed']) == (8, 6, 2)
+    assert stats['unique_chunks'] == 1
+    assert stats['questions_per_second'] > 0
+
+    saved = db_session.query(QueryHistoryDB).filter(QueryHistoryDB.question.in_(questions)).count()
+    assert saved == len(questions)
+
+
+def test_ask_batch_rejects_too_short_questions(client):
+    response = client.post(f"{API_PREFIX}/query/ask-batch", json={"questions": ["ok?", "no"]})
+    assert response.status_code == 422
@@ -0,0 +1,61 @@
+import json
+
+from app.config import API_PREFIX
+from app.main import app
+from app.models.query import QueryHistoryDB
+from app.utils.service_manager import get_llm_service, get_rag_service
+
+
+class FakeRAGService:
+    def search_documents(self, query, top_k=5, score_threshold=0.3, document_ids=None):
+        return {
+            'success': True,
+            'results': [{
+                'text': "Revenue grew 12% in 2023.",
+                'document_id': "missing-doc",
+                'similarity_score': 0.82,
+            }],
+        }
+
+
+class FakeLLMService:
+    async def stream_answer(self, context_chunks, question, max_tokens=512, temperature=0.3):
+        for token in ["Revenue", " grew", " 12%."]:
+            yield {"type": "token", "content": token}
+        yield {
+            "type": "done", "success": True, "answer": "Revenue grew 12%.", "sources": [],
+            "llm_used": "fake", "response_time": 0.01, "time_to_first_token": 0.005,
+        }
+
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_ask_stream_sends_sources_tokens_then_done(client, db_session):
+    app.dependency_overrides[get_rag_service] = FakeRAGService
+    app.dependency_overrides[get_llm_service] = FakeLLMService
+
+    response = client.post(f"{API_PREFIX}/query/ask/stream", json={"question": "How much did revenue grow?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+
+    assert [name for name, _ in events] == ["sources", "token", "token", "token", "done"]
+    assert events[0][1]["sources"][0]["document_name"] == "Document missing-doc"
+    assert "".join(data["content"] for name, data in events if name == "token") == "Revenue grew 12%."
+
+    done = events[-1][1]
+    assert done["success"] is True
+    assert done["answer"] == "Revenue grew 12%."
+    assert done["llm_used"] == "fake"
+    assert done["context_chunks_count"] == 1
+    assert done["time_to_first_token"] == 0.005
+
+    history = db_session.query(QueryHistoryDB).filter(QueryHistoryDB.question == "How much did revenue grow?").first()
+    assert history is not None and history.answer == "Revenue grew 12%."
@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+
+import app.services.document_processor as document_processor
+from app.services.chunking import ChunkingService
+from app.services.rag_service import RAGService
+from app.services.rebuild import VectorStoreRebuild
+from app.services.vector_store import VectorStore
+from tests.test_vector_store import FakeEmbeddingService, make_chunks
+
+
+@pytest.fixture
+def rag_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(document_processor, "PROCESSED_DIR", tmp_path / "processed")
+    service = RAGService.__new__(RAGService)
+    service.embedding_service = FakeEmbeddingService()
+    service.chunking_service = ChunkingService(chunk_size=1000, chunk_overlap=200)
+    service.vector_store = VectorStore(service.embedding_service, store_dir=tmp_path / "vector_store")
+    service.rebuild = VectorStoreRebuild(service, workers=2)
+    return service
+
+
+def write_documents(tmp_path, texts):
+    documents = []
+    for document_id, text in texts.items():
+        file_path = tmp_path / f"{document_id}.txt"
+        file_path.write_text(text)
+        documents.append({
+            'document_id': document_id, 'file_path': str(file_path), 'filename': f"{document_id}.txt",
+            'created_at': "2024-01-01T00:00:00", 'file_hash': document_id
+        })
+    return documents
+
+
+def live_documents(service):
+    return sorted(service.vector_store.chunk_store.document_ids())
+
+
+def test_rebuild_replaces_the_live_store_and_keeps_documents_added_meanwhile(tmp_path, rag_service):
+    documents = write_documents(tmp_path, {"alpha": "apples and pears", "beta": "quarterly revenue grew"})
+    rag_service.vector_store.add_chunks(make_chunks("alpha", ["stale alpha text"]))
+
+    release = threading.Event()
+    rebuild = rag_service.rebuild
+    prepare = rebuild._prepare
+    rebuild._prepare = lambda document: release.wait(10) and prepare(document)
+
+    rebuild.start(documents)
+    # Uploaded while the rebuild runs, so missing from its document list
+    rag_service.vector_store.add_chunks(make_chunks("gamma", ["gearbox oil change"]))
+    release.set()
+    status = rebuild.wait(10)
+
+    assert status['state'] == "completed"
+    assert status['documents_carried_over'] == 1
+    assert live_documents(rag_service) == ["alpha", "beta", "gamma"]
+    assert rag_service.vector_store.search("apples", top_k=1)[0]['text'] == "apples and pears"
+    assert not rag_service.rebuild.state_path.exists()
+
+
+def test_interrupted_rebuild_resumes_from_its_checkpoint(tmp_path, rag_service):
+    documents = write_documents(tmp_path, {"alpha": "apples and pears", "beta": "quarterly revenue grew"})
+    rebuild = rag_service.rebuild
+    rebuild._save_state({'id': "r1", 'started_at': 0, 'documents': documents, 'failed': {}, 'deleted': []})
+    # "alpha" was committed to the rebuild store before the restart
+    target = VectorStore(rag_service.embedding_service, store_dir=rag_service.vector_store.rebuild_dir)
+    target.add_chunks(make_chunks("alpha", ["apples and pears"]))
+    target._close_store()
+
+    prepared = []
+    prepare = rebuild._prepare
+    rebuild._prepare = lambda document: prepared.append(document['document_id']) or prepare(document)
+
+    assert rebuild.resume() is True
+    assert rebuild.wait(10)['state'] == "completed"
+    assert prepared == ["beta"]
+    assert live_documents(rag_service) == ["alpha", "beta"]
+
+
+def test_documents_deleted_during_a_rebuild_stay_deleted(tmp_path, rag_service):
+    documents = write_documents(tmp_path, {"alpha": "apples and pears", "beta": "quarterly revenue grew"})
+    rag_service.vector_store.add_chunks(make_chunks("alpha", ["apples and pears"]))
+    rag_service.vector_store.add_chunks(make_chunks("beta", ["quarterly revenue grew"]))
+
+    release = threading.Event()
+    rebuild = rag_service.rebuild
+    prepare = rebuild._prepare
+    rebuild._prepare = lambda document: release.wait(10) and prepare(document)
+
+    rebuild.start(documents)
+    assert rag_service.remove_document("beta") == 1
+    release.set()
+
+    assert rebuild.wait(10)['state'] == "completed"
+    assert live_documents(rag_service) == ["alpha"]
+    assert rag_service.vector_store.search("quarterly revenue", top_k=5, score_threshold=0.0)[0]['document_id'] == "alpha"
+
+
+def test_documents_without_a_row_are_not_carried_over(tmp_path, rag_service):
+    documents = write_documents(tmp_path, {"alpha": "apples and pears"})
+    # Indexed before the rebuild but no longer in the document list (e.g. its row was deleted)
+    rag_service.vector_store.add_chunks(make_chunks("orphan", ["leftover chunk"]))
+
+    rag_service.rebuild.start(documents)
+    status = rag_service.rebuild.wait(10)
+
+    assert status['state'] == "completed"
+    assert status['documents_carried_over'] == 0
+    assert live_documents(rag_service) == ["alpha"]
+
+
+def test_documents_that_fail_to_reprocess_keep_their_live_chunks(tmp_path, rag_service):
+    documents = write_documents(tmp_path, {"alpha": "apples and pears", "beta": "quarterly revenue grew"})
+    rag_service.vector_store.add_chunks(make_chunks("alpha", ["apples and pears"]))
+    rag_service.vector_store.add_chunks(make_chunks("beta", ["quarterly revenue grew"]))
+
+    rebuild = rag_service.rebuild
+    prepare = rebuild._prepare
+
+    def flaky_prepare(document):
+        if document['document_id'] == "beta":
+            raise OSError("temporarily unreadable")
+        return prepare(document)
+    rebuild._prepare = flaky_prepare
+
+    rebuild.start(documents)
+    status = rebuild.wait(10)
+
+    assert status['state'] == "completed"
+    assert status['failures'] == {"beta": "temporarily unreadable"}
+    assert status['documents_carried_over'] == 1
+    assert live_documents(rag_service) == ["alpha", "beta"]
+
+
+def test_a_rebuild_that_keeps_failing_is_not_resumed_forever(tmp_path, rag_service, monkeypatch):
+    documents = write_documents(tmp_path, {"alpha": "apples and pears"})
+    rebuild = rag_service.rebuild
+    rebuild._save_state({'id': "r1", 'started_at': 0, 'documents': documents, 'failed': {}, 'deleted': []})
+    monkeypatch.setattr(rag_service.vector_store, "install_generation",
+                        lambda target, known: (_ for _ in ()).throw(OSError("disk full")))
+
+    for attempt in range(1, 4):
+        assert rebuild.resume() is True
+        assert rebuild.wait(10)['attempts'] == attempt
+
+    assert rebuild.resume() is False
+    status = rebuild.get_status()
+    assert status['state'] == "failed" and status['error'] == "disk full"
+    assert rebuild.state_path.exists()  # Kept for start() or discard()
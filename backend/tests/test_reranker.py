@@ -0,0 +1,110 @@
+import time
+
+from app.config import API_PREFIX, RERANK_CANDIDATES
+from app.main import app
+from app.services.reranker import RerankerService
+from app.utils.service_manager import get_llm_service, get_rag_service
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words the text contains."""
+
+    def __init__(self, delay_per_pair: float = 0.0):
+        self.calls = []
+        self.delay_per_pair = delay_per_pair
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(len(pairs))
+        time.sleep(self.delay_per_pair * len(pairs))
+        return [float(len(set(query.lower().split()) & set(text.lower().split()))) for query, text in pairs]
+
+
+def make_reranker(model=None):
+    reranker = RerankerService(model_name="fake-cross-encoder")
+    reranker._model = model or FakeCrossEncoder()
+    return reranker
+
+
+CHUNKS = [
+    {'text': "apples and pears", 'chunk_id': "c0"},
+    {'text': "quarterly revenue grew", 'chunk_id': "c1"},
+    {'text': "revenue grew 12% in the quarterly report", 'chunk_id': "c2"},
+]
+
+
+def test_rerank_orders_by_cross_encoder_score_and_caches_scores():
+    reranker = make_reranker()
+
+    first = reranker.rerank("quarterly revenue report", CHUNKS, top_k=2)
+    second = reranker.rerank("quarterly  revenue report ", CHUNKS, top_k=2)
+
+    assert first['reranked'] is True
+    assert [chunk['chunk_id'] for chunk in first['results']] == ["c2", "c1"]
+    assert first['results'][0]['rerank_score'] > first['results'][1]['rerank_score']
+    assert [chunk['chunk_id'] for chunk in second['results']] == ["c2", "c1"]
+    # Scores of the repeated question came from the cache
+    assert reranker._model.calls == [3]
+    assert reranker.get_stats()['cache_hit_rate'] == 0.5
+
+
+def test_rerank_is_skipped_when_it_would_exceed_the_budget():
+    reranker = make_reranker(FakeCrossEncoder(delay_per_pair=0.01))
+    reranker.rerank("warm up", CHUNKS, top_k=3)  # Measures ~10ms per pair
+
+    result = reranker.rerank("quarterly revenue report", CHUNKS, top_k=2, budget_ms=5)
+
+    assert result['reranked'] is False
+    assert result['skipped_reason'] == 'latency_budget'
+    assert [chunk['chunk_id'] for chunk in result['results']] == ["c0", "c1"]
+    assert reranker.rerank("quarterly revenue report", CHUNKS, top_k=2, budget_ms=500)['reranked'] is True
+
+
+def test_unloaded_model_is_loaded_in_background_instead_of_blocking_a_budgeted_request(monkeypatch):
+    reranker = RerankerService(model_name="fake-cross-encoder")
+    loaded = FakeCrossEncoder()
+    monkeypatch.setattr("sentence_transformers.CrossEncoder", lambda *args, **kwargs: loaded, raising=False)
+
+    result = reranker.rerank("quarterly revenue report", CHUNKS, top_k=2, budget_ms=50)
+    reranker._loading.join(5)
+
+    assert result['skipped_reason'] == 'model_loading'
+    assert reranker._model is loaded
+    assert reranker.rerank("quarterly revenue report", CHUNKS, top_k=2, budget_ms=50)['reranked'] is True
+
+
+class FakeRAGService:
+    def __init__(self):
+        self.searches = []
+        self.reranker = make_reranker()
+        self.answer_cache = None
+
+    def search_documents(self, query, top_k=5, score_threshold=0.3, document_ids=None):
+        self.searches.append(top_k)
+        return {'success': True, 'results': [dict(chunk, document_id="doc", similarity_score=0.5) for chunk in CHUNKS]}
+
+    def rerank(self, query, chunks, top_k, budget_ms=None):
+        return self.reranker.rerank(query, chunks, top_k, budget_ms)
+
+
+class FakeLLMService:
+    def __init__(self):
+        self.contexts = []
+
+    async def agenerate_answer(self, context_chunks, question, max_tokens=512, temperature=0.3):
+        self.contexts.append([chunk['chunk_id'] for chunk in context_chunks])
+        return {'answer': "Revenue grew 12%.", 'llm_used': "fake"}
+
+
+def test_ask_reranks_over_retrieved_candidates(client):
+    rag_service, llm_service = FakeRAGService(), FakeLLMService()
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+    app.dependency_overrides[get_llm_service] = lambda: llm_service
+
+    response = client.post(f"{API_PREFIX}/query/ask", json={
+        "question": "quarterly revenue report", "top_k": 2, "rerank": True
+    })
+
+    assert response.status_code == 200
+    assert response.json()['reranked'] is True
+    assert rag_service.searches == [max(2, RERANK_CANDIDATES)]
+    assert llm_service.contexts == [["c2", "c1"]]
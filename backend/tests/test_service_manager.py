@@ -0,0 +1,96 @@
+import threading
+
+from app import main
+from app.config import API_PREFIX
+from app.utils import service_manager as service_manager_module
+from app.utils.service_manager import ServiceManager, get_rag_service
+
+
+class _CountingService:
+    instances = 0
+
+    def __init__(self):
+        type(self).instances += 1
+
+    def get_stats(self):
+        return {"vector_store_stats": {"total_chunks": 0}}
+
+
+def test_rag_service_is_created_once(monkeypatch):
+    """Concurrent first access must share a single RAG service instance."""
+    _CountingService.instances = 0
+    monkeypatch.setattr(service_manager_module, "RAGService", _CountingService)
+    manager = ServiceManager()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(manager.get_rag_service()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert _CountingService.instances == 1
+    assert manager.load_counts["rag"] == 1
+    assert all(service is results[0] for service in results)
+
+
+def test_restart_replaces_shared_instance(monkeypatch):
+    """Restarting a service swaps the instance every caller resolves."""
+    monkeypatch.setattr(service_manager_module, "RAGService", _CountingService)
+    manager = ServiceManager()
+
+    first = manager.get_rag_service()
+    result = manager.restart_service("rag")
+
+    assert result["success"] is True
+    assert manager.get_rag_service() is not first
+    assert manager.load_counts["rag"] == 2
+
+
+def test_routers_share_the_process_wide_service(client):
+    """Document and query routers resolve the same RAG service."""
+    shared = get_rag_service()
+
+    response = client.get(f"{API_PREFIX}/documents/rag-stats")
+    assert response.status_code == 200
+
+    assert service_manager_module.service_manager.get_rag_service() is shared
+    assert service_manager_module.service_manager.load_counts["rag"] == 1
+
+
+class _WarmingLLMService:
+    def __init__(self, ready=True):
+        self.ready = ready
+
+    def warm_up(self):
+        if self.ready is None:
+            raise RuntimeError("model file is corrupt")
+        return {"ready": self.ready, "backends": {"local": {"available": self.ready}}}
+
+    async def aclose(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+
+def test_ready_reports_llm_warm_up(monkeypatch, client):
+    """/ready turns 200 only once the LLM backends are warmed up."""
+    manager = ServiceManager()
+    monkeypatch.setattr(main, "service_manager", manager)
+
+    assert client.get("/ready").status_code == 503
+
+    monkeypatch.setattr(service_manager_module, "LLMService", _WarmingLLMService)
+    manager.warm_up_llm()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["llm"]["state"] == "ready"
+
+    for ready, state in [(False, "degraded"), (None, "failed")]:
+        monkeypatch.setattr(manager, "llm_service", _WarmingLLMService(ready))
+        assert manager.warm_up_llm()["state"] == state
+        assert client.get("/ready").status_code == 503
@@ -0,0 +1,382 @@
+import hashlib
+import json
+
+import numpy as np
+import pytest
+
+from app.services.vector_store import VectorStore
+
+
+class FakeEmbeddingService:
+    """Deterministic bag-of-words embeddings so tests need no model download."""
+
+    model_name = "fake-embeddings"
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def get_embedding_dim(self) -> int:
+        return self.dim
+
+    def generate_embeddings(self, texts, batch_size: int = 32):
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace("query: ", "").split():
+                bucket = int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim
+                embeddings[row, bucket] += 1.0
+            embeddings[row, 0] += 0.01
+        return embeddings
+
+    def embed_chunks(self, texts, batch_size: int = 32):
+        return self.generate_embeddings(texts, batch_size)
+
+    def embed_query(self, query: str):
+        return self.generate_embeddings([f"query: {query}"])
+
+    def embed_queries(self, queries):
+        return self.generate_embeddings([f"query: {query}" for query in queries])
+
+
+def make_chunks(document_id: str, texts):
+    return [
+        {
+            'text': text,
+            'chunk_id': f"{document_id}_chunk_{i}",
+            'document_id': document_id,
+            'chunk_index': i,
+            'chunk_size': len(text),
+            'metadata': {'filename': f"{document_id}.txt"},
+        }
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.fixture
+def embedding_service():
+    return FakeEmbeddingService()
+
+
+def test_add_and_search(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", ["apples and pears", "the quarterly revenue report"]))
+
+    results = store.search("revenue report", top_k=1, score_threshold=0.1)
+
+    assert len(results) == 1
+    assert results[0]['chunk_id'] == "doc-a_chunk_1"
+
+
+def test_reload_replays_appended_segments(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    for batch in range(5):
+        store.add_chunks(make_chunks(f"doc-{batch}", [f"batch {batch} text", f"more words {batch}"]))
+
+    # Small adds stay in segments rather than rewriting the snapshot
+    assert not store.index_path.exists()
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == 10
+    assert reloaded.index.ntotal == 10
+    assert [c['vector_index'] for c in reloaded.chunk_store.get_many(range(10))] == list(range(10))
+
+
+def test_compaction_folds_segments_into_snapshot(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.persistence.compact_min_records = 4
+
+    store.add_chunks(make_chunks("doc-a", [f"first {i}" for i in range(4)]))
+    store.persistence.wait_for_compaction()
+    store.add_chunks(make_chunks("doc-b", ["second document"]))
+
+    assert store.index_path.exists()
+    assert store.persistence.snapshot_count == 4
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == 5
+    assert reloaded.index.ntotal == 5
+    assert reloaded.chunk_store.get(4)['document_id'] == "doc-b"
+
+
+def test_torn_segment_tail_is_ignored(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", ["alpha", "beta", "gamma"]))
+
+    # Simulate a crash midway through writing the next batch
+    store.persistence._segment.write(b"\x00" * 10)
+    store.persistence._segment.flush()
+    store.chunk_store._rows_file.write(b"\x07" * 12)
+    store.chunk_store._rows_file.flush()
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == 3
+    assert reloaded.index.ntotal == 3
+
+    # New adds after recovery keep contiguous ids
+    reloaded.add_chunks(make_chunks("doc-b", ["delta"]))
+    again = VectorStore(embedding_service, store_dir=tmp_path)
+    assert [c['vector_index'] for c in again.chunk_store.get_many(range(4))] == [0, 1, 2, 3]
+    assert again.chunk_store.get(3)['text'] == "delta"
+
+
+def test_torn_document_line_is_truncated_before_appending(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", ["alpha", "beta"]))
+
+    # Simulate a crash midway through writing the next document entry
+    store.chunk_store._documents_file.write('{"document_id": "doc-')
+    store.chunk_store._documents_file.flush()
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    reloaded.add_chunks(make_chunks("doc-b", ["gamma"]))
+    reloaded.add_chunks(make_chunks("doc-c", ["delta"]))
+
+    again = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(again.chunk_store) == again.index.ntotal == 4
+    assert [c['document_id'] for c in again.chunk_store.get_many(range(4))] == ["doc-a", "doc-a", "doc-b", "doc-c"]
+
+
+def test_chunks_without_vectors_are_dropped_on_load(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", ["alpha", "beta"]))
+
+    # Simulate a crash after the chunk rows but before the vectors landed
+    store.chunk_store.append(make_chunks("doc-b", ["orphan"]))
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == 2
+    assert reloaded.index.ntotal == 2
+
+
+def test_chunk_store_interns_document_metadata(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    chunks = make_chunks("doc-a", ["alpha", "beta", "gamma"])
+    chunks[1]['chunk_id'] = "custom-id"
+    chunks[2]['section'] = "appendix"
+    store.add_chunks(chunks)
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    documents = (tmp_path / "chunks" / "documents.jsonl").read_text().splitlines()
+    assert len(documents) == 1
+    assert reloaded.chunk_store.get(0)['metadata'] == {'filename': "doc-a.txt"}
+    assert reloaded.chunk_store.get(1)['chunk_id'] == "custom-id"
+    assert reloaded.chunk_store.get(2)['section'] == "appendix"
+    assert list(reloaded.chunk_store.rows_for_documents(["doc-a"])) == [0, 1, 2]
+
+
+def test_legacy_chunks_json_is_migrated(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    chunks = make_chunks("doc-a", ["alpha", "beta"])
+    store.add_chunks(chunks)
+    store.chunk_store.reset()
+    for chunk in chunks:
+        chunk.pop('vector_index')
+    (tmp_path / "chunks.json").write_text(json.dumps(chunks))
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == 2
+    assert reloaded.chunk_store.get(1)['text'] == "beta"
+    assert not (tmp_path / "chunks.json").exists()
+
+
+def test_clear_removes_persisted_data(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", ["alpha", "beta"]))
+    store.clear()
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == 0
+    assert reloaded.index.ntotal == 0
+
+
+def test_filtered_search_only_returns_selected_documents(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    # Interleave batches so each document spans several row ranges
+    for batch in range(3):
+        store.add_chunks(make_chunks("doc-a", [f"revenue report {batch}", f"apples {batch}"]))
+        store.add_chunks(make_chunks("doc-b", [f"revenue forecast {batch}", f"pears {batch}"]))
+
+    assert store.chunk_store.document_ranges(["doc-a"]) == [(0, 2), (4, 6), (8, 10)]
+
+    results = store.search("revenue", top_k=10, score_threshold=0.0, document_ids=["doc-b"])
+    assert len(results) == 6
+    assert {r['document_id'] for r in results} == {"doc-b"}
+
+    results = store.search("revenue", top_k=1, score_threshold=0.0, document_ids=["doc-a"])
+    assert results[0]['text'].startswith("revenue report")
+
+    assert store.search("revenue", document_ids=["missing"]) == []
+
+
+def test_masked_search_matches_selector_search(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    for batch in range(4):
+        store.add_chunks(make_chunks(f"doc-{batch % 2}", [f"shared words {batch} {i}" for i in range(5)]))
+
+    query = embedding_service.generate_embeddings(["query: shared words 3"])
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    ranges = store.chunk_store.document_ranges(["doc-1"])
+
+    scores, indices = store._filtered_search(query, 4, ranges)
+    masked_scores, masked_indices = store._masked_search(query, 4, ranges)
+
+    assert set(indices[0]) <= set(store.chunk_store.rows_for_documents(["doc-1"]))
+    assert set(masked_indices[0]) <= set(store.chunk_store.rows_for_documents(["doc-1"]))
+    assert np.allclose(np.sort(scores[0]), np.sort(masked_scores[0]))
+
+
+def test_masked_search_fallback_handles_query_batches(tmp_path, embedding_service, monkeypatch):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", ["revenue report", "apples"]))
+    store.add_chunks(make_chunks("doc-b", [f"revenue forecast {i}" for i in range(6)]))
+    queries = ["revenue report", "apples"]
+    expected = store.search_batch(queries, top_k=5, score_threshold=0.0, document_ids=["doc-a"])
+
+    # Force the fallback taken by indexes that reject search-time selectors
+    def reject_selectors(index, selector=None):
+        if selector is not None:
+            raise RuntimeError("selectors not supported")
+        return None
+    monkeypatch.setattr("app.services.vector_store.search_parameters", reject_selectors)
+
+    batch = store.search_batch(queries, top_k=5, score_threshold=0.0, document_ids=["doc-a"])
+    assert [[r['chunk_id'] for r in results] for results in batch] == \
+        [[r['chunk_id'] for r in results] for results in expected]
+
+    # Rows with fewer hits than k are padded like a FAISS search
+    query = embedding_service.embed_queries(queries)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    scores, indices = store._masked_search(query, 4, store.chunk_store.document_ranges(["doc-a"]))
+    assert scores.shape == indices.shape == (2, 4)
+    assert (indices[:, 2:] == -1).all() and np.isneginf(scores[:, 2:]).all()
+
+
+def test_search_batch_matches_single_searches(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", ["apples and pears", "the quarterly revenue report", "revenue forecast"]))
+    store.add_chunks(make_chunks("doc-b", ["pears are green", "annual revenue growth"]))
+    queries = ["revenue report", "pears", "revenue growth"]
+
+    batch = store.search_batch(queries, top_k=2, score_threshold=0.0)
+    assert len(batch) == len(queries)
+    for query, results in zip(queries, batch):
+        single = store.search(query, top_k=2, score_threshold=0.0)
+        assert [r['chunk_id'] for r in results] == [r['chunk_id'] for r in single]
+        assert np.allclose([r['similarity_score'] for r in results], [r['similarity_score'] for r in single])
+
+    filtered = store.search_batch(queries, top_k=5, score_threshold=0.0, document_ids=["doc-b"])
+    assert all({r['document_id'] for r in results} == {"doc-b"} for results in filtered)
+    assert store.search_batch(queries, document_ids=["missing"]) == [[], [], []]
+
+
+def part_catalog(count: int):
+    return [f"replacement part PN-{4000 + i}-X fits the standard housing" for i in range(count)]
+
+
+def test_hybrid_search_finds_exact_identifiers(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", part_catalog(40)))
+
+    lexical = store.search("PN-4017-X", top_k=3, mode="lexical")
+    # Every part shares "pn" and "x"; only one matches the whole identifier
+    assert lexical[0]['chunk_id'] == "doc-a_chunk_17"
+    assert lexical[0]['bm25_score'] > 2 * lexical[1]['bm25_score']
+
+    for fusion in ("rrf", "weighted"):
+        hybrid = store.search("which housing fits PN-4017-X", top_k=3, score_threshold=0.99,
+                              mode="hybrid", fusion=fusion)
+        assert hybrid[0]['chunk_id'] == "doc-a_chunk_17"
+        assert hybrid[0]['similarity_score'] > 0
+        assert hybrid[0]['hybrid_score'] >= hybrid[-1]['hybrid_score']
+
+    assert store.search("PN-4017-X", mode="hybrid", document_ids=["missing"]) == []
+    with pytest.raises(ValueError):
+        store.search("PN-4017-X", mode="sparse")
+
+
+def test_lexical_index_is_persisted_and_rebuilt_when_missing(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.add_chunks(make_chunks("doc-a", part_catalog(5)))
+    store.add_chunks(make_chunks("doc-b", ["torque spec for PN-4002-X is 12 Nm"]))
+    expected = [r['chunk_id'] for r in store.search("PN-4002-X", mode="lexical")]
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.lexical_index) == 6
+    assert [r['chunk_id'] for r in reloaded.search("PN-4002-X", mode="lexical")] == expected
+
+    # Stores created before the lexical index existed are indexed on load
+    reloaded.lexical_index.close()
+    (tmp_path / "lexical" / "terms.jsonl").unlink()
+    rebuilt = VectorStore(embedding_service, store_dir=tmp_path)
+    assert [r['chunk_id'] for r in rebuilt.search("PN-4002-X", mode="lexical")] == expected
+    assert [r['chunk_id'] for r in rebuilt.search("PN-4002-X", mode="lexical", document_ids=["doc-b"])] == [
+        "doc-b_chunk_0"
+    ]
+
+
+def test_removed_documents_disappear_from_every_search(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.delete_compact_ratio = 1.0  # Keep the tombstones
+    store.add_chunks(make_chunks("doc-a", ["revenue report PN-1", "apples"]))
+    store.add_chunks(make_chunks("doc-b", ["revenue forecast PN-1", "pears"]))
+    store.add_chunks(make_chunks("doc-c", ["revenue outlook PN-1"]))
+
+    assert store.remove_document("doc-b") == 2
+    assert store.remove_document("doc-b") == 0
+
+    for mode in ("dense", "lexical", "hybrid"):
+        results = store.search("revenue PN-1", top_k=10, score_threshold=0.0, mode=mode)
+        assert {r['document_id'] for r in results} == {"doc-a", "doc-c"}, mode
+    assert store.search("revenue", score_threshold=0.0, document_ids=["doc-b"]) == []
+    assert all(r['document_id'] != "doc-b" for r in store.search_batch(["pears"], score_threshold=0.0)[0])
+
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert reloaded.chunk_store.deleted_count == 2
+    assert {r['document_id'] for r in reloaded.search("revenue", top_k=10, score_threshold=0.0)} == {"doc-a", "doc-c"}
+
+
+def test_compaction_reclaims_deleted_rows(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.delete_compact_ratio = 0.5
+    store.add_chunks(make_chunks("doc-a", ["revenue report", "apples"]))
+    store.add_chunks(make_chunks("doc-b", ["revenue forecast", "pears"]))
+    store.add_chunks(make_chunks("doc-c", ["revenue outlook", "plums"]))
+
+    store.remove_document("doc-a")
+    assert store.chunk_store.deleted_count == 2  # 2 of 6 rows, below the ratio
+    assert store.remove_document("doc-c") == 2
+
+    # 4 of 6 rows deleted: the store is rewritten with doc-b alone in the background
+    store.wait_for_compaction()
+    assert len(store.chunk_store) == 2 and store.chunk_store.deleted_count == 0
+    assert store.index.ntotal == 2 and len(store.lexical_index) == 2
+    assert not store.staging_dir.exists()
+    results = store.search("revenue forecast", top_k=5, score_threshold=0.0)
+    assert [r['chunk_id'] for r in results][0] == "doc-b_chunk_0"
+    assert results[0]['vector_index'] == 0
+
+    store.add_chunks(make_chunks("doc-d", ["revenue guidance"]))
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == reloaded.index.ntotal == 3
+    assert reloaded.search("revenue guidance", top_k=1, mode="lexical")[0]['chunk_id'] == "doc-d_chunk_0"
+
+
+def test_interrupted_compaction_is_finished_or_discarded_on_load(tmp_path, embedding_service):
+    store = VectorStore(embedding_service, store_dir=tmp_path)
+    store.delete_compact_ratio = 1.0
+    store.add_chunks(make_chunks("doc-a", ["revenue report", "apples"]))
+    store.add_chunks(make_chunks("doc-b", ["revenue forecast"]))
+    store.remove_document("doc-a")
+
+    # Staged but not marked complete: the old store is kept
+    (tmp_path / "staging" / "chunks").mkdir(parents=True)
+    reloaded = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(reloaded.chunk_store) == 3 and not reloaded.staging_dir.exists()
+
+    # Crash after the staged store was complete: the compaction is finished
+    store._swap_in_staged = lambda: None
+    store.compact_deleted()
+    assert (tmp_path / "staging" / "COMPLETE").exists()
+
+    recovered = VectorStore(embedding_service, store_dir=tmp_path)
+    assert len(recovered.chunk_store) == recovered.index.ntotal == 1
+    assert recovered.search("revenue", top_k=5, score_threshold=0.0)[0]['chunk_id'] == "doc-b_chunk_0"
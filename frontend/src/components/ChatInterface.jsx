@@ -35,6 +35,7 @@ const ChatInterface = () => {
   const [suggestions, setSuggestions] = useState([]);
   const [streamingAnswer, setStreamingAnswer] = useState('');
   const [isStreaming, setIsStreaming] = useState(false);
+  const streamedTextRef = useRef('');
   const messagesEndRef = useRef(null);
   const inputRef = useRef(null);
   
@@ -121,15 +122,17 @@ const ChatInterface = () => {
       console.log('Stream started:', data);
       setIsStreaming(true);
       setStreamingAnswer('');
+      streamedTextRef.current = '';
     });
     
     websocketService.on('answer_stream_chunk', (data) => {
-      console.log('Stream chunk:', data);
-      setStreamingAnswer(data.content);
+      // Chunks carry only the new text; accumulate it here
+      streamedTextRef.current += data.delta;
+      setStreamingAnswer(streamedTextRef.current);
       
       // Update the message in history
       if (streamingMessageId) {
-        updateStreamingMessage(streamingMessageId, data.content, false);
+        updateStreamingMessage(streamingMessageId, streamedTextRef.current, false);
       }
     });
     